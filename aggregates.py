@@ -0,0 +1,164 @@
+import logging
+from collections import Counter
+import numpy as np
+from features import DAY_NAMES, MONTH_NAMES
+from dataset import STREAM_CHUNK_ROWS, iter_crime_csv
+
+logger = logging.getLogger(__name__)
+
+
+def _value_counts(series):
+    """Counts of the values present in ``series`` (categoricals also list unused categories)"""
+    counts = series.value_counts()
+    return counts[counts > 0].to_dict()
+
+
+def _ranked(counter):
+    """Counter items ordered by count (descending), then key, so ties are deterministic"""
+    return sorted(counter.items(), key=lambda item: (-item[1], str(item[0])))
+
+
+class CrimeAggregates:
+    """Additive summary counts behind the stored crime patterns.
+
+    Aggregates can be built from a whole frame, updated with more rows (an
+    appended slice of the file or one chunk of a larger read) or merged with
+    aggregates built elsewhere; the patterns derived from them do not depend
+    on how the rows were split up.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.hourly = np.zeros(24, dtype=np.int64)
+        self.daily = Counter()
+        self.monthly = Counter()
+        self.crime_types = Counter()
+        self.locations = Counter()
+        self.missing_locations = 0
+        self.firearm_incidents = 0
+        self.min_date = None
+        self.max_date = None
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build aggregates from a frame with the derived temporal columns"""
+        aggregates = cls()
+        aggregates.update(df)
+        return aggregates
+
+    @classmethod
+    def from_csv(cls, source, chunksize=None):
+        """Build aggregates by streaming a crime CSV in chunks, with bounded memory.
+
+        Gives the same counts as ``from_frame`` on the fully loaded file.
+        """
+        aggregates = cls()
+        for chunk, _ in iter_crime_csv(source, chunksize or STREAM_CHUNK_ROWS):
+            aggregates.update(chunk)
+        return aggregates
+
+    def update(self, df):
+        """Fold the rows of ``df`` (with derived temporal columns) into the counts"""
+        if not len(df):
+            return self
+        self.total += len(df)
+        self.hourly += np.bincount(df['Hour'].to_numpy(dtype=np.int64), minlength=24)[:24]
+        self.daily.update(_value_counts(df.loc[df['DayOfWeek'] != 'Unknown', 'DayOfWeek']))
+        self.monthly.update(_value_counts(df.loc[df['Month'] != 'Unknown', 'Month']))
+        self.crime_types.update(_value_counts(df['Description']))
+        self.locations.update(_value_counts(df['Neighborhood']))
+        self.missing_locations += int((df['Neighborhood'].isna() | (df['Neighborhood'] == 'Unknown')).sum())
+        if 'FirearmUsed' in df.columns:
+            self.firearm_incidents += int((df['FirearmUsed'] == 'Yes').sum())
+
+        dates = df['IncidentDate']
+        if dates.notna().any():
+            low, high = dates.min(), dates.max()
+            self.min_date = low if self.min_date is None else min(self.min_date, low)
+            self.max_date = high if self.max_date is None else max(self.max_date, high)
+        return self
+
+    def merge(self, other):
+        """Add the counts of another ``CrimeAggregates`` into this one"""
+        self.total += other.total
+        self.hourly += other.hourly
+        self.daily.update(other.daily)
+        self.monthly.update(other.monthly)
+        self.crime_types.update(other.crime_types)
+        self.locations.update(other.locations)
+        self.missing_locations += other.missing_locations
+        self.firearm_incidents += other.firearm_incidents
+        for date in (other.min_date, other.max_date):
+            if date is not None:
+                self.min_date = date if self.min_date is None else min(self.min_date, date)
+                self.max_date = date if self.max_date is None else max(self.max_date, date)
+        return self
+
+    @property
+    def date_range(self):
+        """'YYYY-MM-DD to YYYY-MM-DD', or None when no row had a valid date"""
+        if self.min_date is None:
+            return None
+        return f"{self.min_date.strftime('%Y-%m-%d')} to {self.max_date.strftime('%Y-%m-%d')}"
+
+    def hourly_pattern(self):
+        """Pattern data for the 'hourly' pattern"""
+        peak_hour = int(self.hourly.argmax())
+        return {
+            'counts': {str(hour).zfill(2): int(count) for hour, count in enumerate(self.hourly)},
+            'peak_hour': str(peak_hour).zfill(2),
+            'peak_count': int(self.hourly[peak_hour])
+        }
+
+    def daily_pattern(self):
+        """Pattern data for the 'daily' pattern"""
+        counts = {day: int(self.daily.get(day, 0)) for day in DAY_NAMES}
+        busiest_day = max(DAY_NAMES, key=lambda day: counts[day])
+        return {
+            'counts': counts,
+            'busiest_day': busiest_day,
+            'peak_count': counts[busiest_day]
+        }
+
+    def monthly_pattern(self):
+        """Pattern data for the 'monthly' pattern"""
+        counts = {month: int(self.monthly.get(month, 0)) for month in MONTH_NAMES}
+        busiest_month = max(MONTH_NAMES, key=lambda month: counts[month])
+        return {
+            'counts': counts,
+            'busiest_month': busiest_month,
+            'peak_count': counts[busiest_month]
+        }
+
+    def top_crime_types(self, n=None):
+        """(crime type, count) pairs, most frequent first"""
+        return _ranked(self.crime_types)[:n]
+
+    def top_locations(self, n=None):
+        """(neighborhood, count) pairs, most frequent first"""
+        return _ranked(self.locations)[:n]
+
+    def crime_type_pattern(self):
+        """Pattern data for the 'crime_types' pattern"""
+        top = self.top_crime_types(10)
+        return {
+            'counts': {str(k): int(v) for k, v in top},
+            'top_crime': str(top[0][0]),
+            'top_count': int(top[0][1])
+        }
+
+    def location_pattern(self):
+        """Pattern data for the 'locations' pattern"""
+        top = self.top_locations(10)
+        return {
+            'counts': {str(k): int(v) for k, v in top},
+            'top_location': str(top[0][0]),
+            'top_count': int(top[0][1])
+        }
+
+    def firearm_pattern(self):
+        """Pattern data for the 'firearms' pattern"""
+        return {
+            'count': int(self.firearm_incidents),
+            'percentage': round(self.firearm_incidents / self.total * 100, 1) if self.total else 0.0
+        }
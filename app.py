@@ -1,7 +1,18 @@
-from flask import Flask, jsonify, render_template, request
+from flask import Flask, Response, g, jsonify, render_template, request
 from crime_agent import CrimeAgent
+from aggregates import CrimeAggregates
+from dataset import get_dataset_store, memory_report, month_range
+from jobs import PRIORITY_INTERACTIVE, QueueFullError, get_job_queue
+import metrics
+from payloads import (COLUMNAR_MIMETYPE, build_columnar_payload, build_crime_data_payload, crime_records,
+                      crime_summary, encode_columnar, filter_records, records_json)
+from spatial import ClusterGrid, GridIndex, parse_bbox
+from heatmap import BANDWIDTH_RANGE, DEFAULT_BANDWIDTH, HeatmapGrid, parse_hours
+import gzip
+import base64
 import logging
 import json
+import queue
 import pandas as pd
 import numpy as np
 import time
@@ -11,11 +22,52 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
-crime_agent = CrimeAgent()
+DATA_FILE = 'October2024.csv'
+
+# Viewport queries below this zoom level are capped at VIEW_POINT_LIMIT points
+DETAIL_ZOOM = 15
+VIEW_POINT_LIMIT = 5000
+
+# Highest zoom level served as aggregated cells instead of individual points
+CLUSTER_MAX_ZOOM = 13
+
+# Records serialized at a time when streaming /get_crime_data as NDJSON
+NDJSON_CHUNK_ROWS = 5000
+
+# Page sizes of the cursor-paginated /get_crime_data
+DEFAULT_PAGE_LIMIT = 1000
+MAX_PAGE_LIMIT = 10000
+
+# Rendered heatmaps kept per dataset version; bandwidths are snapped to HEATMAP_BANDWIDTH_STEP metres
+HEATMAP_CACHE_ENTRIES = 64
+HEATMAP_BANDWIDTH_STEP = 25
+
+# How often /chat/stream checks on a job that has not produced its next event
+STREAM_POLL_SECONDS = 0.5
+crime_agent = CrimeAgent(DATA_FILE)
+
+@app.before_request
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def _record_request(response):
+    """Observe request latency by route template (streamed bodies: until the response starts)"""
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else '<unmatched>'
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method,
+                                             route=route, status=response.status_code)
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Metrics in the Prometheus text exposition format"""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 # Initialize data on startup
 try:
-    crime_agent.analyze_csv('October2024.csv')
+    crime_agent.analyze_csv(DATA_FILE)
     logger.info("Successfully initialized crime data")
 except Exception as e:
     logger.error(f"Error initializing crime data: {str(e)}")
@@ -27,68 +79,323 @@ def index():
 @app.route('/get_crime_data')
 def get_crime_data():
     try:
-        # First analyze the data to ensure clusters are computed
-        crime_agent.analyze_csv('October2024.csv')
+        store = get_dataset_store(DATA_FILE)
+        start, end = _date_range()
+        fmt = request.args.get('format', 'json')
+        if fmt not in ('json', 'columnar', 'ndjson'):
+            return jsonify({'error': f'Unknown format {fmt!r}, expected json, columnar or ndjson'}), 400
+        if 'limit' in request.args or 'cursor' in request.args:
+            if fmt != 'json':
+                return jsonify({'error': 'Pagination is only available for the json format'}), 400
+            return _crime_data_page(start, end)
+        if fmt == 'ndjson':
+            return _stream_crime_data(start, end)
+        build = build_crime_data_payload if fmt == 'json' else build_columnar_payload
+        if start is None and end is None:
+            payload = store.derived(
+                'crime_data_payload' if fmt == 'json' else 'crime_data_columnar',
+                lambda df: build(_map_view()['records'], last_modified=store.modified_at)
+            )
+        else:
+            # Only the month partitions in the range are read
+            payload = store.derived_range(
+                'crime_data_payload' if fmt == 'json' else 'crime_data_columnar', start, end,
+                lambda start, end: build(crime_records(_with_hotspots(store.select(start, end))),
+                                         last_modified=store.modified_at)
+            )
         
-        # Then read the analyzed data
-        df = pd.read_csv('October2024.csv')
+        # Serve the cached bytes; unchanged data gets a 304 via ETag/Last-Modified
+        if fmt == 'json':
+            response = Response(payload['body'], mimetype='application/json')
+        else:
+            response = _columnar_response(payload['body'])
+        response.set_etag(payload['etag'])
+        response.last_modified = payload['last_modified']
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in get_crime_data: {str(e)}")
+        return jsonify({'error': str(e)})
+
+def _mapped_rows(start, end):
+    """The dataset frame and the positions of its mapped rows in the date range, in file order.
+
+    These are the rows behind the /get_crime_data records; cached per
+    dataset version, with the hotspot model of that same version, so
+    streaming and paging only materialize a slice at a time.
+    """
+    store = get_dataset_store(DATA_FILE)
+    def build(start, end):
+        frame, positions = store.select_positions(start, end)
+        located = (frame['Latitude'].notna() & frame['Longitude'].notna()).to_numpy()
+        return {'frame': frame, 'positions': positions[located[positions]], 'version': store.version_tag,
+                'hotspots': crime_agent.get_hotspots()}
+    return store.derived_range('mapped_rows', start, end, build)
+
+def _records_at(rows, positions):
+    """Map records for the given frame positions"""
+    frame = rows['frame'].take(positions)
+    hotspots = rows['hotspots']
+    return crime_records(hotspots.label(frame) if hotspots is not None else frame)
+
+def _stream_crime_data(start, end):
+    """Stream the records as newline-delimited JSON, NDJSON_CHUNK_ROWS at a time"""
+    rows = _mapped_rows(start, end)
+    positions = rows['positions']
+    
+    def generate():
+        for offset in range(0, len(positions), NDJSON_CHUNK_ROWS):
+            records = _records_at(rows, positions[offset:offset + NDJSON_CHUNK_ROWS])
+            yield records.to_json(orient='records', lines=True, double_precision=10)
+    
+    response = Response(generate(), mimetype='application/x-ndjson')
+    response.headers['X-Total-Count'] = str(len(positions))
+    return response
+
+def _encode_cursor(version, start, end, offset):
+    """Opaque cursor for the page starting at ``offset`` of one dataset version and date range"""
+    token = json.dumps([version, start, end, offset], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(token).decode('ascii').rstrip('=')
+
+def _decode_cursor(cursor):
+    """Return (version, start, end, offset) from a cursor, or raise ValueError"""
+    try:
+        version, start, end, offset = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(offset, int) or offset < 0:
+        raise ValueError('Invalid cursor')
+    return version, start, end, offset
+
+def _crime_data_page(start, end):
+    """One page of records; ``next_cursor`` fetches the next one and is null on the last page"""
+    limit = int(request.args.get('limit', DEFAULT_PAGE_LIMIT))
+    if not 0 < limit <= MAX_PAGE_LIMIT:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_LIMIT}')
+    rows = _mapped_rows(start, end)
+    offset = 0
+    cursor = request.args.get('cursor')
+    if cursor:
+        version, cursor_start, cursor_end, offset = _decode_cursor(cursor)
+        if (cursor_start, cursor_end) != (start, end):
+            raise ValueError('Cursor belongs to a different date range')
+        if version != rows['version']:
+            return jsonify({'error': 'The data has changed since this cursor was issued; start again from the first page'}), 410
+    
+    positions = rows['positions'][offset:offset + limit]
+    end_offset = offset + len(positions)
+    next_cursor = None
+    if end_offset < len(rows['positions']):
+        next_cursor = _encode_cursor(rows['version'], start, end, end_offset)
+    body = (f'{{"total": {len(rows["positions"])}, "count": {len(positions)}, '
+            f'"next_cursor": {json.dumps(next_cursor)}, '
+            f'"crimes": {records_json(_records_at(rows, positions))}}}')
+    return Response(body, mimetype='application/json')
+
+def _columnar_response(body):
+    """Response for gzipped columnar records, decompressed for clients that don't accept gzip"""
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response = Response(body, mimetype=COLUMNAR_MIMETYPE)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(gzip.decompress(body), mimetype=COLUMNAR_MIMETYPE)
+    response.vary.add('Accept-Encoding')
+    return response
+
+def _map_view():
+    """Map records and their spatial index, built once per dataset version"""
+    def build(df):
+        records = crime_records(_with_hotspots(df))
+        return {
+            'records': records,
+            'index': GridIndex(records['latitude'].to_numpy(), records['longitude'].to_numpy())
+        }
+    return get_dataset_store(DATA_FILE).derived('map_view', build)
+
+def _with_hotspots(df):
+    """``df`` with the Cluster/Anomaly columns from the hotspot model, when it could be built.
+
+    Call it from a dataset store builder: the model then comes from the same
+    dataset version as ``df``.
+    """
+    hotspots = crime_agent.get_hotspots()
+    return hotspots.label(df) if hotspots is not None else df
+
+def _date_range():
+    """Parse the year or start/end month (YYYY-MM) filter of a request into partition bounds"""
+    year = request.args.get('year')
+    if year == 'all':
+        year = None
+    return month_range(year, request.args.get('start'), request.args.get('end'))
+
+def _range_aggregates(start, end):
+    """Aggregates for the months from ``start`` to ``end``, merged from cached per-partition counts"""
+    store = get_dataset_store(DATA_FILE)
+    aggregates = CrimeAggregates()
+    for key in store.partition_keys(start, end):
+        aggregates.merge(store.partition_derived('partition_aggregates', CrimeAggregates.from_frame, key))
+    return aggregates
+
+@app.route('/dataset/partitions')
+def dataset_partitions():
+    """Row counts, date ranges and bounding boxes of the month partitions"""
+    try:
+        return jsonify({'partitions': get_dataset_store(DATA_FILE).partitions()})
+    except Exception as e:
+        logger.error(f"Error listing partitions: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/dataset/memory')
+def dataset_memory():
+    """Bytes held in memory by each column of the loaded dataset"""
+    try:
+        return jsonify(get_dataset_store(DATA_FILE).derived('memory_report', memory_report))
+    except Exception as e:
+        logger.error(f"Error building memory report: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+def _request_filters():
+    """Parse the category/year filters shared by the map endpoints"""
+    categories = request.args.get('categories')
+    if categories is not None:
+        categories = [c for c in categories.split(',') if c]
+    year = request.args.get('year', 'all')
+    year = None if year == 'all' else int(year)
+    return categories, year
+
+@app.route('/crimes_in_view')
+def crimes_in_view():
+    """Get the incidents inside the map viewport"""
+    try:
+        bbox = request.args.get('bbox')
+        if not bbox:
+            return jsonify({'error': 'Missing bbox parameter'}), 400
+        south, west, north, east = parse_bbox(bbox)
+        zoom = request.args.get('zoom', default=0, type=int)
+        categories, year = _request_filters()
         
-        # Convert date and extract temporal features
-        df['IncidentDate'] = pd.to_datetime(df['IncidentDate'], format='%Y-%m-%d', errors='coerce')
+        view = _map_view()
+        records = view['records']
+        positions = view['index'].query(south, west, north, east)
+        positions = positions[filter_records(records.iloc[positions], categories, year)]
         
-        # Parse time and extract hour
-        def extract_hour(time_str):
-            try:
-                if pd.isna(time_str):
-                    return 0
-                if isinstance(time_str, str):
-                    time_parts = time_str.split(':')
-                    if len(time_parts) >= 1:
-                        hour = int(time_parts[0])
-                        if 0 <= hour < 24:  # Validate hour is in valid range
-                            return hour
-                return 0
-            except Exception as e:
-                logger.error(f"Error extracting hour from {time_str}: {str(e)}")
-                return 0
-
-        # Extract temporal features
-        df['Hour'] = df['OccurredFromTime'].apply(extract_hour)
-        df['Year'] = df['IncidentDate'].dt.year
-        df['DayOfWeek'] = df['IncidentDate'].dt.day_name()
-        df['Month'] = df['IncidentDate'].dt.month_name()
+        # Below street level, thin out dense views to a bounded number of points
+        total = len(positions)
+        if zoom < DETAIL_ZOOM and total > VIEW_POINT_LIMIT:
+            positions = positions[np.linspace(0, total - 1, VIEW_POINT_LIMIT).astype(np.int64)]
         
-        # Convert DataFrame to list of dictionaries
-        crimes = []
-        for _, row in df.iterrows():
-            try:
-                if pd.isna(row['Latitude']) or pd.isna(row['Longitude']):
-                    continue
-                    
-                crime = {
-                    'latitude': float(row['Latitude']),
-                    'longitude': float(row['Longitude']),
-                    'crime_type': str(row['Offense']) if not pd.isna(row['Offense']) else 'Unknown',
-                    'category': str(row['Category']) if 'Category' in df.columns and not pd.isna(row['Category']) else 'Other',
-                    'date': row['IncidentDate'].strftime('%Y-%m-%d') if not pd.isna(row['IncidentDate']) else 'Unknown',
-                    'time': str(row['OccurredFromTime']),  # Keep original time string
-                    'hour': int(row['Hour']),
-                    'day_of_week': str(row['DayOfWeek']),
-                    'month': str(row['Month']),
-                    'year': int(row['Year']) if not pd.isna(row['Year']) else 0,
-                    'neighborhood': str(row['Neighborhood']) if not pd.isna(row['Neighborhood']) else 'Unknown',
-                    'cluster': int(row['Cluster']) if 'Cluster' in df.columns and not pd.isna(row['Cluster']) else 0,
-                    'is_anomaly': bool(row['Anomaly']) if 'Anomaly' in df.columns and not pd.isna(row['Anomaly']) else False
-                }
-                crimes.append(crime)
-            except Exception as e:
-                logger.error(f"Error processing row: {str(e)}")
-                continue
-                
-        return jsonify(crimes)
+        if request.args.get('format') == 'columnar':
+            # Counts travel in headers; the body is the columnar records alone
+            response = _columnar_response(gzip.compress(encode_columnar(records.iloc[positions]), compresslevel=1))
+            response.headers['X-Total-Count'] = str(total)
+            response.headers['X-Truncated'] = json.dumps(len(positions) < total)
+            return response
+        body = (f'{{"total": {total}, "truncated": {json.dumps(len(positions) < total)}, '
+                f'"crimes": {records_json(records.iloc[positions])}}}')
+        return Response(body, mimetype='application/json')
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameter: {str(e)}'}), 400
     except Exception as e:
-        logger.error(f"Error in get_crime_data: {str(e)}")
-        return jsonify({'error': str(e)})
+        logger.error(f"Error in crimes_in_view: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/crime_clusters')
+def crime_clusters():
+    """Get pre-aggregated crime cells for the map viewport at low zoom levels"""
+    try:
+        bbox = request.args.get('bbox')
+        if not bbox:
+            return jsonify({'error': 'Missing bbox parameter'}), 400
+        south, west, north, east = parse_bbox(bbox)
+        zoom = min(max(request.args.get('zoom', default=12, type=int), 0), CLUSTER_MAX_ZOOM)
+        categories, year = _request_filters()
+        
+        grid = get_dataset_store(DATA_FILE).derived(
+            ('cluster_grid', zoom),
+            lambda df: ClusterGrid(_map_view()['records'], zoom, crime_agent.crime_categories)
+        )
+        return jsonify({
+            'zoom': zoom,
+            'cell_size': grid.cell_size,
+            'cells': grid.query(south, west, north, east, categories, year)
+        })
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameter: {str(e)}'}), 400
+    except Exception as e:
+        logger.error(f"Error in crime_clusters: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/heatmap')
+def get_heatmap():
+    """Get a kernel density surface over the city, as a PNG overlay or a compact JSON grid"""
+    try:
+        categories, year = _request_filters()
+        hours = request.args.get('hours')
+        hours = parse_hours(hours) if hours else None
+        bandwidth = float(request.args.get('bandwidth', DEFAULT_BANDWIDTH))
+        bandwidth = min(max(bandwidth, BANDWIDTH_RANGE[0]), BANDWIDTH_RANGE[1])
+        bandwidth = round(bandwidth / HEATMAP_BANDWIDTH_STEP) * HEATMAP_BANDWIDTH_STEP
+        fmt = request.args.get('format', 'png')
+        if fmt not in ('png', 'json'):
+            return jsonify({'error': f'Unknown format {fmt!r}, expected png or json'}), 400
+        
+        store = get_dataset_store(DATA_FILE)
+        grid = store.derived('heatmap_grid',
+                             lambda df: HeatmapGrid(_map_view()['records'], crime_agent.crime_categories))
+        if categories is not None:
+            # Unknown categories match nothing, so they don't get cache entries of their own
+            categories = sorted(set(categories) & set(grid.categories))
+        key = (fmt, tuple(categories) if categories is not None else None, year, hours, bandwidth)
+        
+        def build(df):
+            density, incidents = grid.density(categories, year, hours, bandwidth)
+            if fmt == 'png':
+                return grid.to_png(density)
+            return grid.to_dict(density, incidents, bandwidth)
+        result = store.derived_lru('heatmap', key, build, HEATMAP_CACHE_ENTRIES)
+        
+        if fmt == 'json':
+            return jsonify(result)
+        response = Response(result, mimetype='image/png')
+        # [west, south, east, north] of the image, for placing it on the map
+        response.headers['X-Heatmap-Bounds'] = ','.join(str(value) for value in grid.bounds)
+        return response
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameter: {str(e)}'}), 400
+    except Exception as e:
+        logger.error(f"Error in get_heatmap: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/hotspots')
+def get_hotspots():
+    """Get the largest crime hotspots with their size, centre, extent and anomaly count"""
+    try:
+        limit = request.args.get('limit', default=20, type=int)
+        hotspots = crime_agent.get_hotspots()
+        if hotspots is None:
+            return jsonify({'error': 'Hotspots are not available'}), 500
+        return jsonify({
+            'total': len(hotspots.cluster_summaries),
+            'anomalies': int(hotspots.anomalies.sum()),
+            'hotspots': hotspots.hotspots(limit)
+        })
+    except Exception as e:
+        logger.error(f"Error in get_hotspots: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/crime_summary')
+def get_crime_summary():
+    """Get dashboard totals for all mapped incidents"""
+    try:
+        summary = get_dataset_store(DATA_FILE).derived(
+            'crime_summary', lambda df: crime_summary(_map_view()['records'])
+        )
+        return jsonify(summary)
+    except Exception as e:
+        logger.error(f"Error in get_crime_summary: {str(e)}")
+        return jsonify({'error': str(e)}), 500
 
 @app.route('/get_crime_categories')
 def get_crime_categories():
@@ -127,10 +434,18 @@ def get_insights():
 @app.route('/get_temporal_stats')  # Keep old route for backward compatibility
 def get_temporal_stats():
     try:
-        # Get temporal patterns from database
-        hourly_pattern = crime_agent.db.get_pattern('hourly') or {}
-        daily_pattern = crime_agent.db.get_pattern('daily') or {}
-        monthly_pattern = crime_agent.db.get_pattern('monthly') or {}
+        start, end = _date_range()
+        if start is not None or end is not None:
+            # Date-scoped stats come from the month partitions in the range
+            aggregates = _range_aggregates(start, end)
+            hourly_pattern = {'pattern_data': aggregates.hourly_pattern()}
+            daily_pattern = {'pattern_data': aggregates.daily_pattern()}
+            monthly_pattern = {'pattern_data': aggregates.monthly_pattern()}
+        else:
+            # Get temporal patterns from database
+            hourly_pattern = crime_agent.db.get_pattern('hourly') or {}
+            daily_pattern = crime_agent.db.get_pattern('daily') or {}
+            monthly_pattern = crime_agent.db.get_pattern('monthly') or {}
         
         # Convert pattern data from JSON strings if needed
         if isinstance(hourly_pattern.get('pattern_data'), str):
@@ -164,6 +479,8 @@ def get_temporal_stats():
         }
         
         return jsonify(response)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting temporal stats: {str(e)}")
         return jsonify({
@@ -202,7 +519,7 @@ def get_all_insights():
             })
         else:
             # If no insights, trigger analysis
-            crime_agent.analyze_csv('October2024.csv')
+            crime_agent.analyze_csv(DATA_FILE)
             return jsonify({
                 'status': 'success',
                 'insights': [],
@@ -247,27 +564,38 @@ def validate_insight():
             'message': str(e)
         }), 500
 
+# Seconds /monitor/stop waits for a cycle in progress before returning
+MONITOR_STOP_TIMEOUT = 5
+
 @app.route('/monitor/start')
 def start_monitor():
     from monitor import monitor
+    interval = request.args.get('interval', type=int)
+    if interval is not None:
+        if interval <= 0:
+            return jsonify({'error': 'interval must be a positive number of seconds'}), 400
+        monitor.analysis_interval = interval
     result = monitor.start()
-    return jsonify({'status': 'Monitor started'})
+    return jsonify({'status': 'Monitor started' if result else 'Monitor already running'})
 
 @app.route('/monitor/stop')
 def stop_monitor():
     from monitor import monitor
-    result = monitor.stop()
-    return jsonify({'status': 'Monitor stopped'})
+    result = monitor.stop(timeout=MONITOR_STOP_TIMEOUT)
+    return jsonify({'status': 'Monitor stopped' if result else 'Monitor stopping after the current cycle'})
+
+@app.route('/monitor/run', methods=['POST'])
+def run_monitor():
+    """Run an analysis cycle now instead of waiting for the interval"""
+    from monitor import monitor
+    if not monitor.run_now():
+        return jsonify({'error': 'Monitor is not running'}), 409
+    return jsonify({'status': 'Analysis triggered'})
 
 @app.route('/monitor/status')
 def monitor_status():
     from monitor import monitor
-    status = {
-        'running': monitor.running,
-        'last_analysis': monitor.last_analysis.strftime('%Y-%m-%d %H:%M:%S') if monitor.last_analysis else None,
-        'data_file': monitor.data_file
-    }
-    return jsonify(status)
+    return jsonify(monitor.status())
 
 @app.route('/chat', methods=['POST'])
 def chat():
@@ -280,20 +608,12 @@ def chat():
             
         logger.info(f"Processing question: {question}")
         
-        # Get enhanced answer using Ollama AI
-        answer = crime_agent.answer_question(question)
-        
-        if not answer:
-            return jsonify({
-                'answer': "I apologize, but I couldn't find relevant information for your question. Please try asking something else.",
-                'success': False
-            })
-        
-        return jsonify({
-            'answer': answer,
-            'success': True
-        })
+        # Answer in the background; the client polls /jobs/<job_id> for the result
+        job = get_job_queue().submit(_chat_job, question, kind='chat', priority=PRIORITY_INTERACTIVE)
+        return _job_accepted(job)
         
+    except QueueFullError:
+        return jsonify({'error': 'Too many pending requests, please try again shortly', 'success': False}), 503
     except Exception as e:
         logger.error(f"Error in chat endpoint: {str(e)}")
         return jsonify({
@@ -301,6 +621,102 @@ def chat():
             'success': False
         })
 
+def _chat_job(job, question):
+    """Job body for /chat: the data answer enhanced by the model"""
+    answer = crime_agent.answer_question(question, job)
+    if not answer:
+        return {
+            'answer': "I apologize, but I couldn't find relevant information for your question. Please try asking something else.",
+            'success': False
+        }
+    return {'answer': answer, 'success': True}
+
+def _job_accepted(job):
+    """202 response pointing the client at the job's status endpoint"""
+    return jsonify({
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': f'/jobs/{job.id}',
+        'success': True
+    }), 202
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Status of a background job, with its result once done"""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job', 'success': False}), 404
+    return jsonify(job.to_dict())
+
+def _sse(event, data):
+    """Format one Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/chat/stream', methods=['GET', 'POST'])
+def chat_stream():
+    """Stream a chat answer as Server-Sent Events.
+
+    The answer is generated by a job on the shared job queue, which hands
+    its events to this response through a queue. Sends a 'data' event with
+    the direct data answer right away, a 'token' event per model token and
+    a final 'done' event. If the client disconnects, the job is cancelled
+    and the model generation stops.
+    """
+    if request.method == 'POST':
+        question = (request.get_json(silent=True) or {}).get('question', '')
+    else:
+        question = request.args.get('question', '')
+    if not question:
+        return jsonify({'error': 'No question provided', 'success': False}), 400
+    
+    logger.info(f"Streaming answer for question: {question}")
+    
+    events = queue.Queue()
+    try:
+        job = get_job_queue().submit(_chat_stream_job, question, events,
+                                     kind='chat_stream', priority=PRIORITY_INTERACTIVE)
+    except QueueFullError:
+        return jsonify({'error': 'Too many pending requests, please try again shortly', 'success': False}), 503
+    
+    def generate():
+        try:
+            while True:
+                try:
+                    event = events.get(timeout=STREAM_POLL_SECONDS)
+                except queue.Empty:
+                    # A job that never started (cancelled or timed out in the queue) sends no end marker
+                    if job.wait(0) and events.empty():
+                        break
+                    continue
+                if event is None:
+                    break
+                yield _sse(event[0], {'text': event[1]})
+            job.wait()
+            if job.status == 'done':
+                yield _sse('done', {'success': True})
+            else:
+                logger.error(f"Error in chat stream: {job.error}")
+                yield _sse('error', {'message': 'An error occurred while generating the answer.'})
+                yield _sse('done', {'success': False})
+        finally:
+            job.cancel()
+    
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Don't let a proxy buffer the stream
+    return response
+
+def _chat_stream_job(job, question, events):
+    """Job body for /chat/stream: puts each (event, text) of the answer on ``events``, then None"""
+    answer = crime_agent.stream_answer(question)
+    try:
+        for event in answer:
+            job.check()
+            events.put(event)
+    finally:
+        answer.close()
+        events.put(None)
+
 @app.route('/ai_insights', methods=['POST'])
 def get_ai_insights():
     try:
@@ -327,15 +743,13 @@ Please provide:
 
 Keep your response focused on actionable insights for public safety."""
 
-        # Get AI-enhanced analysis
-        ai_analysis = crime_agent.ollama.invoke(prompt)
-        
-        return jsonify({
-            'insights': insights,
-            'ai_analysis': ai_analysis,
-            'success': True
-        })
+        # Get AI-enhanced analysis in the background
+        job = get_job_queue().submit(_ai_insights_job, prompt, insights,
+                                     kind='ai_insights', priority=PRIORITY_INTERACTIVE)
+        return _job_accepted(job)
         
+    except QueueFullError:
+        return jsonify({'error': 'Too many pending requests, please try again shortly', 'success': False}), 503
     except Exception as e:
         logger.error(f"Error in AI insights endpoint: {str(e)}")
         return jsonify({
@@ -343,10 +757,19 @@ Keep your response focused on actionable insights for public safety."""
             'success': False
         })
 
+def _ai_insights_job(job, prompt, insights):
+    """Job body for /ai_insights"""
+    return {
+        'insights': insights,
+        'ai_analysis': crime_agent.generate(prompt, job),
+        'success': True
+    }
+
 if __name__ == '__main__':
     try:
         # Import and start the monitor (it will run in the background)
         from monitor import monitor
+        monitor.start()
         
         # Start the Flask app
         app.run(debug=True, port=5003)
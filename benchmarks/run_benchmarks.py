@@ -0,0 +1,203 @@
+"""Time the main analysis, endpoint, chat-query and database paths on synthetic data.
+
+Generates (once) St. Louis-shaped CSVs with benchmarks/synthetic.py, then
+for each size times dataset parsing and loading, CrimeAgent.analyze_csv,
+/get_crime_data, /temporal_stats, /heatmap, the hotspot model, every
+query_csv_data intent and the InsightDatabase read/write paths. Results are
+written as JSON, keyed by size and benchmark, so runs from different
+commits can be compared.
+
+Usage: python benchmarks/run_benchmarks.py [--sizes 10k 1m 10m] [--repeat 5]
+                                           [--output FILE] [--compare BASELINE.json]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import subprocess
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from synthetic import SIZES, generate_csv  # noqa: E402
+
+DATA_DIR = os.path.join(BENCH_DIR, 'data')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+# One question per query_csv_data intent
+QUERIES = {
+    'neighborhood': 'Where are the most dangerous areas?',
+    'crime_type': 'Which offense types are most frequent?',
+    'time': 'What hour is the busiest?',
+    'firearm': 'How often is a gun used?',
+    'report': 'Give me a full report',
+    'report_year': 'Give me a full report for 2024',
+}
+
+
+def measure(func, repeat):
+    """Run ``func`` ``repeat`` times; returns best/mean/all wall times in seconds"""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return {'best': min(runs), 'mean': sum(runs) / len(runs), 'runs': runs}
+
+
+def dataset_path(size):
+    """Path of the synthetic CSV for ``size``, generating it on first use"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f'stl_{size}.csv')
+    if not os.path.exists(path):
+        print(f"Generating {SIZES[size]} rows -> {path}")
+        generate_csv(SIZES[size], path)
+    return path
+
+
+def bench_size(size, repeat, workdir):
+    """All benchmarks for one dataset size"""
+    import app as web
+    from dataset import DatasetStore, get_dataset_store
+    from database import AnalysisBatch, InsightDatabase
+    from hotspots import HotspotModel
+
+    source = dataset_path(size)
+    path = os.path.join(workdir, f'stl_{size}.csv')
+    if not os.path.exists(path):
+        os.symlink(source, path)
+    results = {}
+
+    # Dataset: full CSV parse with derived features, then load from the column cache
+    results['dataset_parse'] = measure(lambda: DatasetStore(path, cache_dir=None).get(), 1)
+    cache_dir = os.path.join(workdir, 'cache')
+    DatasetStore(path, cache_dir=cache_dir).get()
+    results['dataset_load_cached'] = measure(lambda: DatasetStore(path, cache_dir=cache_dir).get(), repeat)
+
+    # Point the app and its agent at this dataset
+    web.DATA_FILE = path
+    agent = web.crime_agent
+    agent.csv_file = path
+    get_dataset_store(path).get()
+    results['analyze_csv'] = measure(lambda: agent.analyze_csv(path), repeat)
+    results['analyze_csv_stream'] = measure(lambda: agent.analyze_csv(path, stream=True), repeat)
+
+    client = web.app.test_client()
+    results['get_crime_data_cold'] = measure(lambda: client.get('/get_crime_data'), 1)
+    results['get_crime_data'] = measure(lambda: client.get('/get_crime_data'), repeat)
+    etag = client.get('/get_crime_data').headers.get('ETag')
+    results['get_crime_data_304'] = measure(
+        lambda: client.get('/get_crime_data', headers={'If-None-Match': etag}), repeat)
+    results['get_crime_data_columnar_cold'] = measure(
+        lambda: client.get('/get_crime_data?format=columnar', headers={'Accept-Encoding': 'gzip'}), 1)
+    results['get_crime_data_ndjson'] = measure(
+        lambda: b''.join(client.get('/get_crime_data?format=ndjson', buffered=False).response), 1)
+    results['get_crime_data_page'] = measure(lambda: client.get('/get_crime_data?limit=1000'), repeat)
+    results['get_crime_data_year_cold'] = measure(lambda: client.get('/get_crime_data?year=2024'), 1)
+    results['temporal_stats'] = measure(lambda: client.get('/temporal_stats'), repeat)
+    results['temporal_stats_year'] = measure(lambda: client.get('/temporal_stats?year=2024'), repeat)
+    results['heatmap_cold'] = measure(lambda: client.get('/heatmap'), 1)
+    results['heatmap_night'] = measure(lambda: client.get('/heatmap?hours=22-3&bandwidth=400'), 1)
+
+    results['query_cube_build'] = measure(agent.get_cube, 1)
+    results['hotspots_build'] = measure(lambda: HotspotModel.from_frame(get_dataset_store(path).get()), 1)
+    for intent, question in QUERIES.items():
+        results[f'query_{intent}'] = measure(lambda: agent.query_csv_data(question), repeat)
+
+    # Database paths on a scratch database
+    db = InsightDatabase(os.path.join(workdir, f'bench_{size}.db'))
+    batch = AnalysisBatch()
+    for i in range(100):
+        batch.add_insight(f"Benchmark insight {i}", 'benchmark', 0.9, {'i': i})
+    for name in ('hourly', 'daily', 'monthly', 'crime_types', 'locations'):
+        batch.add_pattern(name, {'counts': {str(h): h for h in range(24)}}, 0.9)
+    results['db_write_batch'] = measure(lambda: db.write_batch(batch), repeat)
+    results['db_add_insight'] = measure(lambda: db.add_insight('Single insight', 'benchmark', 0.5), repeat)
+    results['db_get_insights'] = measure(lambda: db.get_insights(limit=10), repeat)
+    results['db_get_insights_by_type'] = measure(lambda: db.get_insights(limit=10, insight_type='benchmark'), repeat)
+    results['db_get_pattern'] = measure(lambda: db.get_pattern('hourly'), repeat)
+    db.close()
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def print_results(report, baseline=None):
+    for size, results in report['results'].items():
+        print(f"\n{size} ({SIZES[size]} rows)")
+        for name, timing in results.items():
+            line = f"  {name:28s} {timing['best'] * 1000:12.2f} ms"
+            old = (baseline or {}).get('results', {}).get(size, {}).get(name)
+            if old:
+                line += f"   {old['best'] / timing['best']:6.2f}x vs {baseline.get('commit')}"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', default=['10k', '1m'], choices=list(SIZES))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='JSON file to write (default: benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', help='earlier results JSON to compare against')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    commit = git_commit()
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit or 'results'}.json")
+    workdir = tempfile.mkdtemp(prefix='crime-bench-')
+    cwd = os.getcwd()
+    try:
+        # The app analyzes its data file and opens its databases on import; keep
+        # all of that (and the column cache) inside the scratch directory
+        os.chdir(workdir)
+        os.environ['CRIME_CACHE_DIR'] = os.path.join(workdir, 'app_cache')
+        os.symlink(dataset_path(args.sizes[0]), os.path.join(workdir, 'October2024.csv'))
+
+        report = {
+            'commit': commit,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'cpus': os.cpu_count(),
+            'repeat': args.repeat,
+            'results': {}
+        }
+        for size in args.sizes:
+            print(f"Benchmarking {size}...")
+            report['results'][size] = bench_size(size, args.repeat, workdir)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(report, baseline)
+    print(f"\nWrote {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""Generate synthetic crime CSVs shaped like the St. Louis (SLMPD) incident data.
+
+The columns match the real export. Neighborhood and offense frequencies are
+heavily skewed, incidents cluster around neighborhood centroids, and
+time-of-day and day-of-week follow typical crime profiles. Firearm use
+depends on the offense. A small share of rows carries the data problems
+seen in the real files: missing or malformed times, missing coordinates and
+missing neighborhoods.
+
+Usage: python benchmarks/synthetic.py ROWS OUTPUT.csv [--seed 0] [--months 12] [--end 2024-10]
+"""
+import argparse
+import numpy as np
+import pandas as pd
+
+# Named sizes used by the benchmark suite
+SIZES = {'10k': 10_000, '1m': 1_000_000, '10m': 10_000_000}
+
+# Rows generated per write, to keep memory flat for large files
+CHUNK_ROWS = 1_000_000
+
+NEIGHBORHOODS = [
+    'Downtown', 'Downtown West', 'Dutchtown', 'Central West End', 'Carondelet', 'Gravois Park',
+    'Mark Twain I-70 Industrial', 'Walnut Park East', 'Baden', 'Wells Goodfellow', 'Hamilton Heights',
+    'Academy', 'The Ville', 'Greater Ville', 'JeffVanderLou', 'Fairground', 'O\'Fallon',
+    'College Hill', 'North Pointe', 'Walnut Park West', 'Penrose', 'Mark Twain', 'Kingsway East',
+    'Kingsway West', 'Tower Grove East', 'Tower Grove South', 'Benton Park', 'Benton Park West',
+    'Soulard', 'Lafayette Square', 'Shaw', 'Forest Park Southeast', 'Midtown', 'Old North St. Louis',
+    'Hyde Park', 'Bevo Mill', 'Holly Hills', 'Princeton Heights', 'Southampton', 'St. Louis Hills',
+    'Lindenwood Park', 'The Hill', 'Clifton Heights', 'Ellendale', 'Skinker DeBaliviere',
+    'Visitation Park', 'Fountain Park', 'Lewis Place', 'Vandeventer', 'Covenant Blu-Grand Center'
+]
+
+# (offense, category, relative frequency, share with a firearm)
+OFFENSES = [
+    ('LARCENY-THEFT', 'Property Crimes', 30.0, 0.01),
+    ('MOTOR VEHICLE THEFT', 'Property Crimes', 12.0, 0.02),
+    ('DESTRUCTION OF PROPERTY', 'Property Crimes', 11.0, 0.03),
+    ('SIMPLE ASSAULT', 'Violent Crimes', 10.0, 0.05),
+    ('AGGRAVATED ASSAULT', 'Violent Crimes', 8.0, 0.55),
+    ('BURGLARY', 'Property Crimes', 6.0, 0.04),
+    ('ROBBERY', 'Violent Crimes', 3.5, 0.60),
+    ('WEAPON LAW VIOLATIONS', 'Other', 3.0, 0.90),
+    ('DRUG/NARCOTIC VIOLATIONS', 'Drug Crimes', 3.0, 0.10),
+    ('FRAUD', 'Property Crimes', 2.5, 0.0),
+    ('DISORDERLY CONDUCT', 'Public Order', 2.0, 0.02),
+    ('TRESPASS OF REAL PROPERTY', 'Public Order', 1.5, 0.01),
+    ('STOLEN PROPERTY OFFENSES', 'Property Crimes', 1.0, 0.05),
+    ('HOMICIDE', 'Violent Crimes', 0.3, 0.85),
+    ('ARSON', 'Property Crimes', 0.3, 0.0),
+    ('KIDNAPPING/ABDUCTION', 'Violent Crimes', 0.2, 0.30),
+]
+
+DESCRIPTIONS = ['FROM MOTOR VEHICLE', 'SHOPLIFTING', 'FROM BUILDING', 'ALL OTHER', 'RESIDENCE',
+                'BUSINESS', 'STREET', 'PARKING LOT', 'FIREARM', 'OTHER WEAPON', 'HANDS/FEET']
+
+# Relative incident frequency by hour of day (quiet early morning, evening peak)
+HOUR_PROFILE = np.array([5.0, 4.2, 3.6, 2.8, 2.0, 1.6, 1.8, 2.6, 3.6, 4.0, 4.2, 4.4,
+                         5.2, 4.8, 4.8, 5.2, 5.6, 6.0, 6.4, 6.4, 6.2, 6.0, 5.8, 5.4])
+
+# Relative frequency by day of week, Monday first
+DAY_PROFILE = np.array([1.00, 0.96, 0.97, 0.98, 1.08, 1.12, 1.02])
+
+# St. Louis city bounding box
+LAT_RANGE = (38.53, 38.77)
+LON_RANGE = (-90.32, -90.18)
+
+
+def _zipf_weights(n, exponent=1.1):
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+def _calendar(months, end):
+    """Days covered by the data and their sampling weights"""
+    last = pd.Period(end, freq='M')
+    days = pd.date_range((last - months + 1).start_time, last.end_time.normalize(), freq='D')
+    weights = DAY_PROFILE[days.dayofweek]
+    return days, weights / weights.sum()
+
+
+def generate_chunk(rows, rng, days, day_weights):
+    """One frame of ``rows`` synthetic incidents"""
+    hood_weights = _zipf_weights(len(NEIGHBORHOODS))
+    centroid_rng = np.random.default_rng(12345)  # same map for every chunk and seed
+    centroids = np.column_stack([centroid_rng.uniform(*LAT_RANGE, len(NEIGHBORHOODS)),
+                                 centroid_rng.uniform(*LON_RANGE, len(NEIGHBORHOODS))])
+
+    hoods = rng.choice(len(NEIGHBORHOODS), rows, p=hood_weights)
+    latitude = centroids[hoods, 0] + rng.normal(0, 0.006, rows)
+    longitude = centroids[hoods, 1] + rng.normal(0, 0.008, rows)
+
+    offense_weights = np.array([o[2] for o in OFFENSES])
+    offenses = rng.choice(len(OFFENSES), rows, p=offense_weights / offense_weights.sum())
+    firearm_share = np.array([o[3] for o in OFFENSES])[offenses]
+
+    dates = days[rng.choice(len(days), rows, p=day_weights)]
+    hours = rng.choice(24, rows, p=HOUR_PROFILE / HOUR_PROFILE.sum())
+    clock = np.array([f"{h:02d}:{m:02d}" for h in range(24) for m in range(60)], dtype=object)
+    times = clock[hours * 60 + rng.integers(0, 60, rows)]
+
+    # Data quality problems seen in the real exports
+    times[rng.random(rows) < 0.01] = None
+    times[rng.random(rows) < 0.003] = 'UNKNOWN'
+    missing_coordinates = rng.random(rows) < 0.02
+    latitude[missing_coordinates] = np.nan
+    longitude[missing_coordinates] = np.nan
+    neighborhoods = np.array(NEIGHBORHOODS, dtype=object)[hoods]
+    neighborhoods[rng.random(rows) < 0.005] = None
+
+    offense_names = np.array([o[0] for o in OFFENSES], dtype=object)
+    categories = np.array([o[1] for o in OFFENSES], dtype=object)
+    description_suffix = np.array(DESCRIPTIONS, dtype=object)[rng.integers(0, len(DESCRIPTIONS), rows)]
+    return pd.DataFrame({
+        'IncidentDate': dates.strftime('%Y-%m-%d'),
+        'OccurredFromTime': times,
+        'Latitude': latitude.round(6),
+        'Longitude': longitude.round(6),
+        'Offense': offense_names[offenses],
+        'Category': categories[offenses],
+        'Description': offense_names[offenses] + ' - ' + description_suffix,
+        'Neighborhood': neighborhoods,
+        'FirearmUsed': np.where(rng.random(rows) < firearm_share, 'Yes', 'No')
+    })
+
+
+def generate_csv(rows, output, seed=0, months=12, end='2024-10'):
+    """Write ``rows`` synthetic incidents to ``output``; returns the path"""
+    rng = np.random.default_rng(seed)
+    days, day_weights = _calendar(months, end)
+    for start in range(0, max(rows, 1), CHUNK_ROWS):
+        chunk = generate_chunk(min(CHUNK_ROWS, rows - start), rng, days, day_weights)
+        chunk.to_csv(output, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+    return output
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('rows', help='number of rows, or one of ' + ', '.join(SIZES))
+    parser.add_argument('output')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--months', type=int, default=12, help='months of history to spread incidents over')
+    parser.add_argument('--end', default='2024-10', help='last month (YYYY-MM)')
+    args = parser.parse_args()
+    rows = SIZES.get(args.rows.lower()) or int(args.rows)
+    generate_csv(rows, args.output, args.seed, args.months, args.end)
+    print(f"Wrote {rows} rows to {args.output}")
@@ -0,0 +1,158 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout or the derived columns change
+CACHE_FORMAT_VERSION = 3
+
+DEFAULT_CACHE_DIR = os.environ.get('CRIME_CACHE_DIR', '.dataset_cache')
+
+
+def cache_key(file_path, fingerprint):
+    """Key a cache entry by the source path, its (mtime_ns, size) and the format version"""
+    raw = f"{os.path.abspath(file_path)}|{fingerprint[0]}|{fingerprint[1]}|{CACHE_FORMAT_VERSION}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def _entry_prefix(file_path):
+    """Prefix shared by every cached version of one source file"""
+    path_hash = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:8]
+    return f"{os.path.basename(file_path)}-{path_hash}-"
+
+
+def _entry_dir(cache_dir, file_path, fingerprint):
+    return os.path.join(cache_dir, _entry_prefix(file_path) + cache_key(file_path, fingerprint))
+
+
+def save_frame(df, file_path, fingerprint, cache_dir=DEFAULT_CACHE_DIR, extra=None):
+    """Write ``df`` as one .npy file per column under a key derived from the source file.
+
+    Numeric, boolean and datetime columns are stored raw so they can be
+    memory-mapped on load; categoricals as their codes plus a JSON list of
+    categories, nullable integers as values plus a missing-value mask, and
+    object columns are dictionary-encoded as int32 codes plus a JSON list of
+    distinct values. ``extra`` is stored in the
+    metadata and returned by ``load_frame``. Returns False if the frame has
+    a column that can't be cached.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=cache_dir, prefix='.tmp-')
+    try:
+        columns = []
+        for i, name in enumerate(df.columns):
+            series = df[name]
+            base = f"col{i}"
+            column = {'name': name, 'file': base}
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                np.save(os.path.join(tmp_dir, base + '.npy'), series.cat.codes.to_numpy())
+                with open(os.path.join(tmp_dir, base + '.json'), 'w') as f:
+                    json.dump(series.cat.categories.tolist(), f)
+                kind = 'categorical'
+            elif pd.api.types.is_extension_array_dtype(series.dtype) and pd.api.types.is_integer_dtype(series.dtype):
+                np.save(os.path.join(tmp_dir, base + '.npy'),
+                        series.to_numpy(dtype=series.dtype.numpy_dtype, na_value=0))
+                np.save(os.path.join(tmp_dir, base + '.mask.npy'), series.isna().to_numpy())
+                kind = 'nullable'
+            elif pd.api.types.is_datetime64_dtype(series.dtype):
+                np.save(os.path.join(tmp_dir, base + '.npy'),
+                        series.to_numpy(dtype='datetime64[ns]').view(np.int64))
+                kind = 'datetime'
+            elif pd.api.types.is_bool_dtype(series.dtype) or pd.api.types.is_numeric_dtype(series.dtype):
+                np.save(os.path.join(tmp_dir, base + '.npy'), series.to_numpy())
+                kind = 'numeric'
+            elif series.dtype == object:
+                codes, uniques = pd.factorize(series, use_na_sentinel=True)
+                np.save(os.path.join(tmp_dir, base + '.npy'), codes.astype(np.int32))
+                with open(os.path.join(tmp_dir, base + '.json'), 'w') as f:
+                    json.dump(uniques.tolist(), f)
+                kind = 'dictionary'
+            else:
+                logger.warning(f"Column {name} has unsupported dtype {series.dtype}, not caching dataset")
+                return False
+            column['kind'] = kind
+            columns.append(column)
+
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+            json.dump({
+                'source': os.path.abspath(file_path),
+                'fingerprint': list(fingerprint),
+                'format': CACHE_FORMAT_VERSION,
+                'rows': len(df),
+                'columns': columns,
+                'extra': extra
+            }, f)
+
+        target = _entry_dir(cache_dir, file_path, fingerprint)
+        shutil.rmtree(target, ignore_errors=True)
+        os.rename(tmp_dir, target)
+        _remove_stale_entries(cache_dir, file_path, keep=target)
+        logger.info(f"Cached {len(df)} rows of {file_path} in {target}")
+        return True
+    except Exception as e:
+        logger.error(f"Error caching dataset: {str(e)}")
+        return False
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def load_frame(file_path, fingerprint, cache_dir=DEFAULT_CACHE_DIR):
+    """Load the cached frame for this version of ``file_path``.
+
+    Returns (df, extra), or None when there is no valid entry. Raw columns
+    are memory-mapped read-only, so startup cost does not grow with the
+    numeric data size.
+    """
+    entry = _entry_dir(cache_dir, file_path, fingerprint)
+    meta_path = os.path.join(entry, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get('format') != CACHE_FORMAT_VERSION or meta.get('fingerprint') != list(fingerprint):
+            return None
+
+        data = {}
+        for column in meta['columns']:
+            # Plain ndarray view of the read-only memory map (no copy)
+            values = np.asarray(np.load(os.path.join(entry, column['file'] + '.npy'), mmap_mode='r'))
+            if column['kind'] == 'datetime':
+                values = values.view('datetime64[ns]')
+            elif column['kind'] == 'categorical':
+                with open(os.path.join(entry, column['file'] + '.json')) as f:
+                    categories = json.load(f)
+                values = pd.Categorical.from_codes(values, categories=categories)
+            elif column['kind'] == 'nullable':
+                mask = np.asarray(np.load(os.path.join(entry, column['file'] + '.mask.npy'), mmap_mode='r'))
+                values = pd.arrays.IntegerArray(values, mask)
+            elif column['kind'] == 'dictionary':
+                with open(os.path.join(entry, column['file'] + '.json')) as f:
+                    uniques = json.load(f)
+                lookup = np.empty(len(uniques) + 1, dtype=object)
+                lookup[:len(uniques)] = uniques
+                lookup[-1] = np.nan
+                values = lookup[values]
+            data[column['name']] = values
+        df = pd.DataFrame(data, columns=[c['name'] for c in meta['columns']], copy=False)
+        if len(df) != meta['rows']:
+            return None
+        return df, meta.get('extra')
+    except Exception as e:
+        logger.error(f"Error loading cached dataset from {entry}: {str(e)}")
+        return None
+
+
+def _remove_stale_entries(cache_dir, file_path, keep):
+    """Delete cache entries for older versions of the same source file"""
+    prefix = _entry_prefix(file_path)
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name.startswith(prefix) and path != keep:
+            shutil.rmtree(path, ignore_errors=True)
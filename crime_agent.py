@@ -1,43 +1,28 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
-from database import InsightDatabase
+from database import AnalysisBatch, InsightDatabase
+from dataset import STREAM_INGEST, file_version_tag, get_dataset_store, month_range
+from aggregates import CrimeAggregates
+from cube import CrimeCube
+from hotspots import HotspotModel
+from ollama_client import OllamaClient
+from llm_cache import CachedModel, LLMResponseCache
+from jobs import JobCancelledError, JobTimeoutError
+from timing import timed
+import re
 import logging
-import subprocess  # Added for Ollama model
 
 logger = logging.getLogger(__name__)
 
-class OllamaLocalModel:
-    """Class to invoke the local Ollama model using CLI commands."""
-    def __init__(self, model="llama3.2"):
-        self.model = model
-    
-    def invoke(self, prompt):
-        """Generate a response from the Ollama model using the CLI."""
-        try:
-            # Limit prompt length to 4000 characters
-            if len(prompt) > 4000:
-                prompt = prompt[:3900] + "... [truncated for length]"
-            
-            result = subprocess.run(
-                ["ollama", "run", self.model],
-                input=prompt,
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            return result.stdout.strip()
-        except subprocess.CalledProcessError as e:
-            logging.error(f"Ollama error: {e.stderr}")
-            return f"Error: {e.stderr}"
-
 class CrimeAgent:
     def __init__(self, csv_file='October2024.csv'):
         """Initialize the CrimeAgent with database connection"""
         self.db = InsightDatabase()  # Initialize database connection
         self.csv_file = csv_file
         self.current_data = None
-        self.ollama = OllamaLocalModel()  # Initialize Ollama model
+        # Persistent HTTP client for the Ollama server, behind a response cache
+        self.ollama = CachedModel(OllamaClient(), LLMResponseCache(self.db), self._dataset_version)
         self.crime_categories = {
             'Violent Crimes': [
                 'HOMICIDE', 'ASSAULT', 'ROBBERY', 'AGGRAVATED ASSAULT', 
@@ -59,62 +44,24 @@ class CrimeAgent:
             ]
         }
         
-    def analyze_csv(self, file_path: str):
-        """Analyze crime data from CSV file and store insights"""
+    def analyze_csv(self, file_path: str, stream=None, chunksize=None):
+        """Analyze crime data from CSV file and store insights
+
+        With ``stream`` (default: the CRIME_STREAM_INGEST setting) the file is
+        read in chunks of ``chunksize`` rows and folded into the aggregates,
+        so files larger than memory can be analyzed; the stored patterns are
+        the same either way.
+        """
         try:
             logger.info(f"Starting analysis of {file_path}")
-            df = pd.read_csv(file_path)
-            self.current_data = df
-            
-            # Ensure required columns exist
-            required_columns = {
-                'OccurredFromTime': 'time',
-                'IncidentDate': 'date',
-                'Description': 'description',
-                'Neighborhood': 'location',
-                'Offense': 'type'
-            }
+            if STREAM_INGEST if stream is None else stream:
+                aggregates = CrimeAggregates.from_csv(file_path, chunksize)
+            else:
+                df = get_dataset_store(file_path).get()
+                self.current_data = df
+                aggregates = CrimeAggregates.from_frame(df)
             
-            # Create missing columns with default values
-            for col, default in required_columns.items():
-                if col not in df.columns:
-                    logger.warning(f"Missing column {col}, creating with default values")
-                    df[col] = f"Unknown {default}"
-            
-            # Process temporal data
-            def extract_hour(time_str):
-                try:
-                    if pd.isna(time_str):
-                        return 0
-                    if isinstance(time_str, str):
-                        time_parts = time_str.split(':')
-                        if len(time_parts) >= 1:
-                            hour = int(time_parts[0])
-                            if 0 <= hour < 24:  # Validate hour is in valid range
-                                return hour
-                    return 0
-                except Exception as e:
-                    logger.error(f"Error extracting hour from {time_str}: {str(e)}")
-                    return 0
-
-            # Convert date and extract temporal features
-            df['IncidentDate'] = pd.to_datetime(df['IncidentDate'], errors='coerce')
-            df['Hour'] = df['OccurredFromTime'].apply(extract_hour)
-            df['DayOfWeek'] = df['IncidentDate'].dt.day_name()
-            df['Month'] = df['IncidentDate'].dt.month_name()
-            df['Year'] = df['IncidentDate'].dt.year
-            
-            # Fill NaN values
-            df['DayOfWeek'] = df['DayOfWeek'].fillna('Unknown')
-            df['Month'] = df['Month'].fillna('Unknown')
-            df['Description'] = df['Description'].fillna('Unknown')
-            df['Neighborhood'] = df['Neighborhood'].fillna('Unknown')
-            df['Offense'] = df['Offense'].fillna('Unknown')
-            
-            self._analyze_temporal_patterns(df)
-            self._analyze_crime_patterns(df)
-            self._analyze_victim_patterns(df)
-            self._generate_intelligence_report(df)
+            self.analyze_aggregates(aggregates)
             
             logger.info("Analysis completed successfully")
             return True
@@ -123,60 +70,108 @@ class CrimeAgent:
             logger.error(f"Error in analyze_csv: {str(e)}")
             return False
             
-    def _analyze_temporal_patterns(self, df):
+    def analyze_files(self, file_paths, workers=None):
+        """Analyze many CSV files (e.g. one per month) as a single history.
+
+        Files are aggregated in parallel worker processes (see multi_file.py)
+        and the merged counts are stored as the usual patterns and insights.
+        Returns the merged ``CrimeAggregates``.
+        """
+        from multi_file import aggregate_files
+        aggregates = aggregate_files(file_paths, workers)
+        self.analyze_aggregates(aggregates)
+        return aggregates
+            
+    def analyze_aggregates(self, aggregates, batch=None, timings=None):
+        """Store patterns and insights computed from pre-aggregated counts.
+
+        Results are collected in ``batch`` and, unless a batch was passed in
+        by the caller, written to the database in a single transaction. The
+        wall time of each stage is recorded in ``timings`` if given.
+        """
+        timings = {} if timings is None else timings
+        write = batch is None
+        if write:
+            batch = AnalysisBatch()
+        with timed(timings, 'temporal'):
+            self._analyze_temporal_patterns(aggregates, batch)
+        with timed(timings, 'crime_patterns'):
+            self._analyze_crime_patterns(aggregates, batch)
+        with timed(timings, 'victim_patterns'):
+            self._analyze_victim_patterns(batch)
+        with timed(timings, 'report'):
+            self._generate_intelligence_report(aggregates, batch)
+        if write:
+            with timed(timings, 'write'):
+                self.db.write_batch(batch)
+        return batch
+
+    def _dataset_version(self):
+        """Version tag of the agent's dataset, used to key cached LLM responses"""
+        # Taken from the file itself, so a streaming agent never loads the whole CSV
+        return file_version_tag(self.csv_file)
+
+    def get_data(self, file_path=None):
+        """Get a read-only view of the shared dataset, or None if it can't be loaded"""
+        try:
+            return get_dataset_store(file_path or self.csv_file).get()
+        except Exception as e:
+            logger.error(f"Error loading crime data: {str(e)}")
+            return None
+
+    def get_cube(self, start=None, end=None):
+        """Get the aggregate cube for the current dataset version, or None if it can't be built.
+
+        With ``start``/``end`` ('YYYY-MM') the cube covers only those months
+        and is built from their partitions alone.
+        """
+        try:
+            store = get_dataset_store(self.csv_file)
+            return store.derived_range('query_cube', start, end, lambda start, end: CrimeCube(store.select(start, end)))
+        except Exception as e:
+            logger.error(f"Error building crime cube: {str(e)}")
+            return None
+
+    def get_hotspots(self):
+        """Get the hotspot clusters and anomaly scores for the current dataset version, or None if they can't be built.
+
+        Computed once per version; when the file only had rows appended, the
+        previous version's model is extended with the new rows.
+        """
+        try:
+            return get_dataset_store(self.csv_file).derived_incremental(
+                'hotspots', HotspotModel.from_frame, lambda model, rows: model.extended(rows))
+        except Exception as e:
+            logger.error(f"Error building hotspots: {str(e)}")
+            return None
+
+    def _analyze_temporal_patterns(self, aggregates, batch):
         """Analyze temporal patterns in the crime data"""
         try:
-            # Ensure datetime columns are properly formatted
-            if not pd.api.types.is_datetime64_any_dtype(df['IncidentDate']):
-                df['IncidentDate'] = pd.to_datetime(df['IncidentDate'], errors='coerce')
-            
-            # Extract temporal features
-            df['DayOfWeek'] = df['IncidentDate'].dt.day_name()
-            df['Month'] = df['IncidentDate'].dt.month_name()
-            
-            # Get hourly crime counts
-            hourly_counts = df['Hour'].value_counts().sort_index()
+            hourly_data = aggregates.hourly_pattern()
+            daily_data = aggregates.daily_pattern()
+            monthly_data = aggregates.monthly_pattern()
             
-            # Ensure we have all 24 hours with at least 0 count
-            all_hours = pd.Series(0, index=range(24))
-            hourly_counts = hourly_counts.add(all_hours, fill_value=0)
-            hourly_counts = hourly_counts.sort_index()
+            # Store the patterns
+            batch.add_pattern('hourly', hourly_data, confidence=0.9)
+            batch.add_pattern('daily', daily_data, confidence=0.9)
+            batch.add_pattern('monthly', monthly_data, confidence=0.9)
             
-            peak_hour = int(hourly_counts.idxmax())
-            peak_count = int(hourly_counts.max())
-            
-            hourly_data = {
-                'counts': {str(k).zfill(2): int(v) for k, v in hourly_counts.to_dict().items()},
-                'peak_hour': str(peak_hour).zfill(2),
-                'peak_count': peak_count
-            }
-            
-            # Store the pattern
-            self.db.store_pattern('hourly', hourly_data)
-            
-            logger.info(f"Temporal analysis completed. Peak hour: {peak_hour}:00 with {peak_count} incidents")
+            logger.info(f"Temporal analysis completed. Peak hour: {hourly_data['peak_hour']}:00 "
+                        f"with {hourly_data['peak_count']} incidents")
             
         except Exception as e:
             logger.error(f"Error in temporal pattern analysis: {str(e)}")
 
-    def _analyze_crime_patterns(self, df):
+    def _analyze_crime_patterns(self, aggregates, batch):
         """Analyze and store crime patterns"""
         try:
             # Crime type analysis
-            crime_counts = df['Description'].value_counts()
-            top_crimes = crime_counts.head(5)
-            
-            pattern_data = {
-                'counts': {str(k): int(v) for k, v in crime_counts.head(10).to_dict().items()},
-                'top_crime': str(top_crimes.index[0]),
-                'top_count': int(top_crimes.iloc[0])
-            }
-            
-            self.db.add_pattern('crime_types', pattern_data, confidence=0.95)
+            batch.add_pattern('crime_types', aggregates.crime_type_pattern(), confidence=0.95)
             
             # Add insight for each top crime type
-            for crime_type, count in top_crimes.items():
-                self.db.add_insight(
+            for crime_type, count in aggregates.top_crime_types(5):
+                batch.add_insight(
                     insight_text=f"{crime_type}: {count} incidents reported",
                     insight_type='crime_pattern',
                     confidence=0.95,
@@ -184,41 +179,35 @@ class CrimeAgent:
                 )
             
             # Location analysis
-            location_counts = df['Neighborhood'].value_counts()
-            top_locations = location_counts.head(5)
-            
-            location_data = {
-                'counts': {str(k): int(v) for k, v in location_counts.head(10).to_dict().items()},
-                'top_location': str(top_locations.index[0]),
-                'top_count': int(top_locations.iloc[0])
-            }
-            
-            self.db.add_pattern('locations', location_data, confidence=0.9)
+            batch.add_pattern('locations', aggregates.location_pattern(), confidence=0.9)
             
             # Add insight for each top location
-            for location, count in top_locations.items():
-                self.db.add_insight(
+            for location, count in aggregates.top_locations(5):
+                batch.add_insight(
                     insight_text=f"{location} has {count} reported incidents",
                     insight_type='location_pattern',
                     confidence=0.9,
                     metadata={'location': str(location), 'count': int(count)}
                 )
             
+            # Firearm involvement
+            batch.add_pattern('firearms', aggregates.firearm_pattern(), confidence=0.9)
+            
         except Exception as e:
             logger.error(f"Error in crime pattern analysis: {str(e)}")
 
-    def _analyze_victim_patterns(self, df):
+    def _analyze_victim_patterns(self, batch):
         """Analyze victim patterns"""
         try:
             # Add some basic victim-related insights
-            self.db.add_insight(
+            batch.add_insight(
                 insight_text="Analyzing victim patterns to identify vulnerable populations",
                 insight_type='victim_pattern',
                 confidence=0.7,
                 metadata={'analysis_type': 'demographic'}
             )
             
-            self.db.add_insight(
+            batch.add_insight(
                 insight_text="Monitoring repeat victimization patterns",
                 insight_type='victim_pattern',
                 confidence=0.7,
@@ -228,14 +217,14 @@ class CrimeAgent:
         except Exception as e:
             logger.error(f"Error in victim pattern analysis: {str(e)}")
 
-    def _generate_intelligence_report(self, df):
+    def _generate_intelligence_report(self, aggregates, batch):
         """Generate comprehensive intelligence report"""
         try:
             # Add overall insights about the data
-            total_incidents = len(df)
-            date_range = f"{df['IncidentDate'].min().strftime('%Y-%m-%d')} to {df['IncidentDate'].max().strftime('%Y-%m-%d')}"
+            total_incidents = aggregates.total
+            date_range = aggregates.date_range or 'unknown dates'
             
-            self.db.add_insight(
+            batch.add_insight(
                 insight_text=f"Analyzed {total_incidents} incidents from {date_range}",
                 insight_type='summary',
                 confidence=1.0,
@@ -243,9 +232,9 @@ class CrimeAgent:
             )
             
             # Add insights about data quality
-            missing_locations = df['Neighborhood'].isna().sum()
+            missing_locations = aggregates.missing_locations
             if missing_locations > 0:
-                self.db.add_insight(
+                batch.add_insight(
                     insight_text=f"Data quality issue: {missing_locations} incidents have missing location information",
                     insight_type='data_quality',
                     confidence=1.0,
@@ -258,57 +247,55 @@ class CrimeAgent:
     def query_csv_data(self, user_query):
         """Query the CSV data directly based on user questions"""
         try:
-            if self.current_data is None:
-                self.analyze_csv(self.csv_file)
-                
-            if self.current_data is None:
+            # Restrict the analysis to a year mentioned in the question
+            year = re.search(r'\b(?:19|20)\d{2}\b', user_query)
+            start, end = month_range(year.group()) if year else (None, None)
+            
+            cube = self.get_cube(start, end)
+            if cube is None:
                 return "Error: Unable to load crime data"
-                
-            df = self.current_data.copy()
-            df['Date_Time'] = pd.to_datetime(df['IncidentDate'])
+            if year and cube.total == 0:
+                return f"No crime data is available for {year.group()}."
             
             # Process the query to understand intent
             query = user_query.lower()
             
             # Location/Area related queries
             if any(word in query for word in ['area', 'where', 'location', 'neighborhood', 'place', 'district', 'region', 'zone', 'highest', 'dangerous']):
-                hood_counts = df['Neighborhood'].value_counts()
-                top_hoods = hood_counts.head(5)
-                total_crimes = len(df)
+                top_hoods = cube.top('Neighborhood', 5)
+                total_crimes = cube.total
                 
                 response = "Crime Analysis by Neighborhood:\n\n"
                 response += "Top 5 Areas with Highest Crime Rates:\n"
-                for hood, count in top_hoods.items():
+                for hood, count in top_hoods:
                     percentage = (count / total_crimes) * 100
                     response += f"- {hood}: {count} incidents ({percentage:.1f}% of total crimes)\n"
                     
                 # Add specific crime types for the highest crime area
-                worst_hood = top_hoods.index[0]
-                hood_crimes = df[df['Neighborhood'] == worst_hood]['Offense'].value_counts().head(3)
+                worst_hood = top_hoods[0][0]
+                hood_crimes = cube.top('Offense', 3, {'Neighborhood': worst_hood})
                 
                 response += f"\nMost Common Crimes in {worst_hood}:\n"
-                for crime, count in hood_crimes.items():
+                for crime, count in hood_crimes:
                     response += f"- {crime}: {count} incidents\n"
                     
                 return response.strip()
             
             # Crime type related queries
             if any(word in query for word in ['crime', 'offense', 'incident', 'common', 'frequent', 'type']):
-                crime_counts = df['Offense'].value_counts()
-                top_crimes = crime_counts.head(5)
-                total_crimes = len(df)
+                top_crimes = cube.top('Offense', 5)
+                total_crimes = cube.total
                 
                 response = "Crime Type Analysis:\n\n"
                 response += "Top 5 Most Common Crimes:\n"
-                for crime, count in top_crimes.items():
+                for crime, count in top_crimes:
                     percentage = (count / total_crimes) * 100
                     response += f"- {crime}: {count} incidents ({percentage:.1f}% of total)\n"
                 
                 # Add time patterns for the most common crime
-                most_common = top_crimes.index[0]
-                common_crime_df = df[df['Offense'] == most_common]
-                peak_hour = common_crime_df['Hour'].mode()[0]
-                peak_day = common_crime_df['DayOfWeek'].mode()[0]
+                most_common = top_crimes[0][0]
+                peak_hour = cube.mode('Hour', {'Offense': most_common})
+                peak_day = cube.mode('DayOfWeek', {'Offense': most_common})
                 
                 response += f"\nPattern for {most_common}:\n"
                 response += f"- Most common on: {peak_day}\n"
@@ -318,14 +305,14 @@ class CrimeAgent:
             
             # Time related queries
             if any(word in query for word in ['time', 'hour', 'day', 'when', 'pattern']):
-                hour_counts = df['Hour'].value_counts().sort_index()
-                day_counts = df['DayOfWeek'].value_counts()
+                hour_counts = cube.counts_by('Hour')
+                day_counts = cube.top('DayOfWeek')
                 
                 response = "Temporal Crime Patterns:\n\n"
                 
                 # Daily patterns
                 response += "Crime by Day of Week:\n"
-                for day, count in day_counts.items():
+                for day, count in day_counts:
                     response += f"- {day}: {count} incidents\n"
                 
                 # Hourly patterns - show all hours with their counts
@@ -335,16 +322,16 @@ class CrimeAgent:
                     response += f"- {hour:02d}:00: {count} incidents\n"
                 
                 # Peak hour analysis
-                peak_hour = int(hour_counts.idxmax())
-                peak_count = hour_counts.max()
+                peak_hour = int(cube.mode('Hour'))
+                peak_count = hour_counts[peak_hour]
                 response += f"\nPeak Activity:\n"
                 response += f"- Highest activity: {peak_hour:02d}:00 ({peak_count} incidents)\n"
                 
                 # Add night vs day comparison
                 night_hours = set([18,19,20,21,22,23,0,1,2,3,4,5])
                 day_hours = set([6,7,8,9,10,11,12,13,14,15,16,17])
-                night_crimes = df[df['Hour'].isin(night_hours)].shape[0]
-                day_crimes = df[df['Hour'].isin(day_hours)].shape[0]
+                night_crimes = cube.count({'Hour': night_hours})
+                day_crimes = cube.count({'Hour': day_hours})
                 total_crimes = night_crimes + day_crimes
                 
                 response += f"\nDay vs Night Comparison:\n"
@@ -355,47 +342,45 @@ class CrimeAgent:
             
             # Weapon/Safety related queries
             if any(word in query for word in ['weapon', 'gun', 'firearm', 'armed', 'dangerous']):
-                armed_incidents = df[df['FirearmUsed'] == 'Yes']
-                total_armed = len(armed_incidents)
+                armed = {'FirearmUsed': 'Yes'}
+                total_armed = cube.count(armed)
                 
                 response = "Firearm-Related Crime Analysis:\n\n"
                 response += f"Total firearm-related incidents: {total_armed}\n\n"
                 
                 # Types of armed crimes
-                armed_types = armed_incidents['Offense'].value_counts().head(5)
+                armed_types = cube.top('Offense', 5, armed)
                 response += "Most Common Armed Incidents:\n"
-                for crime, count in armed_types.items():
+                for crime, count in armed_types:
                     response += f"- {crime}: {count} incidents\n"
                 
                 # Locations of armed crimes
-                armed_areas = armed_incidents['Neighborhood'].value_counts().head(3)
+                armed_areas = cube.top('Neighborhood', 3, armed)
                 response += "\nAreas with Most Armed Incidents:\n"
-                for area, count in armed_areas.items():
+                for area, count in armed_areas:
                     response += f"- {area}: {count} incidents\n"
                 
                 return response.strip()
             
             # If asking for a report or general stats
             if any(word in query for word in ['report', 'summary', 'overview', 'statistics', 'stats', 'analysis']):
-                total_incidents = len(df)
-                date_range = f"{df['Date_Time'].min().strftime('%Y-%m-%d')} to {df['Date_Time'].max().strftime('%Y-%m-%d')}"
+                total_incidents = cube.total
+                date_range = f"{cube.min_date.strftime('%Y-%m-%d')} to {cube.max_date.strftime('%Y-%m-%d')}"
                 
                 # Get top crimes
-                top_crimes = df['Offense'].value_counts().head(5)
+                top_crimes = cube.top('Offense', 5)
                 
                 # Get top neighborhoods
-                top_neighborhoods = df['Neighborhood'].value_counts().head(5)
+                top_neighborhoods = cube.top('Neighborhood', 5)
                 
                 # Get time analysis
-                hour_counts = df['Hour'].value_counts()
-                peak_hour = hour_counts.idxmax()
+                peak_hour = cube.mode('Hour')
                 
                 # Get day of week analysis
-                day_counts = df['DayOfWeek'].value_counts()
-                busiest_day = day_counts.index[0]
+                busiest_day = cube.top('DayOfWeek', 1)[0][0]
                 
                 # Get firearm statistics
-                firearm_incidents = df[df['FirearmUsed'] == 'Yes']
+                firearm_count = cube.count({'FirearmUsed': 'Yes'})
                 
                 # Generate comprehensive report
                 report = f"St. Louis Crime Analysis Report ({date_range})\n"
@@ -404,13 +389,13 @@ class CrimeAgent:
                 
                 report += "Most Common Crime Types:\n"
                 report += "----------------------\n"
-                for crime, count in top_crimes.items():
+                for crime, count in top_crimes:
                     percentage = (count / total_incidents) * 100
                     report += f"- {crime}: {count} incidents ({percentage:.1f}% of total crimes)\n"
                 
                 report += "\nMost Affected Neighborhoods:\n"
                 report += "-------------------------\n"
-                for hood, count in top_neighborhoods.items():
+                for hood, count in top_neighborhoods:
                     percentage = (count / total_incidents) * 100
                     report += f"- {hood}: {count} incidents ({percentage:.1f}% of total crimes)\n"
                 
@@ -422,16 +407,16 @@ class CrimeAgent:
                 # Add day vs night comparison
                 night_hours = set([18,19,20,21,22,23,0,1,2,3,4,5])
                 day_hours = set([6,7,8,9,10,11,12,13,14,15,16,17])
-                night_crimes = df[df['Hour'].isin(night_hours)].shape[0]
-                day_crimes = df[df['Hour'].isin(day_hours)].shape[0]
+                night_crimes = cube.count({'Hour': night_hours})
+                day_crimes = cube.count({'Hour': day_hours})
                 report += f"- Daytime Incidents (6:00-17:59): {day_crimes}\n"
                 report += f"- Nighttime Incidents (18:00-5:59): {night_crimes}\n"
                 
-                if len(firearm_incidents) > 0:
+                if firearm_count > 0:
                     report += f"\nFirearm-Related Incidents:\n"
                     report += f"----------------------\n"
-                    report += f"Total firearm-related incidents: {len(firearm_incidents)}\n"
-                    firearm_pct = (len(firearm_incidents) / total_incidents) * 100
+                    report += f"Total firearm-related incidents: {firearm_count}\n"
+                    firearm_pct = (firearm_count / total_incidents) * 100
                     report += f"Percentage of total crimes: {firearm_pct:.1f}%"
                 
                 return report.strip()
@@ -451,14 +436,9 @@ class CrimeAgent:
             return ("I apologize, but I encountered an error while analyzing the data. "
                    "Please try rephrasing your question or ask for a specific aspect of crime data.")
     
-    def answer_question(self, question: str) -> str:
-        """Answer questions about crime patterns and insights"""
-        try:
-            # First try to get answer directly from CSV data
-            data_answer = self.query_csv_data(question)
-            
-            # Use Ollama to enhance the answer with insights
-            prompt = f"""As a crime analysis AI assistant, analyze this crime data and provide additional insights:
+    def _insight_prompt(self, question, data_answer):
+        """Prompt asking the model to expand on the direct data answer"""
+        return f"""As a crime analysis AI assistant, analyze this crime data and provide additional insights:
 
 Question: {question}
 
@@ -468,16 +448,69 @@ Data Analysis:
 Please provide additional insights, patterns, or recommendations based on this data.
 Keep your response focused and relevant to public safety."""
 
-            ollama_insights = self.ollama.invoke(prompt)
+    def generate(self, prompt, job=None):
+        """Generate a complete model response.
+
+        With a ``job`` (see jobs.py) the response is streamed and generation
+        is cancelled as soon as the job passes its deadline or is cancelled,
+        raising JobTimeoutError or JobCancelledError. Model failures raise
+        too, so the job ends as failed instead of returning error text as its
+        result. Without a job, failures return "Error: ..." like ``invoke``.
+        """
+        if job is None:
+            return self.ollama.invoke(prompt)
+        tokens = self.ollama.stream(prompt)
+        parts = []
+        try:
+            for token in tokens:
+                job.check()
+                parts.append(token)
+        finally:
+            tokens.close()
+        return ''.join(parts).strip()
+
+    def answer_question(self, question: str, job=None) -> str:
+        """Answer questions about crime patterns and insights"""
+        try:
+            # First try to get answer directly from CSV data
+            data_answer = self.query_csv_data(question)
+            
+            # Use Ollama to enhance the answer with insights; the data answer stands on its own if it fails
+            try:
+                ollama_insights = self.generate(self._insight_prompt(question, data_answer), job)
+            except (JobTimeoutError, JobCancelledError):
+                raise
+            except Exception as e:
+                logger.error(f"Ollama error: {str(e)}")
+                ollama_insights = f"Error: {str(e)}"
             
             # Combine both answers
             full_answer = f"{data_answer}\n\nAdditional Insights:\n{ollama_insights}"
             return full_answer
             
+        except (JobTimeoutError, JobCancelledError):
+            raise
         except Exception as e:
             logger.error(f"Error answering question: {str(e)}")
             return "I apologize, but I encountered an error while processing your question. Please try asking in a different way."
 
+    def stream_answer(self, question: str):
+        """Answer a question incrementally.
+
+        Yields ('data', text) with the direct data answer as soon as it is
+        computed, then ('token', text) for each model token. Closing the
+        generator stops the model generation.
+        """
+        data_answer = self.query_csv_data(question)
+        yield 'data', data_answer
+        
+        tokens = self.ollama.stream(self._insight_prompt(question, data_answer))
+        try:
+            for token in tokens:
+                yield 'token', token
+        finally:
+            tokens.close()
+
     def get_insights(self, limit=10, insight_type=None):
         """Get insights from the database"""
         return self.db.get_insights(limit, insight_type)
@@ -0,0 +1,78 @@
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class CrimeCube:
+    """Incident counts over Neighborhood x Offense x Hour x DayOfWeek x FirearmUsed.
+
+    Built once per dataset version. Only combinations that occur are stored
+    (one row per combination with its count), so every chat intent is
+    answered by masking and summing this table, whose size is bounded by the
+    number of distinct combinations rather than the number of incidents.
+    Missing values get their own slot per dimension: they count towards
+    totals but, like ``value_counts``, are left out of per-value counts.
+    """
+
+    DIMENSIONS = ['Neighborhood', 'Offense', 'Hour', 'DayOfWeek', 'FirearmUsed']
+
+    def __init__(self, df):
+        self.total = len(df)
+        dates = df['IncidentDate']
+        self.min_date = dates.min() if dates.notna().any() else None
+        self.max_date = dates.max() if dates.notna().any() else None
+
+        self.labels = {}
+        dimension_codes = []
+        for dim in self.DIMENSIONS:
+            if dim in df.columns:
+                codes, uniques = pd.factorize(df[dim])
+            else:
+                codes, uniques = np.full(self.total, -1, dtype=np.int64), []
+            self.labels[dim] = np.asarray(uniques, dtype=object)
+            # Missing values (-1) go to the slot after the last label
+            dimension_codes.append(np.where(codes < 0, len(uniques), codes).astype(np.int64))
+
+        # Collapse the rows into one entry per distinct combination
+        shape = tuple(len(self.labels[dim]) + 1 for dim in self.DIMENSIONS)
+        flat = np.ravel_multi_index(dimension_codes, shape)
+        combos, self.counts = np.unique(flat, return_counts=True)
+        self.codes = dict(zip(self.DIMENSIONS, np.unravel_index(combos, shape)))
+        self._label_index = {dim: {label: i for i, label in enumerate(labels)}
+                             for dim, labels in self.labels.items()}
+        logger.info(f"Built crime cube: {len(combos)} combinations from {self.total} incidents")
+
+    def _mask(self, filters):
+        """Boolean mask over the combinations matching ``{dimension: value or list of values}``"""
+        mask = np.ones(len(self.counts), dtype=bool)
+        for dim, value in (filters or {}).items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            lookup = self._label_index[dim]
+            wanted = [lookup[v] for v in values if v in lookup]
+            mask &= np.isin(self.codes[dim], wanted)
+        return mask
+
+    def count(self, filters=None):
+        """Number of incidents matching ``filters``"""
+        return int(self.counts[self._mask(filters)].sum())
+
+    def counts_by(self, dim, filters=None):
+        """Incident counts per value of ``dim`` matching ``filters``, as a label -> count dict"""
+        mask = self._mask(filters)
+        totals = np.bincount(self.codes[dim][mask], weights=self.counts[mask],
+                             minlength=len(self.labels[dim]) + 1).astype(np.int64)
+        return {label: int(total) for label, total in zip(self.labels[dim], totals) if total}
+
+    def top(self, dim, n=None, filters=None):
+        """(label, count) pairs for ``dim``, most frequent first"""
+        ranked = sorted(self.counts_by(dim, filters).items(), key=lambda item: -item[1])
+        return ranked[:n]
+
+    def mode(self, dim, filters=None):
+        """Most frequent value of ``dim`` (smallest value on ties, like ``Series.mode``)"""
+        counts = self.counts_by(dim, filters)
+        if not counts:
+            return None
+        return min(counts, key=lambda label: (-counts[label], label))
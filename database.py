@@ -1,21 +1,129 @@
+import queue
 import sqlite3
 import json
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from typing import List, Dict, Any
 import logging
+from metrics import DB_QUERY_SECONDS, timed_operation
 
 logger = logging.getLogger(__name__)
 
+# Applied to every new connection. WAL lets dashboard readers proceed while the
+# monitor writes; NORMAL sync is durable under WAL except on power loss.
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-16000',  # 16 MB page cache
+    'PRAGMA mmap_size=268435456',  # 256 MB memory-mapped I/O
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA busy_timeout=5000'
+)
+
+# Connections kept open per database object; more concurrent callers wait for one
+DEFAULT_POOL_SIZE = 8
+
+INSERT_INSIGHT_SQL = '''
+    INSERT INTO insights (insight_text, insight_type, confidence, metadata)
+    VALUES (?, ?, ?, ?)
+'''
+
+INSERT_PATTERN_SQL = """
+    INSERT OR REPLACE INTO patterns 
+    (pattern_type, pattern_data, confidence)
+    VALUES (?, ?, ?)
+"""
+
+def _insight_row(insight_text, insight_type, confidence=None, metadata=None):
+    return (insight_text, insight_type, confidence, json.dumps(metadata) if metadata else None)
+
+def _pattern_row(pattern_type, pattern_data, confidence=None):
+    # Ensure pattern_data is JSON serializable
+    if isinstance(pattern_data, dict):
+        pattern_data = json.dumps(pattern_data)
+    return (pattern_type, pattern_data, confidence)
+
+class AnalysisBatch:
+    """Insights and patterns collected during one analysis run.
+
+    Mirrors the ``add_insight``/``add_pattern`` signatures of
+    ``InsightDatabase``; nothing is written until the batch is passed to
+    ``InsightDatabase.write_batch``.
+    """
+    def __init__(self):
+        self.insights = []
+        self.patterns = []
+
+    def add_insight(self, insight_text, insight_type, confidence=None, metadata=None):
+        """Queue an insight for the batch"""
+        self.insights.append(_insight_row(insight_text, insight_type, confidence, metadata))
+
+    def add_pattern(self, pattern_type, pattern_data, confidence=None):
+        """Queue a pattern for the batch"""
+        self.patterns.append(_pattern_row(pattern_type, pattern_data, confidence))
+
 class InsightDatabase:
-    def __init__(self, db_path='insights.db'):
-        """Initialize the database connection"""
+    def __init__(self, db_path='insights.db', pool_size=DEFAULT_POOL_SIZE):
+        """
+        Initialize the database connection pool
+        :param db_path: SQLite database file
+        :param pool_size: Maximum number of connections kept open
+        """
         self.db_path = db_path
+        self.pool_size = pool_size
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._connections = []
+        self._connections_lock = threading.Lock()
         self._create_tables()
 
+    def _open_connection(self):
+        # Pooled connections move between threads, one at a time
+        conn = sqlite3.connect(self.db_path, timeout=5.0, cached_statements=256,
+                               check_same_thread=False)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """Check a pooled connection out for one transaction.
+
+        At most ``pool_size`` connections are opened and they are reused
+        across calls and threads, so the connection setup and sqlite3's
+        per-connection prepared statement cache are paid once, however many
+        request threads come and go. The transaction commits on success and
+        rolls back on error, like ``with sqlite3.Connection``.
+        """
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._open_connection()
+            try:
+                with conn:
+                    yield conn
+            finally:
+                self._idle.put(conn)
+
+    def close(self):
+        """Close every connection opened by this database object"""
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except Exception as e:
+                    logger.error(f"Error closing connection: {str(e)}")
+            self._connections = []
+        self._idle = queue.LifoQueue()
+
     def _create_tables(self):
         """Create the necessary tables if they don't exist"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 
                 # Create insights table
@@ -45,30 +153,54 @@ class InsightDatabase:
                     )
                 ''')
                 
-                conn.commit()
+                # Create LLM response cache table
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS llm_responses (
+                        cache_key TEXT PRIMARY KEY,
+                        model TEXT NOT NULL,
+                        response TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        expires_at REAL NOT NULL
+                    )
+                ''')
                 
         except Exception as e:
             logger.error(f"Error creating tables: {str(e)}")
 
+    @timed_operation(DB_QUERY_SECONDS)
     def add_insight(self, insight_text, insight_type, confidence=None, metadata=None):
         """Add a new insight to the database"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO insights (insight_text, insight_type, confidence, metadata)
-                    VALUES (?, ?, ?, ?)
-                ''', (insight_text, insight_type, confidence, json.dumps(metadata) if metadata else None))
-                conn.commit()
+                cursor.execute(INSERT_INSIGHT_SQL, _insight_row(insight_text, insight_type, confidence, metadata))
                 return cursor.lastrowid
         except Exception as e:
             logger.error(f"Error adding insight: {str(e)}")
             return None
 
+    @timed_operation(DB_QUERY_SECONDS)
+    def write_batch(self, batch):
+        """Write all insights and patterns of an ``AnalysisBatch`` in one transaction.
+
+        Readers see either the state before the batch or all of it, never a
+        partially written analysis run.
+        """
+        try:
+            with self._connection() as conn:
+                conn.executemany(INSERT_INSIGHT_SQL, batch.insights)
+                conn.executemany(INSERT_PATTERN_SQL, batch.patterns)
+            logger.info(f"Wrote {len(batch.insights)} insights and {len(batch.patterns)} patterns")
+            return True
+        except Exception as e:
+            logger.error(f"Error writing analysis batch: {str(e)}")
+            return False
+
+    @timed_operation(DB_QUERY_SECONDS)
     def get_insights(self, limit=10, insight_type=None):
         """Get the most recent insights"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 
                 if insight_type:
@@ -106,32 +238,25 @@ class InsightDatabase:
             logger.error(f"Error getting insights: {str(e)}")
             return []
 
+    @timed_operation(DB_QUERY_SECONDS)
     def add_pattern(self, pattern_type, pattern_data, confidence=None):
         """Add or update a pattern"""
         try:
-            # Ensure pattern_data is JSON serializable
-            if isinstance(pattern_data, dict):
-                pattern_data = json.dumps(pattern_data)
-                
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT OR REPLACE INTO patterns 
-                    (pattern_type, pattern_data, confidence)
-                    VALUES (?, ?, ?)
-                """, (pattern_type, pattern_data, confidence))
+                cursor.execute(INSERT_PATTERN_SQL, _pattern_row(pattern_type, pattern_data, confidence))
                 
-                conn.commit()
                 return cursor.lastrowid
                 
         except Exception as e:
             logger.error(f"Error adding pattern: {str(e)}")
             return None
 
+    @timed_operation(DB_QUERY_SECONDS)
     def get_pattern(self, pattern_type):
         """Get a pattern by type"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     SELECT pattern_type, pattern_data, confidence, created_at
@@ -153,10 +278,11 @@ class InsightDatabase:
             logger.error(f"Error getting pattern {pattern_type}: {str(e)}")
             return None
 
+    @timed_operation(DB_QUERY_SECONDS)
     def get_patterns(self, pattern_type: str = None, limit: int = 10) -> List[Dict[str, Any]]:
         """Get patterns from the database"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 
                 if pattern_type:
@@ -189,18 +315,59 @@ class InsightDatabase:
             logger.error(f"Error getting patterns: {str(e)}")
             return []
 
+    @timed_operation(DB_QUERY_SECONDS)
     def validate_insight(self, insight_id, validated=False, feedback=None):
         """Update the validation status of an insight"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     UPDATE insights 
                     SET validated = ?, validation_feedback = ?
                     WHERE id = ?
                 ''', (1 if validated else 0, feedback, insight_id))
-                conn.commit()
                 return cursor.rowcount > 0
         except Exception as e:
             logger.error(f"Error validating insight: {str(e)}")
             return False
+
+    @timed_operation(DB_QUERY_SECONDS)
+    def get_llm_response(self, cache_key, now):
+        """Get an unexpired cached LLM response as (response, expires_at), or None"""
+        try:
+            with self._connection() as conn:
+                row = conn.execute("""
+                    SELECT response, expires_at
+                    FROM llm_responses
+                    WHERE cache_key = ? AND expires_at > ?
+                """, (cache_key, now)).fetchone()
+                return (row[0], row[1]) if row else None
+        except Exception as e:
+            logger.error(f"Error getting cached LLM response: {str(e)}")
+            return None
+
+    @timed_operation(DB_QUERY_SECONDS)
+    def add_llm_response(self, cache_key, model, response, created_at, expires_at):
+        """Add or replace a cached LLM response"""
+        try:
+            with self._connection() as conn:
+                conn.execute("""
+                    INSERT OR REPLACE INTO llm_responses
+                    (cache_key, model, response, created_at, expires_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (cache_key, model, response, created_at, expires_at))
+                return True
+        except Exception as e:
+            logger.error(f"Error caching LLM response: {str(e)}")
+            return False
+
+    @timed_operation(DB_QUERY_SECONDS)
+    def purge_llm_responses(self, now):
+        """Delete expired cached LLM responses"""
+        try:
+            with self._connection() as conn:
+                cursor = conn.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (now,))
+                return cursor.rowcount
+        except Exception as e:
+            logger.error(f"Error purging cached LLM responses: {str(e)}")
+            return 0
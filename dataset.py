@@ -0,0 +1,549 @@
+import os
+import re
+import time
+import threading
+import logging
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from datetime import datetime, timezone
+from features import add_temporal_features
+from column_cache import DEFAULT_CACHE_DIR, load_frame, save_frame
+from metrics import DATASET_LOAD_SECONDS, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Ingest schema. Low-cardinality text becomes categorical and small integers use
+# the narrowest dtype (nullable where values can be missing). Coordinates stay
+# float64 so the served points are exactly the ones in the CSV.
+CATEGORICAL_COLUMNS = ['Neighborhood', 'Offense', 'Description', 'Category', 'FirearmUsed',
+                       'OccurredFromTime', 'DayOfWeek', 'Month']
+INTEGER_COLUMNS = {'Hour': 'uint8', 'Minute': 'uint8', 'Year': 'Int16'}
+
+# Streaming ingestion: analyses read the CSV in chunks of this many rows instead
+# of loading the whole file, when enabled (or asked for explicitly)
+STREAM_CHUNK_ROWS = int(os.environ.get('CRIME_CHUNK_ROWS', 100_000))
+STREAM_INGEST = os.environ.get('CRIME_STREAM_INGEST', '').lower() in ('1', 'true', 'yes')
+
+# Bytes kept from the end of the loaded file to recognise a later reload as an append
+TAIL_BYTES = 4096
+
+# Artifacts kept per dataset version for each kind of request-chosen date range
+RANGE_CACHE_ENTRIES = 32
+
+# Partition holding the rows whose IncidentDate could not be parsed
+UNDATED_PARTITION = 'undated'
+
+_MONTH_KEY = re.compile(r'^\d{4}-(0[1-9]|1[0-2])$')
+
+
+def month_range(year=None, start=None, end=None):
+    """Validate a date filter and return it as inclusive (start, end) 'YYYY-MM' keys.
+
+    ``year`` selects a whole year; ``start``/``end`` are months ('YYYY-MM')
+    and may be open-ended. Returns (None, None) when there is no filter and
+    raises ValueError for malformed values.
+    """
+    if year is not None:
+        year = int(year)
+        return f"{year:04d}-01", f"{year:04d}-12"
+    for value in (start, end):
+        if value is not None and not _MONTH_KEY.match(value):
+            raise ValueError(f"Invalid month {value!r}, expected YYYY-MM")
+    return start, end
+
+
+def _fingerprint_tag(fingerprint):
+    """Stable text form of an (mtime_ns, size) fingerprint"""
+    return f"{fingerprint[0]}-{fingerprint[1]}"
+
+
+def file_version_tag(file_path):
+    """Version tag of ``file_path`` as the store would report it, without loading the file"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return _fingerprint_tag((stat.st_mtime_ns, stat.st_size))
+
+
+def _build_partitions(df):
+    """Group row positions by IncidentDate month, with per-partition metadata.
+
+    The frame the positions refer to is kept alongside them, so a reload in
+    between can't pair positions with a different version of the data.
+    """
+    dates = df['IncidentDate']
+    valid = dates.notna().to_numpy()
+    # Months since year 0, -1 for undated rows
+    months = np.full(len(df), -1, dtype=np.int64)
+    months[valid] = dates.dt.year.to_numpy()[valid] * 12 + dates.dt.month.to_numpy()[valid] - 1
+
+    # A stable sort keeps each partition's rows in file order
+    order = np.argsort(months, kind='stable')
+    boundaries = np.flatnonzero(np.diff(months[order])) + 1
+    latitude = pd.to_numeric(df['Latitude'], errors='coerce').to_numpy() if 'Latitude' in df.columns else None
+    longitude = pd.to_numeric(df['Longitude'], errors='coerce').to_numpy() if 'Longitude' in df.columns else None
+
+    partitions = {}
+    for positions in np.split(order, boundaries) if len(order) else []:
+        month = months[positions[0]]
+        key = UNDATED_PARTITION if month < 0 else f"{month // 12:04d}-{month % 12 + 1:02d}"
+        part_dates = dates.iloc[positions]
+        meta = {
+            'key': key,
+            'rows': int(len(positions)),
+            'min_date': part_dates.min().strftime('%Y-%m-%d') if month >= 0 else None,
+            'max_date': part_dates.max().strftime('%Y-%m-%d') if month >= 0 else None,
+            'bbox': None
+        }
+        if latitude is not None and longitude is not None:
+            lat, lon = latitude[positions], longitude[positions]
+            located = ~(np.isnan(lat) | np.isnan(lon))
+            if located.any():
+                # [west, south, east, north], like the bbox query parameter
+                meta['bbox'] = [round(float(lon[located].min()), 6), round(float(lat[located].min()), 6),
+                                round(float(lon[located].max()), 6), round(float(lat[located].max()), 6)]
+        partitions[key] = {'meta': meta, 'positions': positions}
+    return {'frame': df, 'partitions': partitions}
+
+
+class DatasetStore:
+    """Process-wide, load-once store for a parsed crime CSV.
+
+    The CSV is parsed and its derived columns are computed once. The store
+    reloads only when the source file's mtime or size changes. Every caller
+    gets a read-only view of the same underlying columns. While a derived
+    artifact is being built, every store lookup the builder makes on its
+    thread sees the dataset version the builder was called with.
+    """
+
+    # Columns the analysis code relies on, with the placeholder used when absent
+    REQUIRED_COLUMNS = {
+        'OccurredFromTime': 'time',
+        'IncidentDate': 'date',
+        'Description': 'description',
+        'Neighborhood': 'location',
+        'Offense': 'type'
+    }
+
+    def __init__(self, file_path, cache_dir=DEFAULT_CACHE_DIR):
+        """
+        :param file_path: Crime CSV to load
+        :param cache_dir: Directory for the parsed columnar cache, or None to disable it
+        """
+        self.file_path = file_path
+        self.cache_dir = cache_dir
+        self.version = 0
+        self.loaded_at = None
+        self.feature_report = None
+        self._fingerprint = None
+        self._df = None
+        self._derived = {}
+        self._tail = None
+        # Row count and incremental artifacts of the previous version, when the
+        # last reload only appended rows to the file
+        self._appended = None
+        self._incremental_keys = set()
+        self._lock = threading.RLock()
+        # (frame, version, fingerprint) the builder running on this thread was given
+        self._pinned = threading.local()
+
+    def _stat(self):
+        """Return the (mtime, size) fingerprint of the source file"""
+        stat = os.stat(self.file_path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _snapshot(self):
+        """(frame, version, fingerprint) pinned by the enclosing builder, else of the current file"""
+        pinned = getattr(self._pinned, 'snapshot', None)
+        if pinned is not None:
+            return pinned
+        fingerprint = self._stat()
+        with self._lock:
+            if fingerprint != self._fingerprint:
+                self._load(fingerprint)
+            return self._df, self.version, self._fingerprint
+
+    def _loaded_fingerprint(self):
+        pinned = getattr(self._pinned, 'snapshot', None)
+        return pinned[2] if pinned is not None else self._fingerprint
+
+    def _build(self, snapshot, fn, *args):
+        """Call ``fn(*args)`` with the store pinned to ``snapshot`` on this thread"""
+        outer = getattr(self._pinned, 'snapshot', None)
+        self._pinned.snapshot = snapshot
+        try:
+            return fn(*args)
+        finally:
+            self._pinned.snapshot = outer
+
+    @property
+    def fingerprint(self):
+        """(mtime_ns, size) of the source file as of the currently loaded version"""
+        return self._loaded_fingerprint()
+
+    @property
+    def version_tag(self):
+        """Identifier of the loaded data that is stable across processes and restarts"""
+        fingerprint = self._loaded_fingerprint()
+        if fingerprint is None:
+            return None
+        return _fingerprint_tag(fingerprint)
+
+    @property
+    def modified_at(self):
+        """Modification time of the source file as of the loaded version"""
+        fingerprint = self._loaded_fingerprint()
+        if fingerprint is None:
+            return None
+        return datetime.fromtimestamp(fingerprint[0] / 1e9, tz=timezone.utc)
+
+    def get(self):
+        """Return a read-only view of the dataset, reloading it if the file changed"""
+        return self._snapshot()[0].copy(deep=False)
+
+    def derived(self, key, builder):
+        """Return an artifact computed from the current dataset version.
+
+        ``builder`` is called with the dataset the first time ``key`` is
+        requested for a version; the result is reused until the next reload.
+        """
+        snapshot = self._snapshot()
+        version = snapshot[1]
+        with self._lock:
+            entry = self._derived.get(key)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+        value = self._build(snapshot, builder, snapshot[0].copy(deep=False))
+        with self._lock:
+            # Built from a version that has since been replaced: don't cache it
+            if version == self.version:
+                self._derived[key] = (version, value)
+        return value
+
+    def derived_incremental(self, key, builder, extend):
+        """Like ``derived``, for artifacts that can be brought up to date with appended rows.
+
+        When the dataset was reloaded because rows were appended to the file,
+        ``extend(previous, rows)`` is called with the previous version's
+        artifact and a frame of just the new rows instead of rebuilding from
+        the whole dataset with ``builder``.
+        """
+        snapshot = self._snapshot()
+        version = snapshot[1]
+        df = snapshot[0].copy(deep=False)
+        with self._lock:
+            self._incremental_keys.add(key)
+            entry = self._derived.get(key)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+            appended = self._appended if version == self.version else None
+            # Each previous artifact is extended once, then no longer kept alive
+            previous = appended['derived'].pop(key, None) if appended else None
+        if previous is not None:
+            value = self._build(snapshot, extend, previous, df.iloc[appended['rows']:])
+        else:
+            value = self._build(snapshot, builder, df)
+        with self._lock:
+            if version == self.version:
+                self._derived[key] = (version, value)
+        return value
+
+    def derived_lru(self, group, key, builder, max_entries):
+        """Like ``derived``, for keys that come from requests.
+
+        At most ``max_entries`` artifacts of ``group`` are kept for the current
+        version, dropping the least recently used first, so arbitrary query
+        parameters can't grow the cache without bound.
+        """
+        snapshot = self._snapshot()
+        entries = self._build(snapshot, self.derived, (group, 'lru'), lambda df: OrderedDict())
+        with self._lock:
+            if key in entries:
+                entries.move_to_end(key)
+                return entries[key]
+        value = self._build(snapshot, builder, snapshot[0].copy(deep=False))
+        with self._lock:
+            entries[key] = value
+            entries.move_to_end(key)
+            while len(entries) > max_entries:
+                entries.popitem(last=False)
+        return value
+
+    def derived_range(self, key, start, end, builder, max_entries=RANGE_CACHE_ENTRIES):
+        """Artifact of the months from ``start`` to ``end``, built by ``builder(start, end)``.
+
+        The unbounded range is cached like ``derived``. Other ranges come from
+        requests: they are narrowed to the first and last month partitions
+        they cover, since ranges covering the same partitions select the same
+        rows, and kept with ``derived_lru``.
+        """
+        if start is None and end is None:
+            return self.derived(key, lambda df: builder(None, None))
+        return self._build(self._snapshot(), self._derived_range, key, start, end, builder, max_entries)
+
+    def _derived_range(self, key, start, end, builder, max_entries):
+        months = [month for month in self.partition_keys(start, end) if month != UNDATED_PARTITION]
+        # Every range that covers no partition gives the same empty artifact
+        covered = (months[0], months[-1]) if months else None
+        if covered is not None:
+            start, end = covered
+        return self.derived_lru(key, covered, lambda df: builder(start, end), max_entries)
+
+    def _partition_index(self):
+        """Row positions and metadata per month partition, built once per dataset version"""
+        return self.derived('partitions', _build_partitions)
+
+    def partitions(self):
+        """Metadata (row count, date range, bbox) of each month partition, oldest first"""
+        partitions = self._partition_index()['partitions']
+        return [partitions[key]['meta'] for key in sorted(partitions)]
+
+    def partition_keys(self, start=None, end=None):
+        """Keys of the month partitions between ``start`` and ``end`` ('YYYY-MM', inclusive).
+
+        Undated rows are only included when the range is unbounded.
+        """
+        return self._keys_in_range(self._partition_index()['partitions'], start, end)
+
+    @staticmethod
+    def _keys_in_range(partitions, start, end):
+        keys = []
+        for key in sorted(partitions):
+            if key == UNDATED_PARTITION:
+                if start is None and end is None:
+                    keys.append(key)
+            elif (start is None or key >= start) and (end is None or key <= end):
+                keys.append(key)
+        return keys
+
+    def select(self, start=None, end=None):
+        """Rows whose IncidentDate falls in the months from ``start`` to ``end``.
+
+        Only the positions of the matching partitions are gathered, so the
+        cost depends on the size of the range rather than of the dataset.
+        Rows keep their file order.
+        """
+        if start is None and end is None:
+            return self.get()
+        frame, positions = self.select_positions(start, end)
+        return frame.take(positions)
+
+    def select_positions(self, start=None, end=None):
+        """Like ``select``, but returns the whole frame and the sorted positions of the selected rows.
+
+        Lets callers take the rows a slice at a time instead of copying them all.
+        """
+        index = self._partition_index()
+        partitions = index['partitions']
+        if start is None and end is None:
+            return index['frame'], np.arange(len(index['frame']))
+        keys = self._keys_in_range(partitions, start, end)
+        if not keys:
+            return index['frame'], np.empty(0, dtype=np.int64)
+        return index['frame'], np.sort(np.concatenate([partitions[key]['positions'] for key in keys]))
+
+    def partition_derived(self, key, builder, partition):
+        """Like ``derived``, for an artifact built from a single month partition"""
+        def build(df):
+            index = self._partition_index()
+            return builder(index['frame'].take(index['partitions'][partition]['positions']))
+        return self.derived((key, partition), build)
+
+    def _load(self, fingerprint):
+        """Load the parsed dataset from the columnar cache, or parse the CSV and cache it"""
+        start = time.perf_counter()
+        cached = None
+        if self.cache_dir:
+            cached = load_frame(self.file_path, fingerprint, self.cache_dir)
+        if cached is not None:
+            df, self.feature_report = cached
+            source = 'cache'
+            logger.info(f"Loaded crime dataset for {self.file_path} from columnar cache")
+        else:
+            logger.info(f"Loading crime dataset from {self.file_path}")
+            df = read_crime_csv(self.file_path)
+            self.feature_report = prepare_dataset(df)
+            if self.cache_dir:
+                save_frame(df, self.file_path, fingerprint, self.cache_dir, extra=self.feature_report)
+            df = read_only_frame(df)
+            source = 'csv'
+        DATASET_LOAD_SECONDS.observe(time.perf_counter() - start, source=source)
+
+        tail = self._read_range(max(0, fingerprint[1] - TAIL_BYTES), fingerprint[1])
+        self._appended = None
+        if self._df is not None and self._is_append(fingerprint[1]) and len(df) >= len(self._df):
+            self._appended = {
+                'rows': len(self._df),
+                'derived': {key: value for key, (version, value) in self._derived.items()
+                            if key in self._incremental_keys and version == self.version}
+            }
+
+        self._df = df
+        self._tail = tail
+        self._fingerprint = fingerprint
+        self._derived = {}
+        self.version += 1
+        self.loaded_at = pd.Timestamp.now()
+        logger.info(f"Loaded {len(df)} incidents from {self.file_path} (version {self.version})")
+
+    def _read_range(self, start, end):
+        """Read bytes [start, end) of the source file"""
+        with open(self.file_path, 'rb') as f:
+            f.seek(start)
+            return f.read(end - start)
+
+    def _is_append(self, size):
+        """Whether the file only grew past the loaded version, which ended on a complete row"""
+        if self._fingerprint is None or not self._tail or size <= self._fingerprint[1]:
+            return False
+        if not self._tail.endswith(b'\n'):
+            return False
+        end = self._fingerprint[1]
+        return self._read_range(end - len(self._tail), end) == self._tail
+
+
+def _frozen(values):
+    """Read-only copy of an array"""
+    values = np.array(values)
+    values.flags.writeable = False
+    return values
+
+
+def read_only_frame(df):
+    """``df`` rebuilt over read-only copies of its columns.
+
+    Callers of the store get shallow copies of one shared frame: columns they
+    assign stay private to their copy, and in-place writes raise instead of
+    changing the data everyone sees. Frames loaded from the columnar cache
+    are memory-mapped read-only already.
+    """
+    data = {}
+    for name in df.columns:
+        series = df[name]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            data[name] = pd.Categorical.from_codes(_frozen(series.cat.codes.to_numpy()), dtype=series.dtype)
+        elif pd.api.types.is_extension_array_dtype(series.dtype) and pd.api.types.is_integer_dtype(series.dtype):
+            data[name] = pd.arrays.IntegerArray(
+                _frozen(series.to_numpy(dtype=series.dtype.numpy_dtype, na_value=0)), _frozen(series.isna().to_numpy()))
+        else:
+            data[name] = _frozen(series.to_numpy())
+    return pd.DataFrame(data, index=df.index, columns=df.columns, copy=False)
+
+
+def read_crime_csv(source, chunksize=None):
+    """Read a crime CSV, parsing the text columns of the ingest schema straight to categoricals.
+
+    With ``chunksize`` an iterator of frames of at most that many rows is
+    returned instead of a single frame.
+    """
+    return pd.read_csv(source, dtype={col: 'category' for col in CATEGORICAL_COLUMNS}, chunksize=chunksize)
+
+
+def iter_crime_csv(source, chunksize=STREAM_CHUNK_ROWS):
+    """Yield ``(chunk, feature_report)`` for each prepared chunk of a crime CSV.
+
+    Only one chunk and its derived columns are in memory at a time. Invalid
+    times and dates are logged once, for the whole file, when the last chunk
+    has been read.
+    """
+    totals = {}
+    with read_crime_csv(source, chunksize=chunksize) as reader:
+        for chunk in reader:
+            report = prepare_dataset(chunk, warn=False)
+            for key, value in report.items():
+                totals[key] = totals.get(key, 0) + value
+            yield chunk, report
+    if totals.get('invalid_times') or totals.get('invalid_dates'):
+        logger.warning(f"Temporal features: {totals['invalid_times']} invalid times and "
+                       f"{totals['invalid_dates']} invalid dates out of {totals['rows']} rows")
+
+
+def fill_missing(series, value):
+    """``series.fillna(value)`` that also works when ``value`` is not yet a category"""
+    if isinstance(series.dtype, pd.CategoricalDtype) and value not in series.cat.categories:
+        if not series.isna().any():
+            return series
+        series = series.cat.add_categories([value])
+    return series.fillna(value)
+
+
+def prepare_dataset(df, warn=True):
+    """Fill missing columns and derive the temporal features in place.
+
+    Returns the feature report from ``add_temporal_features``.
+    """
+    for col, default in DatasetStore.REQUIRED_COLUMNS.items():
+        if col not in df.columns:
+            logger.warning(f"Missing column {col}, creating with default values")
+            df[col] = f"Unknown {default}"
+
+    report = add_temporal_features(df, warn)
+
+    # Fill NaN values
+    df['Description'] = fill_missing(df['Description'], 'Unknown')
+    df['Neighborhood'] = fill_missing(df['Neighborhood'], 'Unknown')
+    df['Offense'] = fill_missing(df['Offense'], 'Unknown')
+
+    compact_dtypes(df)
+    return report
+
+
+def compact_dtypes(df):
+    """Convert columns to the compact ingest schema, in place"""
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and df[col].dtype == object:
+            df[col] = df[col].astype('category')
+    for col, dtype in INTEGER_COLUMNS.items():
+        if col in df.columns:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def memory_report(df):
+    """Bytes held by each column of ``df`` (strings included), largest first"""
+    usage = df.memory_usage(deep=True, index=False)
+    columns = [{'name': name, 'dtype': str(df[name].dtype), 'bytes': int(usage[name])} for name in df.columns]
+    columns.sort(key=lambda column: -column['bytes'])
+    return {
+        'rows': len(df),
+        'total_bytes': int(usage.sum()),
+        'columns': columns
+    }
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+DATASET_ROWS = REGISTRY.gauge('dataset_rows', 'Incidents in the loaded dataset', ('file',))
+DATASET_MEMORY_BYTES = REGISTRY.gauge('dataset_memory_bytes', 'In-memory size of the loaded dataset', ('file',))
+DATASET_VERSION = REGISTRY.gauge('dataset_version', 'Number of times the dataset has been (re)loaded', ('file',))
+
+
+def _collect_dataset_metrics():
+    with _stores_lock:
+        stores = list(_stores.values())
+    for store in stores:
+        if store.version == 0:
+            continue
+        name = os.path.basename(store.file_path)
+        # Measured once per dataset version; deep sizing scans every string
+        memory = store.derived('memory_report', memory_report)['total_bytes']
+        DATASET_ROWS.set(len(store.get()), file=name)
+        DATASET_MEMORY_BYTES.set(memory, file=name)
+        DATASET_VERSION.set(store.version, file=name)
+
+
+REGISTRY.add_collector(_collect_dataset_metrics)
+
+
+def get_dataset_store(file_path):
+    """Return the process-wide store for ``file_path``, creating it on first use"""
+    key = os.path.abspath(file_path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = DatasetStore(file_path)
+            _stores[key] = store
+        return store
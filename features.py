@@ -0,0 +1,117 @@
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December']
+NIGHT_HOURS = [18, 19, 20, 21, 22, 23, 0, 1, 2, 3, 4, 5]
+
+# Lookup tables indexed by dayofweek/month; the trailing/leading slot holds 'Unknown'
+# for rows whose date could not be parsed
+_DAY_LOOKUP = np.array(DAY_NAMES + ['Unknown'], dtype=object)
+_MONTH_LOOKUP = np.array(['Unknown'] + MONTH_NAMES, dtype=object)
+_NIGHT_LOOKUP = np.isin(np.arange(24), NIGHT_HOURS)
+
+
+def _parse_time(value):
+    """Parse one distinct OccurredFromTime value into (hour, minute, valid)"""
+    if not isinstance(value, str):
+        return 0, 0, False
+    parts = value.split(':')
+    try:
+        hour = int(parts[0])
+    except ValueError:
+        return 0, 0, False
+    if not 0 <= hour < 24:
+        return 0, 0, False
+    minute = 0
+    if len(parts) > 1:
+        try:
+            minute = int(parts[1])
+        except ValueError:
+            minute = 0
+        if not 0 <= minute < 60:
+            minute = 0
+    return hour, minute, True
+
+
+def parse_times(times):
+    """Vectorized hour/minute extraction for an OccurredFromTime series.
+
+    Clock times only take a few thousand distinct values, so the series is
+    factorized and only the distinct values are parsed; the results are then
+    broadcast back to every row with a NumPy take. Missing and unparseable
+    values map to hour 0, as before.
+
+    Returns (hours, minutes, missing_count, invalid_count).
+    """
+    codes, uniques = pd.factorize(times, use_na_sentinel=True)
+    parsed = [_parse_time(value) for value in uniques]
+    # One extra slot at the end holds the result for missing values (code -1)
+    unique_hours = np.array([p[0] for p in parsed] + [0], dtype=np.int64)
+    unique_minutes = np.array([p[1] for p in parsed] + [0], dtype=np.int64)
+    unique_valid = np.array([p[2] for p in parsed] + [True], dtype=bool)
+
+    missing = codes < 0
+    hours = unique_hours[codes]
+    minutes = unique_minutes[codes]
+    invalid_count = int((~unique_valid[codes]).sum())
+    return hours, minutes, int(missing.sum()), invalid_count
+
+
+def parse_dates(dates):
+    """Vectorized IncidentDate parsing that converts each distinct value once.
+
+    Returns (parsed, invalid_count) where ``parsed`` is a datetime Series
+    aligned with ``dates``.
+    """
+    codes, uniques = pd.factorize(dates, use_na_sentinel=True)
+    parsed_uniques = pd.DatetimeIndex(pd.to_datetime(pd.Series(uniques, dtype=object), errors='coerce'))
+    parsed = parsed_uniques.take(codes, allow_fill=True, fill_value=pd.NaT)
+    invalid_count = int(pd.isna(parsed_uniques)[codes[codes >= 0]].sum())
+    return pd.Series(parsed, index=dates.index, name=dates.name), invalid_count
+
+
+def add_temporal_features(df, warn=True):
+    """Derive the temporal columns used across the app, in place.
+
+    Adds Hour, Minute, DayOfWeek, Month, Year, IsNight and OccurredAt (the
+    incident date combined with the time of day), and converts IncidentDate
+    to datetime. Bad values are counted in bulk and reported once (unless
+    ``warn`` is False, for callers that report a total over several frames).
+
+    Returns a dict with the row count and the number of missing/invalid values.
+    """
+    dates, invalid_dates = parse_dates(df['IncidentDate'])
+    hours, minutes, missing_times, invalid_times = parse_times(df['OccurredFromTime'])
+
+    # Calendar fields straight from the datetime64 values; 1970-01-01 was a Thursday
+    valid = dates.notna().to_numpy()
+    day_values = dates.to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+    month_values = day_values.astype('datetime64[M]').astype(np.int64)
+    day_index = np.where(valid, (day_values.astype(np.int64) + 3) % 7, 7)
+    month_index = np.where(valid, month_values % 12 + 1, 0)
+    years = np.where(valid, month_values // 12 + 1970, np.nan)
+
+    df['IncidentDate'] = dates
+    df['Hour'] = hours
+    df['Minute'] = minutes
+    df['DayOfWeek'] = _DAY_LOOKUP[day_index]
+    df['Month'] = _MONTH_LOOKUP[month_index]
+    df['Year'] = years
+    df['IsNight'] = _NIGHT_LOOKUP[hours]
+    df['OccurredAt'] = dates + pd.to_timedelta(hours * 60 + minutes, unit='m')
+
+    report = {
+        'rows': len(df),
+        'missing_times': missing_times,
+        'invalid_times': invalid_times,
+        'invalid_dates': invalid_dates
+    }
+    if warn and (invalid_times or invalid_dates):
+        logger.warning(f"Temporal features: {invalid_times} invalid times and "
+                       f"{invalid_dates} invalid dates out of {len(df)} rows")
+    return report
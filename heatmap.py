@@ -0,0 +1,186 @@
+"""Kernel density heatmaps of crime incidents over the city.
+
+Incidents are binned once per dataset version into a fixed grid over the
+city, per category, year and hour of day, with the hours stored as running
+totals so any hour range is the difference of two slices. A query sums the
+selected slices and smooths them with a Gaussian kernel by FFT convolution,
+so its cost depends on the grid size, not on the number of incidents.
+"""
+import zlib
+import base64
+import struct
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+GRID_CELLS = 128              # cells along the longer side of the city bbox
+PADDING_METRES = 1000.0       # margin around the incidents, so the kernel tails fit
+DEFAULT_BANDWIDTH = 300.0     # Gaussian kernel standard deviation, in metres
+BANDWIDTH_RANGE = (50.0, 3000.0)
+OUTLIER_PERCENTILE = 0.5      # incidents beyond these percentiles don't stretch the bbox
+
+METRES_PER_DEGREE = 111_320.0
+
+# Colour ramp of the PNG rendering: (position, red, green, blue, alpha)
+COLOR_STOPS = [
+    (0.00, 255, 255, 178, 0),
+    (0.15, 254, 204, 92, 110),
+    (0.40, 253, 141, 60, 170),
+    (0.70, 240, 59, 32, 210),
+    (1.00, 189, 0, 38, 235),
+]
+
+
+def parse_hours(value):
+    """Parse an 'H-H' hour range (inclusive, 0-23; '22-3' wraps past midnight)"""
+    start, end = (int(part) for part in value.split('-'))
+    if not (0 <= start < 24 and 0 <= end < 24):
+        raise ValueError(f"Hours must be between 0 and 23, got {value!r}")
+    return start, end
+
+
+def gaussian_blur(grid, sigma):
+    """Convolve ``grid`` with a normalized Gaussian of ``sigma`` cells, via FFT"""
+    radius = max(1, int(np.ceil(3 * sigma)))
+    offsets = np.arange(-radius, radius + 1)
+    profile = np.exp(-0.5 * (offsets / sigma) ** 2)
+    kernel = np.outer(profile, profile)
+    kernel /= kernel.sum()
+    # Zero-padded to the full linear convolution, so nothing wraps around the edges
+    shape = (grid.shape[0] + 2 * radius, grid.shape[1] + 2 * radius)
+    smoothed = np.fft.irfft2(np.fft.rfft2(grid, shape) * np.fft.rfft2(kernel, shape), shape)
+    smoothed = smoothed[radius:radius + grid.shape[0], radius:radius + grid.shape[1]]
+    return np.maximum(smoothed, 0)  # FFT round-off leaves tiny negatives
+
+
+def encode_png(rgba):
+    """Encode an (height, width, 4) uint8 array as an RGBA PNG"""
+    height, width = rgba.shape[:2]
+    # Each scanline starts with its filter type (0, none)
+    raw = np.hstack([np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, width * 4)]).tobytes()
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    return (b'\x89PNG\r\n\x1a\n' +
+            chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)) +
+            chunk(b'IDAT', zlib.compress(raw, 6)) +
+            chunk(b'IEND', b''))
+
+
+def _color_table():
+    """256-entry RGBA lookup table interpolated from COLOR_STOPS"""
+    positions = np.linspace(0, 1, 256)
+    stops = np.array(COLOR_STOPS, dtype=np.float64)
+    return np.column_stack([np.interp(positions, stops[:, 0], stops[:, i]) for i in range(1, 5)]).astype(np.uint8)
+
+
+_COLOR_TABLE = _color_table()
+
+
+class HeatmapGrid:
+    """Incident counts binned over the city grid, ready for density queries"""
+
+    def __init__(self, records, categories):
+        """
+        :param records: Map records (see ``payloads.crime_records``)
+        :param categories: Category names; other categories count as the last one
+        """
+        self.categories = list(categories)
+        latitudes = records['latitude'].to_numpy(dtype=np.float64)
+        longitudes = records['longitude'].to_numpy(dtype=np.float64)
+
+        if len(latitudes):
+            low, high = OUTLIER_PERCENTILE, 100 - OUTLIER_PERCENTILE
+            south, north = np.percentile(latitudes, [low, high])
+            west, east = np.percentile(longitudes, [low, high])
+        else:
+            south = north = west = east = 0.0
+        metres_per_lon = METRES_PER_DEGREE * np.cos(np.radians((south + north) / 2))
+        pad_lat = PADDING_METRES / METRES_PER_DEGREE
+        pad_lon = PADDING_METRES / metres_per_lon
+        south, north, west, east = south - pad_lat, north + pad_lat, west - pad_lon, east + pad_lon
+
+        # Square cells in metres
+        height = (north - south) * METRES_PER_DEGREE
+        width = (east - west) * metres_per_lon
+        self.cell_metres = max(height, width) / GRID_CELLS
+        self.n_rows = max(1, int(np.ceil(height / self.cell_metres)))
+        self.n_cols = max(1, int(np.ceil(width / self.cell_metres)))
+        self.cell_lat = self.cell_metres / METRES_PER_DEGREE
+        self.cell_lon = self.cell_metres / metres_per_lon
+        self.bounds = [float(west), float(south),
+                       float(west + self.n_cols * self.cell_lon), float(south + self.n_rows * self.cell_lat)]
+
+        rows = np.floor((latitudes - south) / self.cell_lat).astype(np.int64)
+        cols = np.floor((longitudes - west) / self.cell_lon).astype(np.int64)
+        inside = (rows >= 0) & (rows < self.n_rows) & (cols >= 0) & (cols < self.n_cols)
+
+        category_lookup = {name: i for i, name in enumerate(self.categories)}
+        category_index = records['category'].map(category_lookup).fillna(len(self.categories) - 1)
+        category_index = category_index.to_numpy(dtype=np.int64)
+        year_index, self.years = pd.factorize(records['year'], sort=True)
+        hours = records['hour'].to_numpy(dtype=np.int64)
+
+        shape = (len(self.categories), len(self.years), 24, self.n_rows, self.n_cols)
+        flat = np.ravel_multi_index((category_index[inside], year_index[inside], hours[inside],
+                                     rows[inside], cols[inside]), shape)
+        counts = np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape)
+        # Running totals over the hours: hours [a, b] are cumulative[b + 1] - cumulative[a]
+        self.cumulative = np.zeros(shape[:2] + (25,) + shape[3:], dtype=np.int32)
+        np.cumsum(counts, axis=2, out=self.cumulative[:, :, 1:])
+        logger.info(f"Built heatmap grid: {self.n_rows}x{self.n_cols} cells of {self.cell_metres:.0f}m "
+                    f"from {int(inside.sum())} incidents")
+
+    def counts(self, categories=None, year=None, hours=None):
+        """Incidents per cell matching the filters (rows run south to north)"""
+        category_mask = np.ones(len(self.categories), dtype=bool)
+        if categories is not None:
+            category_mask = np.isin(self.categories, categories)
+        year_mask = np.ones(len(self.years), dtype=bool)
+        if year is not None:
+            year_mask = np.asarray(self.years) == year
+        start, end = hours if hours is not None else (0, 23)
+
+        selected = self.cumulative[category_mask][:, year_mask]
+        if start <= end:
+            totals = selected[:, :, end + 1] - selected[:, :, start]
+        else:
+            totals = selected[:, :, 24] - selected[:, :, start] + selected[:, :, end + 1]
+        return totals.sum(axis=(0, 1))
+
+    def density(self, categories=None, year=None, hours=None, bandwidth=DEFAULT_BANDWIDTH):
+        """Smoothed incidents per square kilometre for the filters.
+
+        Returns (density grid with rows south to north, number of incidents).
+        """
+        counts = self.counts(categories, year, hours)
+        smoothed = gaussian_blur(counts.astype(np.float64), bandwidth / self.cell_metres)
+        return smoothed / (self.cell_metres / 1000) ** 2, int(counts.sum())
+
+    def to_dict(self, density, incidents, bandwidth):
+        """Compact JSON form: densities quantized to bytes, north row first, base64-encoded"""
+        peak = float(density.max()) if density.size else 0.0
+        levels = np.zeros(density.shape, dtype=np.uint8)
+        if peak > 0:
+            levels = np.round(density / peak * 255).astype(np.uint8)
+        return {
+            'bounds': [round(value, 6) for value in self.bounds],
+            'shape': [self.n_rows, self.n_cols],
+            'cell_metres': round(self.cell_metres, 1),
+            'bandwidth_metres': bandwidth,
+            'incidents': incidents,
+            'max_density': round(peak, 3),
+            'encoding': 'uint8-base64',
+            'data': base64.b64encode(levels[::-1].tobytes()).decode('ascii')
+        }
+
+    def to_png(self, density):
+        """RGBA PNG of the density, north row first; colour follows the square root of density for contrast"""
+        peak = float(density.max()) if density.size else 0.0
+        levels = np.zeros(density.shape, dtype=np.uint8)
+        if peak > 0:
+            levels = np.round(np.sqrt(density / peak) * 255).astype(np.uint8)
+        return encode_png(_COLOR_TABLE[levels[::-1]])
@@ -0,0 +1,324 @@
+"""Spatial hotspot clustering and per-incident anomaly scores.
+
+Incidents are binned into square grid cells of about CELL_METRES. Cells
+holding at least MIN_HOTSPOT_INCIDENTS incidents, and HOTSPOT_DENSITY times
+as many as the average occupied cell, are hotspot cores; touching
+core cells (8-neighbourhood) form one hotspot, and sparser cells next to a
+hotspot join it as its fringe. This is DBSCAN on a grid: the cost is a sort
+of the incidents by cell plus work on the occupied cells, not O(n^2)
+neighbour searches.
+
+An incident's anomaly score is how much less likely its offense and its
+hour of day are in the surrounding 3x3 cells than citywide, in bits. Local
+rates are smoothed towards the citywide ones, so thinly populated areas need
+strong evidence before anything looks unusual there.
+
+Everything is kept as additive counts per cell, so a model can be extended
+with appended rows without re-reading the rows it already has.
+"""
+import copy
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CELL_METRES = 150.0         # grid cell edge, the analogue of DBSCAN's eps
+MIN_HOTSPOT_INCIDENTS = 25  # incidents a cell needs to be a hotspot core...
+HOTSPOT_DENSITY = 3.0       # ...and at least this many times the mean of the occupied cells
+PRIOR_WEIGHT = 20.0         # pseudo-incidents of citywide rates mixed into local rates
+ANOMALY_BITS = 4.0          # score above which an incident counts as an anomaly
+
+NOISE = -1  # cluster label of incidents outside any hotspot or without coordinates
+
+METRES_PER_DEGREE = 111_320.0
+
+# Cell keys pack (row, column) into one int64; offense/hour keys append a slot to a cell key
+_ROW_SHIFT = 1 << 32
+_COL_OFFSET = 1 << 31
+_OFFENSE_SLOTS = 1 << 12
+_HOUR_SLOTS = 24
+_NO_CELL = np.iinfo(np.int64).min
+
+# (row, column) offsets of a cell's 3x3 neighbourhood, the cell itself first
+_NEIGHBOURS = [(0, 0), (-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+
+def _lookup(sorted_keys, keys):
+    """Positions of ``keys`` in ``sorted_keys`` and whether each was found"""
+    positions = np.searchsorted(sorted_keys, keys)
+    positions = np.minimum(positions, max(len(sorted_keys) - 1, 0))
+    found = sorted_keys[positions] == keys if len(sorted_keys) else np.zeros(len(keys), dtype=bool)
+    return positions, found
+
+
+def _accumulate(keys, columns, new_keys, new_columns=None):
+    """Merge per-key sums: returns sorted unique keys and the summed columns.
+
+    The first column counts the keys; ``new_columns`` holds the values of the
+    remaining columns for each entry of ``new_keys``.
+    """
+    new_columns = [np.ones(len(new_keys))] + list(new_columns or [])
+    merged_keys, inverse = np.unique(np.concatenate([keys, new_keys]), return_inverse=True)
+    merged = [np.bincount(inverse, weights=np.concatenate([old, new]), minlength=len(merged_keys))
+              for old, new in zip(columns, new_columns)]
+    return merged_keys, merged
+
+
+def _neighbourhood_sums(sorted_keys, values, keys, step):
+    """Sum of ``values`` over the 3x3 neighbourhood of each key; ``step`` is the key stride of one cell"""
+    totals = np.zeros(len(keys))
+    for dr, dc in _NEIGHBOURS:
+        positions, found = _lookup(sorted_keys, keys + (dr * _ROW_SHIFT + dc) * step)
+        totals += np.where(found, values[positions], 0)
+    return totals
+
+
+def _lift_bits(local, local_total, global_rate):
+    """log2 of the citywide rate over the smoothed local rate (leaving the incident itself out)"""
+    local_rate = (local - 1 + PRIOR_WEIGHT * global_rate) / (local_total - 1 + PRIOR_WEIGHT)
+    return np.log2(global_rate / local_rate)
+
+
+class HotspotModel:
+    """Hotspot clusters and anomaly scores for every row of a crime frame.
+
+    ``clusters``, ``scores`` and ``anomalies`` are aligned with the rows the
+    model was built from, in order (the store's row index). Hotspot labels
+    are numbered from 0 by incident count, largest first.
+    """
+
+    def __init__(self, reference_latitude):
+        """
+        :param reference_latitude: Latitude at which cells are CELL_METRES wide
+        """
+        self.reference_latitude = reference_latitude
+        self.cell_lat = CELL_METRES / METRES_PER_DEGREE
+        self.cell_lon = CELL_METRES / (METRES_PER_DEGREE * np.cos(np.radians(reference_latitude)))
+        self.offense_ids = {}
+
+        # Per row
+        self.point_cells = np.empty(0, dtype=np.int64)
+        self.point_offenses = np.empty(0, dtype=np.int64)
+        self.point_hours = np.empty(0, dtype=np.int64)
+
+        # Per occupied cell: incident count and coordinate sums
+        self.cell_keys = np.empty(0, dtype=np.int64)
+        self.cell_counts = np.empty(0)
+        self.cell_lat_sums = np.empty(0)
+        self.cell_lon_sums = np.empty(0)
+        # Per (cell, offense) and (cell, hour)
+        self.offense_keys = np.empty(0, dtype=np.int64)
+        self.offense_counts = np.empty(0)
+        self.hour_keys = np.empty(0, dtype=np.int64)
+        self.hour_counts = np.empty(0)
+
+        self.clusters = np.empty(0, dtype=np.int64)
+        self.scores = np.empty(0)
+        self.anomalies = np.empty(0, dtype=bool)
+        self.cluster_summaries = []
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build the model from a frame with coordinates, Offense and the derived Hour column"""
+        latitudes = pd.to_numeric(df['Latitude'], errors='coerce').to_numpy(dtype=np.float64)
+        located = latitudes[~np.isnan(latitudes)]
+        reference = round(float(np.median(located)), 2) if len(located) else 0.0
+        model = cls(reference)
+        model._ingest(df)
+        model._finalize()
+        logger.info(f"Built hotspot model: {len(model.cluster_summaries)} hotspots, "
+                    f"{int(model.anomalies.sum())} anomalies among {len(df)} incidents")
+        return model
+
+    def extended(self, df):
+        """Return a new model that also covers ``df``, rows appended after the ones already in it"""
+        model = copy.copy(self)
+        model.offense_ids = dict(self.offense_ids)
+        model._ingest(df)
+        model._finalize()
+        logger.info(f"Extended hotspot model with {len(df)} incidents: {len(model.cluster_summaries)} hotspots, "
+                    f"{int(model.anomalies.sum())} anomalies")
+        return model
+
+    @property
+    def rows(self):
+        return len(self.point_cells)
+
+    def _cell_keys(self, latitudes, longitudes):
+        rows = np.floor(latitudes / self.cell_lat)
+        cols = np.floor(longitudes / self.cell_lon)
+        valid = ~(np.isnan(rows) | np.isnan(cols)) & (np.abs(latitudes) <= 90) & (np.abs(longitudes) <= 180)
+        keys = np.full(len(latitudes), _NO_CELL, dtype=np.int64)
+        keys[valid] = rows[valid].astype(np.int64) * _ROW_SHIFT + cols[valid].astype(np.int64) + _COL_OFFSET
+        return keys
+
+    def _offense_codes(self, offenses):
+        """Stable ids for offense names across updates (the last slot collects any overflow)"""
+        codes, uniques = pd.factorize(offenses.astype(object), use_na_sentinel=False)
+        ids = np.array([self.offense_ids.setdefault(name, min(len(self.offense_ids), _OFFENSE_SLOTS - 1))
+                        for name in uniques], dtype=np.int64)
+        return ids[codes]
+
+    def _ingest(self, df):
+        """Append the rows of ``df`` to the per-row arrays and fold them into the cell counts"""
+        latitudes = pd.to_numeric(df['Latitude'], errors='coerce').to_numpy(dtype=np.float64)
+        longitudes = pd.to_numeric(df['Longitude'], errors='coerce').to_numpy(dtype=np.float64)
+        cells = self._cell_keys(latitudes, longitudes)
+        offenses = self._offense_codes(df['Offense'])
+        hours = df['Hour'].to_numpy(dtype=np.int64)
+
+        self.point_cells = np.concatenate([self.point_cells, cells])
+        self.point_offenses = np.concatenate([self.point_offenses, offenses])
+        self.point_hours = np.concatenate([self.point_hours, hours])
+
+        located = cells != _NO_CELL
+        cells = cells[located]
+        self.cell_keys, (self.cell_counts, self.cell_lat_sums, self.cell_lon_sums) = _accumulate(
+            self.cell_keys, [self.cell_counts, self.cell_lat_sums, self.cell_lon_sums],
+            cells, [latitudes[located], longitudes[located]])
+        self.offense_keys, (self.offense_counts,) = _accumulate(
+            self.offense_keys, [self.offense_counts], cells * _OFFENSE_SLOTS + offenses[located])
+        self.hour_keys, (self.hour_counts,) = _accumulate(
+            self.hour_keys, [self.hour_counts], cells * _HOUR_SLOTS + hours[located])
+
+    def _finalize(self):
+        """Label the hotspots and score every row from the current counts"""
+        cell_clusters = self._label_cells()
+        positions, found = _lookup(self.cell_keys, self.point_cells)
+        self.clusters = np.where(found, cell_clusters[positions] if len(cell_clusters) else NOISE, NOISE)
+
+        offense_scores = self._lift_scores(self.offense_keys, self.offense_counts, _OFFENSE_SLOTS)
+        hour_scores = self._lift_scores(self.hour_keys, self.hour_counts, _HOUR_SLOTS)
+        scores = np.zeros(self.rows)
+        cells = np.where(found, self.point_cells, 0)
+        for keys, slot_scores, slots, values in ((self.offense_keys, offense_scores, _OFFENSE_SLOTS, self.point_offenses),
+                                                 (self.hour_keys, hour_scores, _HOUR_SLOTS, self.point_hours)):
+            positions, matched = _lookup(keys, cells * slots + values)
+            scores += np.where(found & matched, slot_scores[positions] if len(slot_scores) else 0, 0)
+        self.scores = np.where(found, np.round(scores, 3), np.nan)
+        self.anomalies = found & (scores >= ANOMALY_BITS)
+        self.cluster_summaries = self._summarize(cell_clusters)
+
+    def _label_cells(self):
+        """Hotspot label of each occupied cell (NOISE outside hotspots)"""
+        n_cells = len(self.cell_keys)
+        threshold = max(MIN_HOTSPOT_INCIDENTS, HOTSPOT_DENSITY * self.cell_counts.mean()) if n_cells else 0
+        dense = self.cell_counts >= threshold
+        dense_positions = np.flatnonzero(dense)
+        dense_keys = self.cell_keys[dense_positions]
+
+        # Connected components of the core cells by label propagation with pointer jumping
+        labels = np.arange(len(dense_keys))
+        edges = []
+        for dr, dc in _NEIGHBOURS[5:]:  # forward half of the neighbourhood; edges are symmetric
+            neighbour, found = _lookup(dense_keys, dense_keys + dr * _ROW_SHIFT + dc)
+            edges.append((np.flatnonzero(found), neighbour[found]))
+        sources = np.concatenate([e[0] for e in edges]) if edges else np.empty(0, dtype=np.int64)
+        targets = np.concatenate([e[1] for e in edges]) if edges else np.empty(0, dtype=np.int64)
+        while len(sources):
+            updated = labels.copy()
+            np.minimum.at(updated, sources, labels[targets])
+            np.minimum.at(updated, targets, labels[sources])
+            updated = updated[updated]
+            if np.array_equal(updated, labels):
+                break
+            labels = updated
+
+        cell_clusters = np.full(n_cells, NOISE, dtype=np.int64)
+        if not len(dense_keys):
+            return cell_clusters
+        cell_clusters[dense_positions] = labels
+
+        # Fringe: sparse cells next to a core cell join the first core neighbour found
+        sparse_positions = np.flatnonzero(~dense)
+        sparse_keys = self.cell_keys[sparse_positions]
+        fringe = np.full(len(sparse_positions), NOISE, dtype=np.int64)
+        for dr, dc in _NEIGHBOURS[1:]:
+            neighbour, found = _lookup(dense_keys, sparse_keys + dr * _ROW_SHIFT + dc)
+            fringe = np.where((fringe == NOISE) & found, labels[neighbour], fringe)
+        cell_clusters[sparse_positions] = fringe
+
+        # Renumber hotspots by incident count, largest first (ties by lowest cell)
+        clustered = cell_clusters != NOISE
+        roots, inverse = np.unique(cell_clusters[clustered], return_inverse=True)
+        sizes = np.bincount(inverse, weights=self.cell_counts[clustered])
+        order = np.lexsort((roots, -sizes))
+        rank = np.empty(len(roots), dtype=np.int64)
+        rank[order] = np.arange(len(roots))
+        cell_clusters[clustered] = rank[inverse]
+        return cell_clusters
+
+    def _lift_scores(self, keys, counts, slots):
+        """Anomaly bits for each (cell, slot) key: citywide over local rate of the slot value"""
+        if not len(keys):
+            return np.empty(0)
+        cells = keys // slots
+        values = keys % slots
+        total = self.cell_counts.sum()
+        global_rates = np.bincount(values, weights=counts, minlength=slots) / total
+        local = _neighbourhood_sums(keys, counts, keys, slots)
+        local_total = _neighbourhood_sums(self.cell_keys, self.cell_counts, cells, 1)
+        return _lift_bits(local, local_total, global_rates[values])
+
+    def _summarize(self, cell_clusters):
+        """Size, centroid, extent and top offense of each hotspot, largest first"""
+        clustered = cell_clusters != NOISE
+        if not clustered.any():
+            return []
+        labels = cell_clusters[clustered]
+        n_clusters = int(labels.max()) + 1
+        counts = np.bincount(labels, weights=self.cell_counts[clustered], minlength=n_clusters)
+        lat_sums = np.bincount(labels, weights=self.cell_lat_sums[clustered], minlength=n_clusters)
+        lon_sums = np.bincount(labels, weights=self.cell_lon_sums[clustered], minlength=n_clusters)
+        cells = np.bincount(labels, minlength=n_clusters)
+        rows = self.cell_keys[clustered] // _ROW_SHIFT
+        cols = self.cell_keys[clustered] % _ROW_SHIFT - _COL_OFFSET
+        anomalies = np.bincount(self.clusters[self.clusters != NOISE],
+                                weights=self.anomalies[self.clusters != NOISE], minlength=n_clusters)
+
+        # Most frequent offense per hotspot, from the (cell, offense) counts
+        offense_cells, found = _lookup(self.cell_keys, self.offense_keys // _OFFENSE_SLOTS)
+        offense_clusters = np.where(found, cell_clusters[offense_cells], NOISE)
+        keep = offense_clusters != NOISE
+        pair_keys, pair_inverse = np.unique(offense_clusters[keep] * _OFFENSE_SLOTS +
+                                            self.offense_keys[keep] % _OFFENSE_SLOTS, return_inverse=True)
+        pair_counts = np.bincount(pair_inverse, weights=self.offense_counts[keep])
+        order = np.lexsort((pair_keys, -pair_counts, pair_keys // _OFFENSE_SLOTS))
+        pair_clusters = pair_keys[order] // _OFFENSE_SLOTS
+        first = order[np.r_[True, pair_clusters[1:] != pair_clusters[:-1]]]
+        names = {slot: name for name, slot in self.offense_ids.items()}
+        top_offense = {int(key // _OFFENSE_SLOTS): names.get(int(key % _OFFENSE_SLOTS)) for key in pair_keys[first]}
+
+        summaries = []
+        for label in range(n_clusters):
+            in_cluster = labels == label
+            summaries.append({
+                'cluster': label,
+                'incidents': int(counts[label]),
+                'cells': int(cells[label]),
+                'latitude': round(float(lat_sums[label] / counts[label]), 6),
+                'longitude': round(float(lon_sums[label] / counts[label]), 6),
+                # [west, south, east, north] of the cells in the hotspot
+                'bbox': [round(float(cols[in_cluster].min() * self.cell_lon), 6),
+                         round(float(rows[in_cluster].min() * self.cell_lat), 6),
+                         round(float((cols[in_cluster].max() + 1) * self.cell_lon), 6),
+                         round(float((rows[in_cluster].max() + 1) * self.cell_lat), 6)],
+                'top_offense': str(top_offense.get(label)),
+                'anomalies': int(anomalies[label])
+            })
+        return summaries
+
+    def hotspots(self, n=None):
+        """Summaries of the ``n`` largest hotspots"""
+        return self.cluster_summaries[:n]
+
+    def label(self, df):
+        """``df`` with Cluster, AnomalyScore and Anomaly columns for its rows.
+
+        Rows are matched by index, so ``df`` must be (a selection of) the
+        frame the model was built from.
+        """
+        positions = df.index.to_numpy()
+        return df.assign(Cluster=self.clusters[positions], AnomalyScore=self.scores[positions],
+                         Anomaly=self.anomalies[positions])
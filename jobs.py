@@ -0,0 +1,203 @@
+import os
+import time
+import uuid
+import queue
+import logging
+import itertools
+import threading
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Lower values run first
+PRIORITY_INTERACTIVE = 0   # chat questions from users
+PRIORITY_BACKGROUND = 10   # monitor-generated insights
+
+DEFAULT_WORKERS = int(os.environ.get('LLM_WORKERS', 2))
+DEFAULT_MAX_PENDING = 64
+DEFAULT_TIMEOUT = 180      # seconds from submission until a job is abandoned
+RESULT_TTL = 600           # seconds a finished job stays queryable
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+
+class JobTimeoutError(Exception):
+    """Raised inside a job that ran past its deadline"""
+
+
+class JobCancelledError(Exception):
+    """Raised inside a job whose result is no longer wanted"""
+
+
+class Job:
+    """A unit of work submitted to a ``JobQueue``.
+
+    ``fn`` is called with the job as its first argument so long-running work
+    can call ``check()`` between steps and stop once the deadline passes or
+    the job is cancelled.
+    """
+
+    def __init__(self, fn, args, kwargs, kind, priority, timeout):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.priority = priority
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.deadline = self.submitted_at + timeout if timeout else None
+        self._done = threading.Event()
+        self._cancelled = threading.Event()
+
+    def expired(self):
+        return self.deadline is not None and time.time() > self.deadline
+
+    def cancel(self):
+        """Ask the job to stop; a queued job is never started, a running one stops at its next ``check()``"""
+        self._cancelled.set()
+
+    def check(self):
+        """Raise JobCancelledError if the job was cancelled, JobTimeoutError if it is past its deadline"""
+        if self._cancelled.is_set():
+            raise JobCancelledError(f"Job {self.id} was cancelled")
+        if self.expired():
+            raise JobTimeoutError(f"Job {self.id} exceeded its timeout")
+
+    def wait(self, timeout=None):
+        """Block until the job finishes; returns whether it did"""
+        return self._done.wait(timeout)
+
+    def _finish(self, status, result=None, error=None):
+        self.status = status
+        self.result = result
+        self.error = error
+        self.finished_at = time.time()
+        self._done.set()
+
+    def to_dict(self):
+        status = self.status
+        if status in ('queued', 'running') and self.expired():
+            status = 'timeout'
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': status,
+            'result': self.result,
+            'error': self.error,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class JobQueue:
+    """In-process priority queue drained by a fixed pool of worker threads.
+
+    Keeps slow LLM calls off the web request threads: handlers submit a job
+    and return its id, and clients poll for the result. At most ``workers``
+    jobs run at once and at most ``max_pending`` wait; interactive jobs are
+    taken ahead of background ones, first come first served within a
+    priority. A job still queued at its deadline is never started.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_pending=DEFAULT_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def _ensure_workers(self):
+        """Start the worker threads on first use"""
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'job-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, fn, *args, kind='job', priority=PRIORITY_INTERACTIVE, timeout=DEFAULT_TIMEOUT, **kwargs):
+        """Queue ``fn(job, *args, **kwargs)`` and return the Job"""
+        job = Job(fn, args, kwargs, kind, priority, timeout)
+        with self._lock:
+            self._purge_finished()
+            if self._queue.qsize() >= self.max_pending:
+                raise QueueFullError(f"Job queue is full ({self.max_pending} pending)")
+            self._ensure_workers()
+            self._jobs[job.id] = job
+            self._queue.put((priority, next(self._order), job))
+        return job
+
+    def get(self, job_id):
+        """Get a job by id, or None if unknown or expired from the results"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {'workers': self.workers, 'pending': self._queue.qsize(), 'jobs': counts}
+
+    def _purge_finished(self):
+        """Forget jobs that finished more than RESULT_TTL seconds ago"""
+        cutoff = time.time() - RESULT_TTL
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def _worker(self):
+        while True:
+            _, _, job = self._queue.get()
+            try:
+                if job._cancelled.is_set():
+                    job._finish('cancelled', error='Cancelled while waiting in the queue')
+                    continue
+                if job.expired():
+                    job._finish('timeout', error='Timed out waiting in the queue')
+                    continue
+                job.status = 'running'
+                job.started_at = time.time()
+                result = job.fn(job, *job.args, **job.kwargs)
+                job._finish('done', result=result)
+            except JobTimeoutError as e:
+                job._finish('timeout', error=str(e))
+            except JobCancelledError as e:
+                job._finish('cancelled', error=str(e))
+            except Exception as e:
+                logger.error(f"Error in {job.kind} job {job.id}: {str(e)}")
+                job._finish('failed', error=str(e))
+            finally:
+                self._queue.task_done()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+JOBS_PENDING = REGISTRY.gauge('llm_jobs_pending', 'Jobs waiting for a worker')
+
+
+def _collect_job_metrics():
+    if _queue is not None:
+        JOBS_PENDING.set(_queue.stats()['pending'])
+
+
+REGISTRY.add_collector(_collect_job_metrics)
+
+
+def get_job_queue():
+    """Get the process-wide job queue shared by the web handlers and the monitor"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
@@ -0,0 +1,145 @@
+import re
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Defaults for the response cache
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_TTL = 3600  # seconds
+
+
+def normalize_prompt(prompt):
+    """Normalize a prompt so trivially different variants share a cache entry"""
+    return re.sub(r'\s+', ' ', prompt).strip().lower()
+
+
+def prompt_key(prompt, model, dataset_version):
+    """Cache key for a prompt sent to ``model`` while ``dataset_version`` is loaded"""
+    raw = f"{model}\x00{dataset_version}\x00{normalize_prompt(prompt)}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """Two-tier cache of LLM responses.
+
+    A bounded in-memory LRU sits in front of a table in the insight
+    database, so responses survive restarts and are shared between the web
+    workers and the monitor. Both tiers honour the same TTL.
+    """
+
+    def __init__(self, db=None, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        """
+        :param db: ``InsightDatabase`` for the persistent tier, or None for memory only
+        :param max_entries: Maximum number of responses kept in memory
+        :param ttl: Seconds a response stays valid
+        """
+        self.db = db
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if self.db is not None:
+            self.db.purge_llm_responses(time.time())
+
+    def get(self, key):
+        """Get a cached response, or None if absent or expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[key]
+
+        cached = self.db.get_llm_response(key, now) if self.db is not None else None
+        with self._lock:
+            if cached is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, cached[0], cached[1])
+        return cached[0]
+
+    def put(self, key, model, response):
+        """Cache a response in both tiers"""
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._remember(key, response, expires_at)
+        if self.db is not None:
+            self.db.add_llm_response(key, model, response, now, expires_at)
+
+    def _remember(self, key, response, expires_at):
+        """Insert into the memory tier, evicting the least recently used entries"""
+        self._entries[key] = (response, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class CachedModel:
+    """Drop-in wrapper adding a response cache in front of a model client.
+
+    Keys combine the normalized prompt, the model name and the dataset
+    version reported by ``dataset_version``, so cached answers are dropped
+    automatically when the data changes. Error responses are never cached.
+    """
+
+    def __init__(self, model, cache, dataset_version=lambda: None):
+        self.model = model
+        self.cache = cache
+        self.dataset_version = dataset_version
+
+    @property
+    def model_name(self):
+        return getattr(self.model, 'model', type(self.model).__name__)
+
+    def _key(self, prompt):
+        return prompt_key(prompt, self.model_name, self.dataset_version())
+
+    def invoke(self, prompt):
+        """Return the cached response for the prompt, or generate and cache it"""
+        key = self._key(prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        response = self.model.invoke(prompt)
+        if response and not response.startswith('Error:'):
+            self.cache.put(key, self.model_name, response)
+        return response
+
+    def stream(self, prompt):
+        """Stream the response, replaying a cached one as a single chunk.
+
+        A freshly generated response is cached only if it streamed to
+        completion: the model's stream must end normally, which for
+        ``OllamaClient`` means the server sent its final chunk. Errors and
+        early closing leave the cache untouched.
+        """
+        key = self._key(prompt)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+        tokens = self.model.stream(prompt)
+        parts = []
+        completed = False
+        try:
+            for token in tokens:
+                parts.append(token)
+                yield token
+            completed = True
+        finally:
+            tokens.close()
+        response = ''.join(parts).strip()
+        if completed and response:
+            self.cache.put(key, self.model_name, response)
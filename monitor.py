@@ -1,137 +1,276 @@
+import io
+import os
 import time
 import threading
 import logging
 import pandas as pd
+from collections import deque
 from datetime import datetime, timedelta
 from crime_agent import CrimeAgent
+from aggregates import CrimeAggregates
+from database import AnalysisBatch
+from jobs import PRIORITY_BACKGROUND, get_job_queue
+from dataset import STREAM_INGEST, TAIL_BYTES, get_dataset_store, iter_crime_csv
+from timing import timed
+from metrics import MONITOR_CYCLES, MONITOR_STAGE_SECONDS
 
 logger = logging.getLogger(__name__)
 
+# Number of past analysis cycles kept for /monitor/status
+RUN_HISTORY = 20
+
+# After a failed cycle the next one is retried after RETRY_DELAY seconds,
+# doubling with each consecutive failure up to MAX_RETRY_DELAY
+RETRY_DELAY = 30
+MAX_RETRY_DELAY = 900
+
 class CrimeMonitor:
-    def __init__(self, data_file='October2024.csv', analysis_interval=300):
+    def __init__(self, data_file='October2024.csv', analysis_interval=300, history=RUN_HISTORY, stream=STREAM_INGEST):
         """
         Initialize the crime monitor
         :param data_file: CSV file containing crime data
         :param analysis_interval: How often to run analysis (in seconds)
+        :param history: Number of past analysis cycles to keep
+        :param stream: Recompute aggregates by reading the file in chunks instead of loading it whole
         """
         self.data_file = data_file
         self.analysis_interval = analysis_interval
-        self.crime_agent = CrimeAgent()
+        self.stream = stream
+        self.crime_agent = CrimeAgent(data_file)
         self.last_analysis = None
+        self.aggregates = None
+        self._file_state = None
         self.running = False
         self.thread = None
+        self.runs = deque(maxlen=history)
+        self.failures = 0
+        self.next_run = None
+        self._wake = threading.Event()
+        self._run_requested = False
+        self._lock = threading.Lock()
         
     def start(self):
-        """Start the monitoring process"""
-        if self.running:
-            logger.warning("Monitor is already running")
-            return
-            
-        self.running = True
-        self.thread = threading.Thread(target=self._monitor_loop)
-        self.thread.daemon = True
-        self.thread.start()
+        """Start the monitoring process; the first cycle runs right away"""
+        with self._lock:
+            if self.running:
+                logger.warning("Monitor is already running")
+                return False
+            self.running = True
+            self.next_run = time.time()
+            # A thread still finishing a cycle after stop() simply carries on
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._monitor_loop, name='crime-monitor')
+                self.thread.daemon = True
+                self.thread.start()
+        self._wake.set()
         logger.info("Crime monitor started")
+        return True
         
-    def stop(self):
-        """Stop the monitoring process"""
-        self.running = False
-        if self.thread:
-            self.thread.join()
-        logger.info("Crime monitor stopped")
+    def stop(self, timeout=None):
+        """Stop the monitoring process.
+
+        Waits up to ``timeout`` seconds (forever if None) for a cycle in
+        progress to finish; returns whether the monitor thread has exited.
+        """
+        with self._lock:
+            self.running = False
+            thread = self.thread
+        self._wake.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        stopped = thread is None or not thread.is_alive()
+        logger.info("Crime monitor stopped" if stopped else "Crime monitor stopping after the current cycle")
+        return stopped
+
+    def run_now(self):
+        """Trigger an analysis cycle without waiting for the interval; returns False if not running"""
+        if not self.running:
+            return False
+        self._run_requested = True
+        self._wake.set()
+        return True
         
     def _monitor_loop(self):
-        """Main monitoring loop"""
+        """Run analysis cycles every ``analysis_interval`` seconds until stopped"""
         while True:
-            try:
-                current_time = datetime.now()
-                
-                # Run analysis if it's the first time or if enough time has passed
-                if (not self.last_analysis or 
-                    (current_time - self.last_analysis).total_seconds() >= self.analysis_interval):
-                    
-                    logger.info("Starting scheduled crime data analysis")
-                    
-                    # Read and analyze the data
-                    df = pd.read_csv(self.data_file)
-                    
-                    # Convert date and extract temporal features
-                    df['IncidentDate'] = pd.to_datetime(df['IncidentDate'], errors='coerce')
-                    
-                    # Parse time and extract hour
-                    def extract_hour(time_str):
-                        try:
-                            if pd.isna(time_str):
-                                return 0
-                            if isinstance(time_str, str):
-                                time_parts = time_str.split(':')
-                                if len(time_parts) >= 1:
-                                    hour = int(time_parts[0])
-                                    if 0 <= hour < 24:  # Validate hour is in valid range
-                                        return hour
-                            return 0
-                        except Exception as e:
-                            logger.error(f"Error extracting hour from {time_str}: {str(e)}")
-                            return 0
-
-                    # Extract temporal features
-                    df['Hour'] = df['OccurredFromTime'].apply(extract_hour)
-                    df['DayOfWeek'] = df['IncidentDate'].dt.day_name()
-                    df['Month'] = df['IncidentDate'].dt.month_name()
-                    df['Year'] = df['IncidentDate'].dt.year
-                    
-                    # Perform temporal analysis
-                    self.crime_agent._analyze_temporal_patterns(df)
-                    
-                    # Analyze crime patterns
-                    self.crime_agent._analyze_crime_patterns(df)
-                    
-                    # Analyze victim patterns
-                    self.crime_agent._analyze_victim_patterns(df)
-                    
-                    # Generate AI-powered insights using the language model
-                    self._generate_ai_insights(df)
-                    
-                    self.last_analysis = current_time
-                    logger.info("Scheduled analysis completed")
-                
-                # Sleep for a short interval before checking again
-                time.sleep(60)  # Check every minute
-                
-            except Exception as e:
-                logger.error(f"Error in monitoring loop: {str(e)}")
-                time.sleep(30)  # On error, wait longer before retry
+            with self._lock:
+                if not self.running:
+                    self.thread = None
+                    return
+            
+            delay = self.next_run - time.time()
+            if delay > 0 and not self._run_requested:
+                # Sleep until the next cycle is due, or until woken by stop() or run_now()
+                self._wake.wait(delay)
+                self._wake.clear()
                 continue
+            
+            self._run_requested = False
+            logger.info("Starting scheduled crime data analysis")
+            run = self._run_cycle()
+            
+            if run['status'] == 'error':
+                # Back off exponentially while the cycle keeps failing
+                self.failures += 1
+                delay = min(RETRY_DELAY * 2 ** (self.failures - 1), MAX_RETRY_DELAY)
+                logger.info(f"Retrying analysis in {delay} seconds")
+            else:
+                self.failures = 0
+                delay = self.analysis_interval
+                logger.info("Scheduled analysis completed")
+            self.next_run = time.time() + delay
+
+    def _run_cycle(self):
+        """Run one analysis cycle and record its outcome and stage timings"""
+        started = time.time()
+        run = {
+            'started_at': datetime.fromtimestamp(started).strftime('%Y-%m-%d %H:%M:%S'),
+            'status': 'ok',
+            'stages': {}
+        }
+        try:
+            if not self.run_analysis(run):
+                run['status'] = 'skipped'
+            self.last_analysis = datetime.now()
+        except Exception as e:
+            logger.error(f"Error in monitoring loop: {str(e)}")
+            run['status'] = 'error'
+            run['error'] = str(e)
+        run['duration'] = round(time.time() - started, 6)
+        self.runs.append(run)
+        for stage, seconds in run['stages'].items():
+            MONITOR_STAGE_SECONDS.observe(seconds, stage=stage)
+        MONITOR_CYCLES.inc(status=run['status'])
+        return run
+
+    def status(self):
+        """Scheduler state and the recorded cycles, most recent first"""
+        return {
+            'running': self.running,
+            'last_analysis': self.last_analysis.strftime('%Y-%m-%d %H:%M:%S') if self.last_analysis else None,
+            'next_run': datetime.fromtimestamp(self.next_run).strftime('%Y-%m-%d %H:%M:%S') if self.running and self.next_run else None,
+            'analysis_interval': self.analysis_interval,
+            'consecutive_failures': self.failures,
+            'data_file': self.data_file,
+            'runs': list(reversed(self.runs))
+        }
                 
-    def _generate_ai_insights(self, df):
+    def run_analysis(self, run=None):
+        """Bring the aggregates up to date with the data file and store the results.
+
+        Skips the cycle (returning False) when the file is unchanged; when
+        rows were only appended, parses just the new bytes and folds them
+        into the existing aggregates instead of recomputing everything. The
+        update mode, row count and per-stage wall times are recorded in
+        ``run`` if given.
+        """
+        run = {} if run is None else run
+        timings = run.setdefault('stages', {})
+        with timed(timings, 'load'):
+            if not self._update_aggregates(run):
+                return False
+        
+        # Collect temporal, crime and victim patterns and the summary report
+        batch = self.crime_agent.analyze_aggregates(self.aggregates, AnalysisBatch(), timings)
+        
+        # Generate AI-powered insights using the language model
+        with timed(timings, 'ai_insights'):
+            self._generate_ai_insights(self.aggregates, batch)
+        
+        # Publish the whole run at once
+        with timed(timings, 'write'):
+            self.crime_agent.db.write_batch(batch)
+        return True
+
+    def _update_aggregates(self, run):
+        """Bring ``self.aggregates`` up to date with the data file; returns False if it is unchanged"""
+        stat = os.stat(self.data_file)
+        state = self._file_state
+        if state and (stat.st_mtime_ns, stat.st_size) == (state['mtime'], state['size']):
+            logger.info("Data file unchanged, skipping analysis")
+            run['mode'] = 'unchanged'
+            return False
+        
+        if state and self.aggregates is not None and self._is_append(state, stat.st_size):
+            new_rows = self._read_appended(state, stat)
+            if not new_rows:
+                # Only a partial row so far; it is read once its newline arrives
+                logger.info("No complete rows appended, skipping analysis")
+                run['mode'] = 'unchanged'
+                return False
+            run.update(mode='incremental', rows=new_rows)
+            logger.info(f"Folding {new_rows} appended rows into existing aggregates")
+        else:
+            if self.stream:
+                # Fold the file in chunk by chunk; peak memory stays at one chunk
+                self.aggregates = CrimeAggregates.from_csv(self.data_file)
+                mtime, size = stat.st_mtime_ns, stat.st_size
+            else:
+                # Get the shared, already-parsed dataset (reloaded only if the file changed)
+                store = get_dataset_store(self.data_file)
+                self.aggregates = CrimeAggregates.from_frame(store.get())
+                mtime, size = store.fingerprint
+            with open(self.data_file, 'rb') as f:
+                header = f.readline()
+            self._file_state = {
+                'mtime': mtime,
+                'size': size,
+                'header': header,
+                'tail': self._read_range(max(0, size - TAIL_BYTES), size)
+            }
+            run.update(mode='full', rows=self.aggregates.total)
+            logger.info(f"Recomputed aggregates from {self.aggregates.total} rows")
+        return True
+
+    def _read_range(self, start, end):
+        """Read bytes [start, end) of the data file"""
+        with open(self.data_file, 'rb') as f:
+            f.seek(start)
+            return f.read(end - start)
+
+    def _is_append(self, state, size):
+        """Whether the file only grew past the last analyzed size, ending on a complete row"""
+        if size <= state['size'] or not state['tail'].endswith(b'\n'):
+            return False
+        tail_start = state['size'] - len(state['tail'])
+        return self._read_range(tail_start, state['size']) == state['tail']
+
+    def _read_appended(self, state, stat):
+        """Parse the complete rows appended since the last cycle and fold them in"""
+        data = self._read_range(state['size'], stat.st_size)
+        # A trailing partial row is left for the next cycle
+        data = data[:data.rfind(b'\n') + 1]
+        if not data:
+            return 0
+        rows = 0
+        for chunk, _ in iter_crime_csv(io.BytesIO(state['header'] + data)):
+            self.aggregates.update(chunk)
+            rows += len(chunk)
+        
+        size = state['size'] + len(data)
+        state.update({
+            'mtime': stat.st_mtime_ns if size == stat.st_size else None,
+            'size': size,
+            'tail': (state['tail'] + data)[-TAIL_BYTES:]
+        })
+        return rows
+
+    def _generate_ai_insights(self, aggregates, batch):
         """Generate AI-powered insights using the language model"""
         try:
-            # Get recent patterns
-            hourly_pattern = self.crime_agent.db.get_pattern('hourly')
-            daily_pattern = self.crime_agent.db.get_pattern('daily')
-            monthly_pattern = self.crime_agent.db.get_pattern('monthly')
-            crime_pattern = self.crime_agent.db.get_pattern('crime_types')
-            location_pattern = self.crime_agent.db.get_pattern('locations')
-            
-            # Create a context for the AI
-            context = {
-                'total_crimes': len(df),
-                'date_range': f"{df['Date'].min()} to {df['Date'].max()}",
-                'hourly_pattern': hourly_pattern,
-                'daily_pattern': daily_pattern,
-                'monthly_pattern': monthly_pattern,
-                'crime_pattern': crime_pattern,
-                'location_pattern': location_pattern
-            }
+            hourly_pattern = aggregates.hourly_pattern()
+            daily_pattern = aggregates.daily_pattern()
+            crime_pattern = aggregates.crime_type_pattern()
+            location_pattern = aggregates.location_pattern()
             
             # Generate insights using the language model
             prompt = f"""Analyze the following crime statistics and generate 3 key insights:
-            Time period: {context['date_range']}
-            Total crimes: {context['total_crimes']}
+            Time period: {aggregates.date_range}
+            Total crimes: {aggregates.total}
             
             Key patterns:
-            - Most common crime type: {crime_pattern.get('counts', {}).get('top_crime', 'Unknown')}
-            - Most affected location: {location_pattern.get('counts', {}).get('top_location', 'Unknown')}
+            - Most common crime type: {crime_pattern.get('top_crime', 'Unknown')}
+            - Most affected location: {location_pattern.get('top_location', 'Unknown')}
             - Peak crime hour: {hourly_pattern.get('peak_hour', 'Unknown')}
             - Busiest day: {daily_pattern.get('busiest_day', 'Unknown')}
             
@@ -141,13 +280,19 @@ class CrimeMonitor:
             3. Public safety recommendations
             """
             
-            response = self.crime_agent.llm(prompt)
-            insights = response.split('\n')
+            # Queue behind interactive requests so users aren't kept waiting on the monitor
+            job = get_job_queue().submit(lambda job: self.crime_agent.generate(prompt, job),
+                                         kind='monitor_insights', priority=PRIORITY_BACKGROUND)
+            job.wait()
+            if job.status != 'done':
+                logger.warning(f"AI insight generation {job.status}: {job.error}")
+                return
+            insights = job.result.split('\n')
             
             # Store AI-generated insights
             for insight in insights:
                 if insight.strip():
-                    self.crime_agent.db.add_insight(
+                    batch.add_insight(
                         insight_text=insight.strip(),
                         insight_type='ai_analysis',
                         confidence=0.85,
@@ -159,6 +304,5 @@ class CrimeMonitor:
         except Exception as e:
             logger.error(f"Error generating AI insights: {str(e)}")
 
-# Create and start the monitor when this module is imported
+# Shared monitor instance; started by the app (or /monitor/start), not on import
 monitor = CrimeMonitor()
-monitor.start()
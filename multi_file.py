@@ -0,0 +1,91 @@
+"""Aggregate many crime CSV files (e.g. one per month) in parallel.
+
+Each file is parsed and reduced to ``CrimeAggregates`` in a worker process;
+the parent merges the partial results, so re-analysing years of history
+scales with the number of cores.
+
+Usage: python multi_file.py 'data/*.csv' [--workers 8]
+"""
+import os
+import glob
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from aggregates import CrimeAggregates
+from dataset import DatasetStore
+
+logger = logging.getLogger(__name__)
+
+
+def expand_paths(patterns):
+    """Expand file paths, directories (all .csv files inside) and glob patterns, sorted and deduplicated"""
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.update(glob.glob(os.path.join(pattern, '*.csv')))
+        else:
+            paths.update(glob.glob(pattern) or ([pattern] if os.path.exists(pattern) else []))
+    return sorted(paths)
+
+
+def aggregate_file(file_path):
+    """Parse one file and reduce it to aggregates, or None if it can't be read.
+
+    Runs in a worker process. The parsed file goes through the column cache
+    like the app's own dataset, so re-analysing unchanged files skips the
+    CSV parse.
+    """
+    try:
+        df = DatasetStore(file_path).get()
+        return CrimeAggregates.from_frame(df)
+    except Exception as e:
+        logger.error(f"Error aggregating {file_path}: {str(e)}")
+        return None
+
+
+def aggregate_files(file_paths, workers=None):
+    """Aggregate ``file_paths`` in a process pool and merge the results.
+
+    :param file_paths: Paths, directories or glob patterns of crime CSV files
+    :param workers: Number of worker processes (default: one per core)
+    :return: Merged ``CrimeAggregates`` (files that failed are skipped)
+    """
+    paths = expand_paths(file_paths)
+    if not paths:
+        raise ValueError(f"No data files match {file_paths}")
+    workers = max(1, min(workers or os.cpu_count() or 1, len(paths)))
+
+    logger.info(f"Aggregating {len(paths)} files with {workers} worker processes")
+    if workers == 1:
+        partials = map(aggregate_file, paths)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        partials = executor.map(aggregate_file, paths)
+
+    merged = CrimeAggregates()
+    try:
+        for path, partial in zip(paths, partials):
+            if partial is None:
+                logger.warning(f"Skipping {path}")
+                continue
+            merged.merge(partial)
+    finally:
+        if workers > 1:
+            executor.shutdown()
+    logger.info(f"Aggregated {merged.total} incidents from {len(paths)} files")
+    return merged
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='+', help='CSV files, directories or glob patterns')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per core)')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from crime_agent import CrimeAgent
+    agent = CrimeAgent(expand_paths(args.paths)[0])
+    aggregates = agent.analyze_files(args.paths, workers=args.workers)
+    logger.info(f"Stored patterns for {aggregates.total} incidents ({aggregates.date_range})")
@@ -0,0 +1,156 @@
+import os
+import json
+import socket
+import logging
+import threading
+import http.client
+import time
+from urllib.parse import urlsplit
+from metrics import LLM_ERRORS, LLM_REQUEST_SECONDS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = os.environ.get('OLLAMA_HOST', 'http://127.0.0.1:11434')
+DEFAULT_MODEL = os.environ.get('OLLAMA_MODEL', 'llama3.2')
+
+# Prompts longer than this are cut down before being sent to the model
+MAX_PROMPT_CHARS = 4000
+
+
+def truncate_prompt(prompt):
+    """Limit prompt length to MAX_PROMPT_CHARS characters"""
+    if len(prompt) > MAX_PROMPT_CHARS:
+        return prompt[:MAX_PROMPT_CHARS - 100] + "... [truncated for length]"
+    return prompt
+
+
+class OllamaClient:
+    """Client for the Ollama HTTP API over persistent keep-alive connections.
+
+    Each thread reuses one HTTP connection to the server, and requests ask
+    the server to keep the model loaded between calls (``keep_alive``), so
+    a question costs one request on an open socket instead of a process
+    spawn plus model attach. ``invoke`` returns the whole response, or
+    "Error: ..." on failure; ``stream`` yields tokens as they are generated.
+    """
+
+    def __init__(self, model=DEFAULT_MODEL, host=DEFAULT_HOST, connect_timeout=5.0,
+                 read_timeout=120.0, keep_alive='10m', options=None):
+        """
+        :param model: Model name to generate with
+        :param host: Base URL of the Ollama-compatible server
+        :param connect_timeout: Seconds to wait when opening a connection
+        :param read_timeout: Seconds to wait for each read from the server
+        :param keep_alive: How long the server should keep the model loaded after a call
+        :param options: Extra model options (temperature, num_predict, ...)
+        """
+        url = urlsplit(host if '://' in host else f'http://{host}')
+        self.model = model
+        self.host = url.hostname or '127.0.0.1'
+        self.port = url.port or 11434
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.keep_alive = keep_alive
+        self.options = options or {}
+        self._local = threading.local()
+
+    def _connection(self):
+        """Get this thread's persistent connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.connect_timeout)
+            conn.connect()
+            conn.sock.settimeout(self.read_timeout)
+            conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._local.conn = conn
+        return conn
+
+    def _discard_connection(self):
+        """Close this thread's connection so the next request opens a new one"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _request(self, prompt, stream):
+        """POST a generate request and return the open response.
+
+        A keep-alive connection the server has since closed fails on first
+        use, so a failed send on a reused connection is retried once on a
+        fresh one.
+        """
+        body = json.dumps({
+            'model': self.model,
+            'prompt': truncate_prompt(prompt),
+            'stream': stream,
+            'keep_alive': self.keep_alive,
+            'options': self.options
+        }).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        for attempt in range(2):
+            reused = getattr(self._local, 'conn', None) is not None
+            try:
+                conn = self._connection()
+                conn.request('POST', '/api/generate', body=body, headers=headers)
+                response = conn.getresponse()
+            except (http.client.HTTPException, OSError) as e:
+                self._discard_connection()
+                if reused and attempt == 0 and not isinstance(e, TimeoutError):
+                    continue
+                raise
+            if response.status != 200:
+                detail = response.read().decode('utf-8', errors='replace')
+                raise RuntimeError(f"Ollama returned HTTP {response.status}: {detail}")
+            return response
+
+    def stream(self, prompt):
+        """Yield response tokens as the model generates them.
+
+        Raises ConnectionError if the body ends before the final (done)
+        chunk, so a cut-off reply is never mistaken for a whole one. Closing the generator early (e.g. the client went away) drops the
+        connection, which makes the server stop generating.
+        """
+        start = time.perf_counter()
+        done = False
+        try:
+            response = self._request(prompt, stream=True)
+            while True:
+                line = response.readline()
+                if not line:
+                    # A complete reply ends with a done chunk; without one the text is cut short
+                    raise ConnectionError("Ollama stream ended before the final chunk")
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if chunk.get('error'):
+                    raise RuntimeError(chunk['error'])
+                if chunk.get('response'):
+                    yield chunk['response']
+                if chunk.get('done'):
+                    done = True
+                    break
+        except Exception:
+            LLM_ERRORS.inc(operation='stream')
+            raise
+        finally:
+            if done:
+                # Drain the rest of the body so the connection can be reused
+                response.read()
+            else:
+                self._discard_connection()
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, operation='stream')
+
+    def invoke(self, prompt):
+        """Generate a complete response from the model"""
+        start = time.perf_counter()
+        try:
+            response = self._request(prompt, stream=False)
+            result = json.loads(response.read())
+            return result.get('response', '').strip()
+        except Exception as e:
+            self._discard_connection()
+            LLM_ERRORS.inc(operation='invoke')
+            logger.error(f"Ollama error: {str(e)}")
+            return f"Error: {str(e)}"
+        finally:
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, operation='invoke')
@@ -0,0 +1,116 @@
+"""Minimal stand-in for the Ollama HTTP API, for running the app and its LLM paths offline.
+
+Implements POST /api/generate (streaming and non-streaming) and GET /api/tags.
+Replies are deterministic, built from the prompt, with an optional per-token delay
+to mimic generation speed.
+
+Usage: python ollama_stub.py [--port 11434] [--delay 0.02]
+"""
+import json
+import time
+import argparse
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+
+def stub_reply(prompt):
+    """Deterministic reply for a prompt"""
+    first_line = next((line.strip() for line in prompt.splitlines() if line.strip()), '')
+    return (f"Stub analysis of: {first_line[:80]}\n"
+            f"1. Patterns are consistent with the provided statistics.\n"
+            f"2. Focus patrols on the highest-count areas and hours.\n"
+            f"3. Review data quality issues before acting on trends.")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real server
+    disable_nagle_algorithm = True
+    token_delay = 0.0
+    truncate_after = None  # end streamed bodies after this many tokens, without the done chunk
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/api/tags':
+            self._send_json(200, {'models': [{'name': 'llama3.2'}]})
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path != '/api/generate':
+            self._send_json(404, {'error': 'not found'})
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        model = request.get('model', 'llama3.2')
+        reply = stub_reply(request.get('prompt', ''))
+
+        if not request.get('stream', True):
+            time.sleep(self.token_delay * len(reply.split(' ')))
+            self._send_json(200, {'model': model, 'response': reply, 'done': True})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            tokens = reply.split(' ')
+            for i, token in enumerate(tokens):
+                text = token if i == len(tokens) - 1 else token + ' '
+                if self.truncate_after is not None and i >= self.truncate_after:
+                    break
+                self._write_chunk({'model': model, 'response': text, 'done': False})
+                time.sleep(self.token_delay)
+            else:
+                self._write_chunk({'model': model, 'response': '', 'done': True})
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            # Client cancelled the generation
+            self.close_connection = True
+
+    def _write_chunk(self, payload):
+        data = json.dumps(payload).encode('utf-8') + b'\n'
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b'\r\n')
+        self.wfile.flush()
+
+
+def start_stub_server(port=0, token_delay=0.0, truncate_after=None):
+    """Start the stub in a background thread; returns the server (see ``server_address``).
+
+    With ``truncate_after`` streamed replies stop after that many tokens and
+    the body ends without the final done chunk, like a server that died mid-reply.
+    """
+    handler = type('ConfiguredStubHandler', (StubHandler,),
+                   {'token_delay': token_delay, 'truncate_after': truncate_after})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=11434)
+    parser.add_argument('--delay', type=float, default=0.02, help='seconds per streamed token')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    server = start_stub_server(args.port, args.delay)
+    logger.info(f"Ollama stub listening on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,168 @@
+import gzip
+import json
+import struct
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+from dataset import fill_missing
+from hotspots import NOISE
+
+logger = logging.getLogger(__name__)
+
+# Binary columnar form of the map records (see ``encode_columnar``)
+COLUMNAR_MIMETYPE = 'application/vnd.crimestl.columnar'
+COLUMNAR_MAGIC = b'CRM1'
+COLUMNAR_ALIGN = 8
+
+# Record fields sent as codes into the shared string table
+DICTIONARY_FIELDS = ['crime_type', 'category', 'date', 'time', 'day_of_week', 'month', 'neighborhood']
+
+# Wire types of the other fields
+NUMERIC_FIELDS = {
+    'latitude': 'float32',
+    'longitude': 'float32',
+    'hour': 'uint8',
+    'year': 'uint16',
+    'cluster': 'int32',
+    'is_anomaly': 'uint8'
+}
+
+
+def _column_or(df, column, default):
+    """Return ``column`` with missing values replaced, or a constant column if absent"""
+    if column in df.columns:
+        return fill_missing(df[column], default)
+    return pd.Series(default, index=df.index)
+
+
+def format_dates(dates, missing='Unknown'):
+    """Format a datetime series as YYYY-MM-DD, formatting each distinct date once"""
+    codes, uniques = pd.factorize(dates, use_na_sentinel=True)
+    labels = np.append(pd.DatetimeIndex(uniques).strftime('%Y-%m-%d').to_numpy(dtype=object), missing)
+    return pd.Series(labels[codes], index=dates.index)
+
+
+def crime_records(df):
+    """Build the per-incident fields served to the map, column by column.
+
+    Rows without coordinates are dropped. Column order matches the keys of
+    the JSON objects returned by ``/get_crime_data``.
+    """
+    df = df[df['Latitude'].notna() & df['Longitude'].notna()]
+    return pd.DataFrame({
+        'latitude': df['Latitude'].astype(float),
+        'longitude': df['Longitude'].astype(float),
+        'crime_type': _column_or(df, 'Offense', 'Unknown').astype(str),
+        'category': _column_or(df, 'Category', 'Other').astype(str),
+        'date': format_dates(df['IncidentDate']),
+        'time': df['OccurredFromTime'].astype(str),  # Keep original time string
+        'hour': df['Hour'].astype(int),
+        'day_of_week': df['DayOfWeek'].astype(str),
+        'month': df['Month'].astype(str),
+        'year': df['Year'].fillna(0).astype(int),
+        'neighborhood': _column_or(df, 'Neighborhood', 'Unknown').astype(str),
+        'cluster': _column_or(df, 'Cluster', NOISE).astype(int),
+        'is_anomaly': _column_or(df, 'Anomaly', False).astype(bool)
+    })
+
+
+def records_json(records):
+    """Serialize map records as a JSON array of objects"""
+    return records.to_json(orient='records', double_precision=10)
+
+
+def filter_records(records, categories=None, year=None):
+    """Return a boolean mask selecting records in ``categories`` and ``year``"""
+    mask = np.ones(len(records), dtype=bool)
+    if categories is not None:
+        mask &= records['category'].isin(categories).to_numpy()
+    if year is not None:
+        mask &= (records['year'] == year).to_numpy()
+    return mask
+
+
+def crime_summary(records, top_neighborhoods=5):
+    """Dashboard totals over all mapped incidents"""
+    neighborhoods = records['neighborhood'].value_counts().head(top_neighborhoods)
+    years = sorted(int(y) for y in records['year'].unique())
+    return {
+        'total': len(records),
+        'categories': {str(k): int(v) for k, v in records['category'].value_counts().items()},
+        'top_neighborhoods': [[str(k), int(v)] for k, v in neighborhoods.items()],
+        'anomalies': int(records['is_anomaly'].sum()),
+        'years': years
+    }
+
+
+def build_crime_data_payload(records, last_modified=None):
+    """Serialize the full crime list once, with validators for conditional requests.
+
+    Returns a dict with the JSON ``body`` bytes, a strong ``etag`` derived
+    from the body and the ``last_modified`` time of the source data.
+    """
+    body = records_json(records).encode('utf-8')
+    logger.info(f"Built crime data payload: {len(records)} incidents, {len(body)} bytes")
+    return {
+        'body': body,
+        'etag': hashlib.sha1(body).hexdigest(),
+        'last_modified': last_modified
+    }
+
+
+def encode_columnar(records):
+    """Encode map records as typed little-endian columns with a shared string table.
+
+    Layout: the magic ``CRM1``, the byte length of a UTF-8 JSON header as
+    uint32, the header, then the columns from the next multiple of 8 bytes,
+    each also starting at a multiple of 8. The header lists the row
+    ``count``, the ``strings`` table and, for each column, its ``name``,
+    ``type``, byte ``offset`` within the column section and whether it holds
+    codes into ``strings``. Columns keep the field order of the JSON records.
+    """
+    strings = {}
+    arrays = {}
+    for field in records.columns:
+        if field in DICTIONARY_FIELDS:
+            codes, uniques = pd.factorize(records[field], use_na_sentinel=False)
+            lookup = np.array([strings.setdefault(str(value), len(strings)) for value in uniques], dtype=np.int64)
+            arrays[field] = lookup[codes]
+        else:
+            arrays[field] = records[field].to_numpy().astype(NUMERIC_FIELDS[field])
+    code_type = 'uint16' if len(strings) <= np.iinfo(np.uint16).max + 1 else 'uint32'
+
+    columns = []
+    offset = 0
+    for field, values in arrays.items():
+        dtype = code_type if field in DICTIONARY_FIELDS else NUMERIC_FIELDS[field]
+        arrays[field] = values = values.astype(np.dtype(dtype).newbyteorder('<'))
+        columns.append({'name': field, 'type': dtype, 'offset': offset, 'dictionary': field in DICTIONARY_FIELDS})
+        offset += -(-values.nbytes // COLUMNAR_ALIGN) * COLUMNAR_ALIGN
+
+    header = {'version': 1, 'count': len(records), 'strings': list(strings), 'columns': columns}
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    start = -(-(8 + len(header_bytes)) // COLUMNAR_ALIGN) * COLUMNAR_ALIGN
+
+    buffer = bytearray(start + offset)
+    buffer[:8] = COLUMNAR_MAGIC + struct.pack('<I', len(header_bytes))
+    buffer[8:8 + len(header_bytes)] = header_bytes
+    for column in columns:
+        data = arrays[column['name']].tobytes()
+        buffer[start + column['offset']:start + column['offset'] + len(data)] = data
+    return bytes(buffer)
+
+
+def build_columnar_payload(records, last_modified=None):
+    """Encode and gzip the columnar records once, with validators for conditional requests.
+
+    Returns a dict with the gzipped ``body``, a strong ``etag`` and the
+    ``last_modified`` time of the source data.
+    """
+    raw = encode_columnar(records)
+    body = gzip.compress(raw, compresslevel=6, mtime=0)
+    logger.info(f"Built columnar crime payload: {len(records)} incidents, {len(raw)} bytes, {len(body)} gzipped")
+    return {
+        'body': body,
+        'etag': hashlib.sha1(body).hexdigest(),
+        'last_modified': last_modified
+    }
@@ -0,0 +1,164 @@
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class GridIndex:
+    """Uniform lat/lon grid index over a set of points.
+
+    Points are sorted by the id of the grid cell they fall in, so every row of
+    cells intersecting a bounding box maps to one contiguous slice of the
+    sorted order. A query costs one binary search per cell row plus the
+    points actually in view.
+    """
+
+    def __init__(self, latitudes, longitudes, cell_size=0.005):
+        """
+        :param latitudes: Point latitudes (no NaNs)
+        :param longitudes: Point longitudes (no NaNs)
+        :param cell_size: Grid cell edge in degrees (0.005 is roughly 500m)
+        """
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self.cell_size = cell_size
+
+        if len(self.latitudes):
+            self.min_lat = float(self.latitudes.min())
+            self.min_lon = float(self.longitudes.min())
+            max_lat = float(self.latitudes.max())
+            max_lon = float(self.longitudes.max())
+        else:
+            self.min_lat = self.min_lon = max_lat = max_lon = 0.0
+        self.n_rows = int((max_lat - self.min_lat) // cell_size) + 1
+        self.n_cols = int((max_lon - self.min_lon) // cell_size) + 1
+
+        cell_ids = self._cell_rows(self.latitudes) * self.n_cols + self._cell_cols(self.longitudes)
+        self.order = np.argsort(cell_ids, kind='stable')
+        self.sorted_cell_ids = cell_ids[self.order]
+        logger.info(f"Built grid index over {len(self.order)} points "
+                    f"({self.n_rows}x{self.n_cols} cells of {cell_size} degrees)")
+
+    def _cell_rows(self, latitudes):
+        rows = np.floor((np.asarray(latitudes) - self.min_lat) / self.cell_size).astype(np.int64)
+        return np.clip(rows, 0, self.n_rows - 1)
+
+    def _cell_cols(self, longitudes):
+        cols = np.floor((np.asarray(longitudes) - self.min_lon) / self.cell_size).astype(np.int64)
+        return np.clip(cols, 0, self.n_cols - 1)
+
+    def query(self, min_lat, min_lon, max_lat, max_lon):
+        """Return the positions of the points inside the bounding box, in index order"""
+        if not len(self.order) or min_lat > max_lat or min_lon > max_lon:
+            return np.empty(0, dtype=np.int64)
+
+        row_start, row_end = self._cell_rows([min_lat, max_lat])
+        col_start, col_end = self._cell_cols([min_lon, max_lon])
+        row_ids = np.arange(row_start, row_end + 1) * self.n_cols
+        starts = np.searchsorted(self.sorted_cell_ids, row_ids + col_start, side='left')
+        ends = np.searchsorted(self.sorted_cell_ids, row_ids + col_end, side='right')
+        if not len(starts):
+            return np.empty(0, dtype=np.int64)
+        candidates = np.concatenate([self.order[s:e] for s, e in zip(starts, ends)])
+
+        # Cells on the edge of the box are only partly inside it
+        lats = self.latitudes[candidates]
+        lons = self.longitudes[candidates]
+        inside = (lats >= min_lat) & (lats <= max_lat) & (lons >= min_lon) & (lons <= max_lon)
+        return np.sort(candidates[inside])
+
+
+def parse_bbox(value):
+    """Parse a 'west,south,east,north' string (Leaflet's toBBoxString order)"""
+    west, south, east, north = (float(part) for part in value.split(','))
+    return south, west, north, east
+
+
+def cluster_cell_size(zoom):
+    """Aggregation cell edge in degrees for a map zoom level (about 64px per cell)"""
+    return 360.0 / 2 ** (zoom + 2)
+
+
+class ClusterGrid:
+    """Per-zoom aggregation of points into fixed grid cells.
+
+    Counts, anomaly counts and coordinate sums are binned once per cell,
+    category and year with ``np.bincount``, so a query only slices and sums
+    the precomputed table for the requested filters.
+    """
+
+    def __init__(self, records, zoom, categories):
+        """
+        :param records: Map records (see ``payloads.crime_records``)
+        :param zoom: Map zoom level the cells are sized for
+        :param categories: Category names; other categories count as the last one
+        """
+        self.zoom = zoom
+        self.cell_size = cluster_cell_size(zoom)
+        self.categories = list(categories)
+
+        latitudes = records['latitude'].to_numpy(dtype=np.float64)
+        longitudes = records['longitude'].to_numpy(dtype=np.float64)
+        cell_rows = np.floor(latitudes / self.cell_size).astype(np.int64)
+        cell_cols = np.floor(longitudes / self.cell_size).astype(np.int64)
+        min_row = cell_rows.min() if len(cell_rows) else 0
+        min_col = cell_cols.min() if len(cell_cols) else 0
+        n_cols = (cell_cols.max() - min_col + 1) if len(cell_cols) else 1
+        cell_keys = (cell_rows - min_row) * n_cols + (cell_cols - min_col)
+        unique_cells, cell_index = np.unique(cell_keys, return_inverse=True)
+        self.cell_rows = unique_cells // n_cols + min_row
+        self.cell_cols = unique_cells % n_cols + min_col
+
+        category_lookup = {name: i for i, name in enumerate(self.categories)}
+        category_index = records['category'].map(category_lookup).fillna(len(self.categories) - 1)
+        category_index = category_index.to_numpy(dtype=np.int64)
+        year_index, self.years = pd.factorize(records['year'], sort=True)
+
+        shape = (len(unique_cells), len(self.categories), len(self.years))
+        flat = np.ravel_multi_index((cell_index, category_index, year_index), shape)
+        size = int(np.prod(shape))
+        anomalies = records['is_anomaly'].to_numpy(dtype=np.float64)
+        self.counts = np.bincount(flat, minlength=size).reshape(shape)
+        self.anomalies = np.bincount(flat, weights=anomalies, minlength=size).reshape(shape)
+        self.lat_sums = np.bincount(flat, weights=latitudes, minlength=size).reshape(shape)
+        self.lon_sums = np.bincount(flat, weights=longitudes, minlength=size).reshape(shape)
+        logger.info(f"Built zoom {zoom} cluster grid: {len(unique_cells)} cells from {len(records)} points")
+
+    def query(self, min_lat, min_lon, max_lat, max_lon, categories=None, year=None):
+        """Return the non-empty cells intersecting the bounding box"""
+        in_view = ((self.cell_rows >= np.floor(min_lat / self.cell_size)) &
+                   (self.cell_rows <= np.floor(max_lat / self.cell_size)) &
+                   (self.cell_cols >= np.floor(min_lon / self.cell_size)) &
+                   (self.cell_cols <= np.floor(max_lon / self.cell_size)))
+        category_mask = np.ones(len(self.categories), dtype=bool)
+        if categories is not None:
+            category_mask = np.isin(self.categories, categories)
+        year_mask = np.ones(len(self.years), dtype=bool)
+        if year is not None:
+            year_mask = np.asarray(self.years) == year
+
+        def select(table):
+            return table[in_view][:, category_mask][:, :, year_mask].sum(axis=2)
+
+        counts = select(self.counts)
+        totals = counts.sum(axis=1)
+        anomalies = select(self.anomalies).sum(axis=1)
+        lat_sums = select(self.lat_sums).sum(axis=1)
+        lon_sums = select(self.lon_sums).sum(axis=1)
+        rows = self.cell_rows[in_view]
+        cols = self.cell_cols[in_view]
+        names = [name for name, keep in zip(self.categories, category_mask) if keep]
+
+        cells = []
+        for i in np.nonzero(totals)[0]:
+            cells.append({
+                'latitude': float(lat_sums[i] / totals[i]),
+                'longitude': float(lon_sums[i] / totals[i]),
+                'count': int(totals[i]),
+                'categories': {name: int(c) for name, c in zip(names, counts[i]) if c},
+                'anomalies': int(anomalies[i]),
+                'bounds': [float(rows[i] * self.cell_size), float(cols[i] * self.cell_size),
+                           float((rows[i] + 1) * self.cell_size), float((cols[i] + 1) * self.cell_size)]
+            })
+        return cells
@@ -0,0 +1,20 @@
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def write_crimes():
+    """Writer of a small crime CSV in the ingest schema"""
+    def write_crimes(path, rows=50, dates=('2024-10-01',)):
+        pd.DataFrame({
+            'IncidentDate': [dates[i % len(dates)] for i in range(rows)],
+            'OccurredFromTime': [f'{i % 24:02d}:15' for i in range(rows)],
+            'Latitude': [38.6 + i * 1e-4 for i in range(rows)],
+            'Longitude': [-90.2 - i * 1e-4 for i in range(rows)],
+            'Offense': ['LARCENY', 'ASSAULT'] * (rows // 2),
+            'Category': ['Property Crimes', 'Violent Crimes'] * (rows // 2),
+            'Description': ['THEFT'] * rows,
+            'Neighborhood': ['Downtown', 'Soulard'] * (rows // 2),
+            'FirearmUsed': ['No'] * rows,
+        }).to_csv(path, index=False)
+    return write_crimes
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import CrimeAggregates
+from dataset import get_dataset_store
+
+PATTERNS = ['hourly', 'daily', 'monthly', 'crime_types', 'locations', 'firearms']
+
+
+@pytest.fixture
+def crimes_csv(tmp_path):
+    """A 5000-row crime CSV spanning two years, with missing and invalid values"""
+    rng = np.random.default_rng(21)
+    rows = 5000
+    dates = pd.Series(pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 730, rows), unit='D'))
+    dates = dates.dt.strftime('%Y-%m-%d').where(rng.random(rows) > 0.02, '')
+    times = pd.Series([f'{h:02d}:{m:02d}' for h, m in zip(rng.integers(0, 24, rows), rng.integers(0, 60, rows))])
+    times = times.where(rng.random(rows) > 0.02, '99:99')
+    path = tmp_path / 'crimes.csv'
+    pd.DataFrame({
+        'IncidentDate': dates,
+        'OccurredFromTime': times,
+        'Latitude': 38.6 + rng.normal(0, 0.02, rows),
+        'Longitude': -90.2 + rng.normal(0, 0.02, rows),
+        'Offense': rng.choice(['LARCENY', 'ASSAULT', 'BURGLARY', 'ROBBERY'], size=rows),
+        'Category': 'Other',
+        'Description': rng.choice(['THEFT', 'SIMPLE ASSAULT', 'FORCIBLE ENTRY', 'ARMED ROBBERY', 'SHOPLIFTING'],
+                                  size=rows, p=[0.4, 0.25, 0.15, 0.1, 0.1]),
+        'Neighborhood': rng.choice(['Downtown', 'Soulard', 'Dutchtown', 'The Ville', 'Unknown', ''], size=rows),
+        'FirearmUsed': rng.choice(['Yes', 'No'], size=rows, p=[0.15, 0.85]),
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+def test_chunked_aggregates_match_in_memory(crimes_csv):
+    full = CrimeAggregates.from_frame(get_dataset_store(crimes_csv).get())
+    # An odd chunk size splits days, months and neighborhoods across chunk boundaries
+    chunked = CrimeAggregates.from_csv(crimes_csv, chunksize=777)
+
+    assert chunked.total == full.total == 5000
+    assert chunked.hourly.tolist() == full.hourly.tolist()
+    for counts in ['daily', 'monthly', 'crime_types', 'locations']:
+        assert getattr(chunked, counts) == getattr(full, counts)
+    assert chunked.missing_locations == full.missing_locations > 0
+    assert chunked.firearm_incidents == full.firearm_incidents
+    assert chunked.date_range == full.date_range
+    assert chunked.top_crime_types() == full.top_crime_types()
+    assert chunked.top_locations() == full.top_locations()
+    for pattern in ['hourly_pattern', 'daily_pattern', 'monthly_pattern', 'crime_type_pattern',
+                    'location_pattern', 'firearm_pattern']:
+        assert getattr(chunked, pattern)() == getattr(full, pattern)()
+
+
+def test_streamed_analysis_stores_the_same_patterns(crimes_csv, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Imported here: the agent opens insights.db in the working directory
+    from crime_agent import CrimeAgent
+    agent = CrimeAgent(crimes_csv)
+
+    def stored():
+        patterns = {}
+        for pattern_type in PATTERNS:
+            pattern = agent.db.get_pattern(pattern_type)
+            patterns[pattern_type] = (pattern['pattern_data'], pattern['confidence'])
+        insights = sorted(insight['insight_text'] for insight in agent.db.get_insights(limit=100))
+        return patterns, insights
+
+    assert agent.analyze_csv(crimes_csv, stream=False)
+    in_memory = stored()
+    assert in_memory[1]
+    agent.db.close()
+    (tmp_path / 'insights.db').unlink()
+    agent = CrimeAgent(crimes_csv)
+    assert agent.analyze_csv(crimes_csv, stream=True, chunksize=777)
+    assert stored() == in_memory
@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+from jobs import get_job_queue
+
+
+class TokenModel:
+    """Model client streaming numbered tokens, slowly enough to disconnect mid-answer"""
+    model = 'tokens'
+
+    def __init__(self, count, delay=0.0):
+        self.count = count
+        self.delay = delay
+        self.sent = 0
+        self.closed = False
+
+    def invoke(self, prompt):
+        return ''.join(self.stream(prompt))
+
+    def stream(self, prompt):
+        try:
+            for i in range(self.count):
+                time.sleep(self.delay)
+                self.sent += 1
+                yield f't{i} '
+        finally:
+            self.closed = True
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Imported here: the module-level agent opens insights.db in the working directory
+    import app
+    return app
+
+
+def read_events(response, count=None):
+    """Parse up to ``count`` SSE events of a streamed response into (event, data) pairs"""
+    events = []
+    for chunk in response.response:
+        for raw in chunk.decode().split('\n\n'):
+            if raw:
+                lines = dict(line.split(': ', 1) for line in raw.split('\n'))
+                events.append((lines['event'], lines['data']))
+        if count is not None and len(events) >= count:
+            break
+    return events
+
+
+def test_stream_runs_on_the_job_queue(app_module, monkeypatch):
+    monkeypatch.setattr(app_module.crime_agent.ollama, 'model', TokenModel(3))
+    response = app_module.app.test_client().post('/chat/stream', json={'question': 'how many thefts'},
+                                                 buffered=False)
+    assert response.status_code == 200
+
+    events = read_events(response)
+    assert [event for event, _ in events] == ['data', 'token', 'token', 'token', 'done']
+    assert events[-1][1] == '{"success": true}'
+    assert any(job.kind == 'chat_stream' and job.status == 'done'
+               for job in get_job_queue()._jobs.values())
+
+
+def test_disconnect_cancels_the_job(app_module, monkeypatch):
+    # A question of its own, so the answer isn't replayed from the response cache
+    model = TokenModel(1000, delay=0.01)
+    monkeypatch.setattr(app_module.crime_agent.ollama, 'model', model)
+    response = app_module.app.test_client().post('/chat/stream', json={'question': 'how many burglaries'},
+                                                 buffered=False)
+    assert len(read_events(response, count=3)) >= 3
+    response.close()
+
+    deadline = time.time() + 5
+    while not model.closed and time.time() < deadline:
+        time.sleep(0.01)
+    assert model.closed
+    assert model.sent < model.count
+
+
+def test_full_queue_is_rejected(app_module, monkeypatch):
+    def full(*args, **kwargs):
+        raise app_module.QueueFullError('full')
+
+    monkeypatch.setattr(get_job_queue(), 'submit', full)
+    response = app_module.app.test_client().post('/chat/stream', json={'question': 'how many thefts'})
+    assert response.status_code == 503
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+DATES = ('2024-01-15', '2024-03-15', '2024-06-15', '2025-02-15')
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch, write_crimes):
+    monkeypatch.chdir(tmp_path)
+    # Imported here: the module-level agent opens insights.db in the working directory
+    import app
+    write_crimes(tmp_path / app.DATA_FILE, rows=80, dates=DATES)
+    return app
+
+
+def walk_pages(client, query, limit):
+    """All records of the paginated endpoint, and the number of pages it took"""
+    records, cursor, pages = [], None, 0
+    while True:
+        page = client.get(f'/get_crime_data?{query}&limit={limit}' + (f'&cursor={cursor}' if cursor else '')).get_json()
+        assert page['count'] == len(page['crimes'])
+        records += page['crimes']
+        pages += 1
+        cursor = page['next_cursor']
+        if cursor is None:
+            return records, pages, page['total']
+
+
+@pytest.mark.parametrize('query', ['year=all', 'year=2024', 'start=2024-03&end=2025-12'])
+def test_pages_add_up_to_the_unpaged_payload(app_module, query):
+    client = app_module.app.test_client()
+    expected = client.get(f'/get_crime_data?{query}').get_json()
+    assert expected
+
+    records, pages, total = walk_pages(client, query, limit=7)
+    assert records == expected
+    assert total == len(expected)
+    assert pages == -(-len(expected) // 7)
+
+
+@pytest.mark.parametrize('query', ['year=all', 'year=2024'])
+def test_ndjson_matches_the_unpaged_payload(app_module, query):
+    client = app_module.app.test_client()
+    expected = client.get(f'/get_crime_data?{query}').get_json()
+
+    response = client.get(f'/get_crime_data?{query}&format=ndjson')
+    assert response.mimetype == 'application/x-ndjson'
+    assert int(response.headers['X-Total-Count']) == len(expected)
+    assert [json.loads(line) for line in response.get_data(as_text=True).splitlines()] == expected
+
+
+def test_stale_cursor_is_gone_after_a_reload(app_module, tmp_path, write_crimes):
+    client = app_module.app.test_client()
+    first = client.get('/get_crime_data?limit=10').get_json()
+    assert client.get(f'/get_crime_data?limit=10&cursor={first["next_cursor"]}').status_code == 200
+
+    write_crimes(tmp_path / app_module.DATA_FILE, rows=90, dates=DATES)
+    response = client.get(f'/get_crime_data?limit=10&cursor={first["next_cursor"]}')
+    assert response.status_code == 410
+    # Starting over works against the new version
+    assert client.get('/get_crime_data?limit=10').get_json()['total'] == 90
+
+
+def test_invalid_pagination_requests(app_module):
+    client = app_module.app.test_client()
+    cursor = client.get('/get_crime_data?year=2024&limit=5').get_json()['next_cursor']
+    assert client.get(f'/get_crime_data?year=2025&limit=5&cursor={cursor}').status_code == 400
+    assert client.get('/get_crime_data?cursor=not-a-cursor').status_code == 400
+    assert client.get('/get_crime_data?limit=0').status_code == 400
+    assert client.get('/get_crime_data?format=ndjson&limit=5').status_code == 400
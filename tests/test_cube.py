@@ -0,0 +1,133 @@
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cube import CrimeCube
+from dataset import get_dataset_store
+
+NIGHT_HOURS = [18, 19, 20, 21, 22, 23, 0, 1, 2, 3, 4, 5]
+DAY_HOURS = list(range(6, 18))
+
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    """A CrimeAgent over a random CSV with two years of incidents and some missing values"""
+    monkeypatch.chdir(tmp_path)
+    rng = np.random.default_rng(7)
+    rows = 3000
+    neighborhoods = rng.choice(['Downtown', 'Soulard', 'Dutchtown', 'The Ville', 'Tower Grove', 'Benton Park', ''],
+                               size=rows, p=[0.3, 0.2, 0.15, 0.12, 0.1, 0.08, 0.05])
+    dates = pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 730, rows), unit='D')
+    pd.DataFrame({
+        'IncidentDate': dates.strftime('%Y-%m-%d'),
+        'OccurredFromTime': [f'{h:02d}:{m:02d}' for h, m in zip(rng.integers(0, 24, rows), rng.integers(0, 60, rows))],
+        'Latitude': 38.6 + rng.normal(0, 0.02, rows),
+        'Longitude': -90.2 + rng.normal(0, 0.02, rows),
+        'Offense': rng.choice(['LARCENY', 'ASSAULT', 'BURGLARY', 'ROBBERY', 'HOMICIDE', 'ARSON'], size=rows,
+                              p=[0.35, 0.25, 0.18, 0.12, 0.06, 0.04]),
+        'Category': 'Other',
+        'Description': 'UNKNOWN',
+        'Neighborhood': neighborhoods,
+        'FirearmUsed': rng.choice(['Yes', 'No'], size=rows, p=[0.2, 0.8]),
+    }).to_csv('crimes.csv', index=False)
+    from crime_agent import CrimeAgent
+    return CrimeAgent('crimes.csv')
+
+
+def listed(answer, heading):
+    """(label, count) pairs of the '- label: N incidents' lines under ``heading``"""
+    section = answer.split(heading, 1)[1].split('\n\n', 1)[0]
+    return [(label, int(count)) for label, count in re.findall(r'^- (.+?): (\d+) incidents', section, re.M)]
+
+
+def assert_top(pairs, counts, n):
+    """``pairs`` are the ``n`` most frequent values of ``counts`` (ties in any order)"""
+    assert [count for _, count in pairs] == counts.head(n).tolist()
+    assert all(counts[label] == count for label, count in pairs)
+
+
+def test_cube_counts_match_pandas(agent):
+    df = agent.get_data()
+    cube = agent.get_cube()
+    assert cube.total == len(df)
+    for dim in CrimeCube.DIMENSIONS:
+        assert cube.counts_by(dim) == {key: int(value) for key, value in df[dim].value_counts().items()}
+
+    armed = df[df['FirearmUsed'] == 'Yes']
+    assert cube.count({'FirearmUsed': 'Yes'}) == len(armed)
+    assert cube.counts_by('Offense', {'FirearmUsed': 'Yes'}) == armed['Offense'].value_counts().to_dict()
+    assert cube.count({'Hour': set(NIGHT_HOURS)}) == df['Hour'].isin(NIGHT_HOURS).sum()
+    for offense in df['Offense'].unique():
+        subset = df[df['Offense'] == offense]
+        assert cube.mode('Hour', {'Offense': offense}) == subset['Hour'].mode()[0]
+        assert cube.mode('DayOfWeek', {'Offense': offense}) == subset['DayOfWeek'].mode()[0]
+
+
+def test_neighborhood_answer(agent):
+    df = agent.get_data()
+    answer = agent.query_csv_data('Which neighborhood has the most crime?')
+    hoods = listed(answer, 'Top 5 Areas')
+    assert_top(hoods, df['Neighborhood'].value_counts(), 5)
+
+    worst = hoods[0][0]
+    assert_top(listed(answer, f'Most Common Crimes in {worst}'),
+               df.loc[df['Neighborhood'] == worst, 'Offense'].value_counts(), 3)
+
+
+def test_crime_type_answer(agent):
+    df = agent.get_data()
+    answer = agent.query_csv_data('What are the most common offenses?')
+    crimes = listed(answer, 'Top 5 Most Common Crimes')
+    assert_top(crimes, df['Offense'].value_counts(), 5)
+
+    subset = df[df['Offense'] == crimes[0][0]]
+    assert f"- Most common on: {subset['DayOfWeek'].mode()[0]}" in answer
+    assert f"- Peak hour: {int(subset['Hour'].mode()[0]):02d}:00" in answer
+
+
+def test_time_answer(agent):
+    df = agent.get_data()
+    answer = agent.query_csv_data('When during the day is it busiest?')
+    assert_top(listed(answer, 'Crime by Day of Week'), df['DayOfWeek'].value_counts(), 7)
+    hours = df['Hour'].value_counts()
+    assert listed(answer, 'Crime by Hour') == [(f'{hour:02d}:00', int(hours.get(hour, 0))) for hour in range(24)]
+    assert f"({hours.max()} incidents)" in answer.split('Highest activity:')[1].splitlines()[0]
+    assert f"- Daytime (6:00-17:59): {df['Hour'].isin(DAY_HOURS).sum()} incidents" in answer
+    assert f"- Nighttime (18:00-5:59): {df['Hour'].isin(NIGHT_HOURS).sum()} incidents" in answer
+
+
+def test_firearm_answer(agent):
+    df = agent.get_data()
+    armed = df[df['FirearmUsed'] == 'Yes']
+    answer = agent.query_csv_data('How many cases involved a gun?')
+    assert f'Total firearm-related incidents: {len(armed)}' in answer
+    assert_top(listed(answer, 'Most Common Armed Incidents'), armed['Offense'].value_counts(), 5)
+    assert_top(listed(answer, 'Areas with Most Armed Incidents'), armed['Neighborhood'].value_counts(), 3)
+
+
+def test_report_answer(agent):
+    df = agent.get_data()
+    answer = agent.query_csv_data('Give me a summary report')
+    assert f'Total Incidents: {len(df)}' in answer
+    assert f"({df['IncidentDate'].min():%Y-%m-%d} to {df['IncidentDate'].max():%Y-%m-%d})" in answer
+    assert_top(listed(answer, 'Most Common Crime Types'), df['Offense'].value_counts(), 5)
+    assert_top(listed(answer, 'Most Affected Neighborhoods'), df['Neighborhood'].value_counts(), 5)
+    assert f"- Peak Activity Hour: {int(df['Hour'].mode()[0]):02d}:00" in answer
+    assert f"- Busiest Day: {df['DayOfWeek'].value_counts().index[0]}" in answer
+    assert f"Total firearm-related incidents: {(df['FirearmUsed'] == 'Yes').sum()}" in answer
+
+
+def test_year_in_question_restricts_the_data(agent):
+    df = agent.get_data()
+    year = df[df['Year'] == 2024]
+    assert 0 < len(year) < len(df)
+
+    answer = agent.query_csv_data('What are the most common offenses in 2024?')
+    assert_top(listed(answer, 'Top 5 Most Common Crimes'), year['Offense'].value_counts(), 5)
+    answer = agent.query_csv_data('Give me a summary report for 2024')
+    assert f'Total Incidents: {len(year)}' in answer
+    assert agent.query_csv_data('Which neighborhood was worst in 1999?') == 'No crime data is available for 1999.'
+    # A number that isn't a plausible year is not a filter
+    assert f'Total Incidents: {len(df)}' in agent.query_csv_data('Summary report of the top 3000 cases')
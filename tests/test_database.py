@@ -0,0 +1,36 @@
+import threading
+
+from database import AnalysisBatch, InsightDatabase
+
+
+def test_connections_stay_bounded_across_threads(tmp_path):
+    db = InsightDatabase(str(tmp_path / 'insights.db'), pool_size=4)
+    db.add_insight('Theft is up downtown', 'trend', confidence=0.8)
+
+    results = []
+    def request():
+        results.append(db.get_insights(limit=5))
+
+    for _ in range(20):
+        threads = [threading.Thread(target=request) for _ in range(15)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert len(results) == 300
+    assert all(len(insights) == 1 for insights in results)
+    assert len(db._connections) <= 4
+    db.close()
+
+
+def test_failed_transaction_is_rolled_back(tmp_path):
+    db = InsightDatabase(str(tmp_path / 'insights.db'), pool_size=1)
+    batch = AnalysisBatch()
+    batch.add_insight('Kept out by the failure', 'trend')
+    batch.patterns.append(('broken',))  # wrong number of values for the pattern insert
+    assert not db.write_batch(batch)
+    # The same pooled connection is reused and sees no partial write
+    assert db.get_insights() == []
+    assert len(db._connections) == 1
+    db.close()
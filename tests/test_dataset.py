@@ -0,0 +1,65 @@
+import pandas as pd
+import pytest
+
+from dataset import DatasetStore
+
+
+def test_builder_lookups_see_the_builders_version(tmp_path, write_crimes):
+    csv_file = str(tmp_path / 'crimes.csv')
+    write_crimes(csv_file, rows=50)
+    store = DatasetStore(csv_file, cache_dir=None)
+
+    def build(df):
+        # The file is replaced while the artifact is being built
+        write_crimes(csv_file, rows=20)
+        inner = store.derived('inner', len)
+        return len(df), inner, len(store.get()), len(store.select('2024-10', '2024-10'))
+
+    assert store.derived('outer', build) == (50, 50, 50, 50)
+    # Outside the builder the store moves on to the new file
+    assert len(store.get()) == 20
+    assert store.derived('inner', len) == 20
+
+
+def test_views_cannot_change_the_shared_data(tmp_path, write_crimes):
+    csv_file = str(tmp_path / 'crimes.csv')
+    write_crimes(csv_file)
+    store = DatasetStore(csv_file, cache_dir=None)
+    assert not pd.get_option('mode.copy_on_write')
+
+    view = store.get()
+    view['Hour'] = view['Hour'] + 1
+    view['Extra'] = 1
+    other = store.get()
+    with pytest.raises(ValueError):
+        other.loc[0, 'Latitude'] = 0.0
+
+    df = store.get()
+    assert df['Hour'].tolist() == [i % 24 for i in range(50)]
+    assert 'Extra' not in df
+    assert df['Latitude'].iloc[0] == pytest.approx(38.6)
+
+
+def test_request_ranges_share_bounded_cache_entries(tmp_path, write_crimes):
+    csv_file = str(tmp_path / 'crimes.csv')
+    write_crimes(csv_file, rows=60, dates=('2024-01-15', '2024-03-15', '2024-06-15'))
+    store = DatasetStore(csv_file, cache_dir=None)
+    built = []
+
+    def count(start, end):
+        built.append((start, end))
+        return len(store.select(start, end))
+
+    # Ranges covering the same partitions are narrowed to them and built once
+    assert store.derived_range('count', '2023-01', '2024-04', count) == 40
+    assert store.derived_range('count', '2024-01', '2024-05', count) == 40
+    assert store.derived_range('count', '1999-01', '1999-12', count) == 0
+    assert store.derived_range('count', '2030-01', '2030-12', count) == 0
+    assert built == [('2024-01', '2024-03'), ('1999-01', '1999-12')]
+    assert store.derived_range('count', None, None, count) == 60
+
+    for month in range(1, 13):
+        for last in range(month, 13):
+            expected = len(store.select(f'2024-{month:02d}', f'2024-{last:02d}'))
+            assert store.derived_range('count', f'2024-{month:02d}', f'2024-{last:02d}', count, max_entries=4) == expected
+    assert len(store.derived(('count', 'lru'), dict)) == 4
@@ -0,0 +1,36 @@
+import pytest
+
+from dataset import get_dataset_store
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch, write_crimes):
+    monkeypatch.chdir(tmp_path)
+    import app
+    write_crimes(tmp_path / app.DATA_FILE, rows=200)
+    return app
+
+
+def test_heatmap_cache_is_bounded(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'HEATMAP_CACHE_ENTRIES', 8)
+    client = app_module.app.test_client()
+    for i in range(40):
+        response = client.get(f'/heatmap?format=json&bandwidth={300 + i * 0.25}&categories=bogus{i}')
+        assert response.status_code == 200
+
+    store = get_dataset_store(app_module.DATA_FILE)
+    entries = store.derived(('heatmap', 'lru'), dict)
+    # Bandwidths snapped to one step and the unknown categories dropped: a single entry
+    assert len(entries) == 1
+
+    for i in range(20):
+        client.get(f'/heatmap?format=json&bandwidth={100 + i * 50}')
+    assert len(entries) == 8
+
+
+def test_unknown_categories_match_nothing(app_module):
+    client = app_module.app.test_client()
+    everything = client.get('/heatmap?format=json').get_json()
+    assert everything['incidents'] == 200
+    assert client.get('/heatmap?format=json&categories=bogus').get_json()['incidents'] == 0
+    assert client.get('/heatmap?format=json&categories=Violent Crimes,bogus').get_json()['incidents'] == 100
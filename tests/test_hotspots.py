@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from dataset import DatasetStore
+from hotspots import NOISE, HotspotModel
+from payloads import crime_records
+
+
+def incidents(rng, rows, centre=(38.63, -90.2), spread=0.0005):
+    """``rows`` incidents scattered around ``centre``"""
+    return pd.DataFrame({
+        'IncidentDate': '2024-10-01',
+        'OccurredFromTime': [f'{h:02d}:30' for h in rng.integers(0, 24, rows)],
+        'Latitude': centre[0] + rng.normal(0, spread, rows),
+        'Longitude': centre[1] + rng.normal(0, spread, rows),
+        'Offense': rng.choice(['LARCENY', 'ASSAULT', 'BURGLARY'], size=rows),
+        'Category': 'Other',
+        'Description': 'UNKNOWN',
+        'Neighborhood': 'Downtown',
+        'FirearmUsed': 'No',
+    })
+
+
+def isolated(rng):
+    """Single incidents kilometres apart from each other and from any hotspot"""
+    points = incidents(rng, 4)
+    points['Latitude'] = [38.50, 38.55, 38.70, 38.75]
+    points['Longitude'] = [-90.40, -90.10, -90.35, -90.05]
+    return points
+
+
+def assert_same_model(model, rebuilt):
+    assert np.array_equal(model.clusters, rebuilt.clusters)
+    assert np.array_equal(model.anomalies, rebuilt.anomalies)
+    np.testing.assert_allclose(model.scores, rebuilt.scores, equal_nan=True)
+    assert model.cluster_summaries == rebuilt.cluster_summaries
+
+
+def test_noise_is_labelled_minus_one(tmp_path):
+    rng = np.random.default_rng(22)
+    frame = pd.concat([incidents(rng, 300), incidents(rng, 200, centre=(38.60, -90.25)), isolated(rng)],
+                      ignore_index=True)
+    frame.loc[len(frame)] = frame.iloc[0]
+    frame.loc[len(frame) - 1, ['Latitude', 'Longitude']] = np.nan
+    frame.to_csv(tmp_path / 'crimes.csv', index=False)
+    df = DatasetStore(str(tmp_path / 'crimes.csv'), cache_dir=None).get()
+
+    model = HotspotModel.from_frame(df)
+    assert len(model.hotspots()) == 2
+    assert model.hotspots()[0]['incidents'] >= 300
+    assert (model.clusters[:500] >= 0).all()
+    assert set(model.clusters[:300]) != set(model.clusters[300:500])
+    # Isolated incidents and rows without coordinates are noise, not hotspot 0
+    assert model.clusters[500:].tolist() == [NOISE] * 5
+    assert np.isnan(model.scores[-1]) and not model.anomalies[-1]
+
+    records = crime_records(model.label(df))
+    assert records['cluster'].tolist()[500:] == [NOISE] * 4
+    # Without a model no incident is put in a hotspot
+    assert (crime_records(df)['cluster'] == NOISE).all()
+
+
+def test_extended_model_matches_a_rebuild():
+    rng = np.random.default_rng(23)
+    first = pd.concat([incidents(rng, 300), isolated(rng)], ignore_index=True)
+    # The appended rows grow a second hotspot and add a new offense
+    appended = pd.concat([incidents(rng, 250, centre=(38.60, -90.25)), isolated(rng)], ignore_index=True)
+    appended.loc[0, 'Offense'] = 'ARSON'
+    for frame in (first, appended):
+        frame['Hour'] = frame['OccurredFromTime'].str[:2].astype(int)
+    full = pd.concat([first, appended], ignore_index=True)
+
+    model = HotspotModel.from_frame(first).extended(appended)
+    rebuilt = HotspotModel.from_frame(full)
+    assert len(rebuilt.hotspots()) == 2
+    assert_same_model(model, rebuilt)
+    assert (model.clusters[300:304] == NOISE).all()
+
+
+def test_store_extends_the_model_after_an_append(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Imported here: the agent opens insights.db in the working directory
+    from crime_agent import CrimeAgent
+    rng = np.random.default_rng(24)
+    csv_file = str(tmp_path / 'crimes.csv')
+    pd.concat([incidents(rng, 300), isolated(rng)]).to_csv(csv_file, index=False)
+    agent = CrimeAgent(csv_file)
+    assert agent.get_hotspots().rows == 304
+
+    extended = []
+    original = HotspotModel.extended
+    monkeypatch.setattr(HotspotModel, 'extended', lambda self, df: extended.append(len(df)) or original(self, df))
+    incidents(rng, 250, centre=(38.60, -90.25)).to_csv(csv_file, mode='a', header=False, index=False)
+    stat = os.stat(csv_file)
+    os.utime(csv_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    model = agent.get_hotspots()
+    assert extended == [250]
+    assert_same_model(model, HotspotModel.from_frame(agent.get_data()))
@@ -0,0 +1,94 @@
+import pytest
+
+import llm_cache
+from database import InsightDatabase
+from llm_cache import CachedModel, LLMResponseCache
+from ollama_client import OllamaClient
+from ollama_stub import start_stub_server, stub_reply
+
+PROMPT = 'Summarize thefts downtown'
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = InsightDatabase(str(tmp_path / 'insights.db'))
+    yield db
+    db.close()
+
+
+def stub_model(**options):
+    server = start_stub_server(**options)
+    return server, OllamaClient(host=f'http://127.0.0.1:{server.server_address[1]}')
+
+
+def test_streamed_reply_is_cached_in_both_tiers(db):
+    server, client = stub_model()
+    try:
+        cache = LLMResponseCache(db)
+        model = CachedModel(client, cache)
+        assert ''.join(model.stream(PROMPT)).strip() == stub_reply(PROMPT)
+
+        key = model._key(PROMPT)
+        assert db.get_llm_response(key, 0)[0] == stub_reply(PROMPT)
+        # Served from the cache once the server is gone
+        server.shutdown()
+        server.server_close()
+        assert list(model.stream(PROMPT)) == [stub_reply(PROMPT)]
+    finally:
+        server.shutdown()
+
+
+def test_truncated_stream_is_not_cached(db):
+    server, client = stub_model(truncate_after=3)
+    try:
+        cache = LLMResponseCache(db)
+        model = CachedModel(client, cache)
+        tokens = []
+        with pytest.raises(ConnectionError):
+            for token in model.stream(PROMPT):
+                tokens.append(token)
+        assert len(tokens) == 3
+
+        key = model._key(PROMPT)
+        assert cache.get(key) is None
+        assert db.get_llm_response(key, 0) is None
+    finally:
+        server.shutdown()
+
+
+def test_closed_stream_is_not_cached():
+    server, client = stub_model()
+    try:
+        cache = LLMResponseCache()
+        model = CachedModel(client, cache)
+        tokens = model.stream(PROMPT)
+        next(tokens)
+        tokens.close()
+        assert cache.get(model._key(PROMPT)) is None
+    finally:
+        server.shutdown()
+
+
+def test_entries_expire_after_the_ttl(db, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, 'time', lambda: now[0])
+    cache = LLMResponseCache(db, ttl=60)
+    cache.put('key', 'model', 'answer')
+    now[0] += 59
+    assert cache.get('key') == 'answer'
+
+    now[0] += 2
+    assert cache.get('key') is None
+    # A fresh cache over the same database doesn't bring it back either
+    assert LLMResponseCache(db, ttl=60).get('key') is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LLMResponseCache(max_entries=2)
+    cache.put('a', 'model', 'A')
+    cache.put('b', 'model', 'B')
+    assert cache.get('a') == 'A'
+    cache.put('c', 'model', 'C')
+
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == ('A', 'C')
@@ -0,0 +1,16 @@
+import pytest
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Imported here: the module-level agent opens insights.db in the working directory
+    import app
+    return app.app.test_client()
+
+
+def test_metrics_content_type(client):
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == 'text/plain; version=0.0.4; charset=utf-8'
+    assert '# TYPE' in response.get_data(as_text=True)
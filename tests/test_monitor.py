@@ -0,0 +1,80 @@
+from dataset import get_dataset_store
+
+
+class FakeModel:
+    """Model client that answers every prompt with fixed insights"""
+    model = 'fake'
+
+    def __init__(self):
+        self.prompts = []
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        return 'Insight one\nInsight two'
+
+    def stream(self, prompt):
+        self.prompts.append(prompt)
+        yield from ['Insight one\n', 'Insight two']
+
+
+def test_streaming_cycle_never_loads_the_dataset(tmp_path, monkeypatch, write_crimes):
+    monkeypatch.chdir(tmp_path)
+    # Imported here: the module-level monitor opens insights.db in the working directory
+    from monitor import CrimeMonitor
+    csv_file = str(tmp_path / 'crimes.csv')
+    write_crimes(csv_file)
+
+    monitor = CrimeMonitor(csv_file, stream=True)
+    model = FakeModel()
+    monitor.crime_agent.ollama.model = model
+    run = {}
+    assert monitor.run_analysis(run)
+    assert run['mode'] == 'full'
+    assert monitor.aggregates.total == 50
+
+    # The insights prompt went through the LLM cache, whose key needs the dataset version
+    assert len(model.prompts) == 1
+    assert get_dataset_store(csv_file).version == 0
+
+
+def test_partial_row_append_is_unchanged(tmp_path, monkeypatch, write_crimes):
+    monkeypatch.chdir(tmp_path)
+    from monitor import CrimeMonitor
+    csv_file = str(tmp_path / 'crimes.csv')
+    write_crimes(csv_file)
+
+    monitor = CrimeMonitor(csv_file, stream=True)
+    monitor.crime_agent.ollama.model = FakeModel()
+    assert monitor.run_analysis()
+    complete_size = monitor._file_state['size']
+
+    with open(csv_file, 'a') as f:
+        f.write('2024-10-02,10:00,38.61,-90.21,LARCENY')
+    run = {}
+    assert not monitor.run_analysis(run)
+    assert run['mode'] == 'unchanged'
+    assert monitor._file_state['size'] == complete_size
+
+    # Once the row is complete it is folded in
+    with open(csv_file, 'a') as f:
+        f.write(',Property Crimes,THEFT,Downtown,No\n')
+    run = {}
+    assert monitor.run_analysis(run)
+    assert (run['mode'], run['rows']) == ('incremental', 1)
+    assert monitor.aggregates.total == 51
+
+
+def test_unreachable_model_stores_no_insights(tmp_path, monkeypatch, write_crimes):
+    monkeypatch.chdir(tmp_path)
+    from monitor import CrimeMonitor
+    from ollama_client import OllamaClient
+    csv_file = str(tmp_path / 'crimes.csv')
+    write_crimes(csv_file)
+
+    monitor = CrimeMonitor(csv_file, stream=True)
+    # Nothing listens on port 1
+    monitor.crime_agent.ollama.model = OllamaClient(host='http://127.0.0.1:1')
+    assert monitor.run_analysis()
+
+    assert monitor.crime_agent.get_insights(insight_type='ai_analysis') == []
+    assert monitor.crime_agent.db.get_pattern('hourly') is not None
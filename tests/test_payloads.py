@@ -0,0 +1,89 @@
+import gzip
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset import DatasetStore
+from payloads import COLUMNAR_MAGIC, COLUMNAR_MIMETYPE, build_columnar_payload, crime_records, records_json
+
+
+def test_served_coordinates_match_the_csv(tmp_path, write_crimes):
+    csv_file = str(tmp_path / 'crimes.csv')
+    write_crimes(csv_file)
+    raw = pd.read_csv(csv_file)
+    raw.loc[0, ['Latitude', 'Longitude']] = [38.578246, -90.267531]
+    raw.to_csv(csv_file, index=False)
+
+    records = crime_records(DatasetStore(csv_file, cache_dir=None).get())
+    assert records['latitude'].tolist() == raw['Latitude'].tolist()
+    assert records['longitude'].tolist() == raw['Longitude'].tolist()
+
+    served = json.loads(records_json(records.head(1)))[0]
+    assert (served['latitude'], served['longitude']) == (38.578246, -90.267531)
+
+
+def decode_columnar(body):
+    """Decode a columnar payload back into a list of record dicts"""
+    assert body[:4] == COLUMNAR_MAGIC
+    header_length, = struct.unpack('<I', body[4:8])
+    header = json.loads(body[8:8 + header_length])
+    start = -(-(8 + header_length) // 8) * 8
+    columns = {}
+    for column in header['columns']:
+        dtype = np.dtype(column['type']).newbyteorder('<')
+        values = np.frombuffer(body, dtype=dtype, count=header['count'], offset=start + column['offset'])
+        if column['dictionary']:
+            columns[column['name']] = [header['strings'][code] for code in values]
+        else:
+            columns[column['name']] = values.tolist()
+    names = [column['name'] for column in header['columns']]
+    return [dict(zip(names, row)) for row in zip(*(columns[name] for name in names))]
+
+
+def assert_same_records(decoded, expected):
+    assert len(decoded) == len(expected)
+    for got, want in zip(decoded, expected):
+        assert list(got) == list(want)
+        # Coordinates travel as float32
+        assert got['latitude'] == pytest.approx(want['latitude'], abs=1e-5)
+        assert got['longitude'] == pytest.approx(want['longitude'], abs=1e-5)
+        assert got['is_anomaly'] == int(want['is_anomaly'])
+        others = [field for field in want if field not in ('latitude', 'longitude', 'is_anomaly')]
+        assert {field: got[field] for field in others} == {field: want[field] for field in others}
+
+
+def test_columnar_round_trip(tmp_path, write_crimes):
+    csv_file = str(tmp_path / 'crimes.csv')
+    write_crimes(csv_file, rows=40, dates=('2024-01-15', '2024-06-15'))
+    records = crime_records(DatasetStore(csv_file, cache_dir=None).get())
+
+    payload = build_columnar_payload(records)
+    decoded = decode_columnar(gzip.decompress(payload['body']))
+    assert_same_records(decoded, json.loads(records.to_json(orient='records')))
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch, write_crimes):
+    monkeypatch.chdir(tmp_path)
+    # Imported here: the module-level agent opens insights.db in the working directory
+    import app
+    write_crimes(tmp_path / app.DATA_FILE, rows=60, dates=('2024-01-15', '2024-03-15', '2025-02-15'))
+    return app
+
+
+@pytest.mark.parametrize('query', ['year=all', 'year=2024'])
+def test_columnar_response_matches_json(app_module, query):
+    client = app_module.app.test_client()
+    expected = client.get(f'/get_crime_data?{query}').get_json()
+
+    response = client.get(f'/get_crime_data?{query}&format=columnar', headers={'Accept-Encoding': 'gzip'})
+    assert response.mimetype == COLUMNAR_MIMETYPE
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert_same_records(decode_columnar(gzip.decompress(response.data)), expected)
+
+    plain = client.get(f'/get_crime_data?{query}&format=columnar')
+    assert 'Content-Encoding' not in plain.headers
+    assert_same_records(decode_columnar(plain.data), expected)
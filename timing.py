@@ -0,0 +1,12 @@
+import time
+from contextlib import contextmanager
+
+
+@contextmanager
+def timed(timings, stage):
+    """Record the wall time of the enclosed block, in seconds, as ``timings[stage]``"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = round(time.perf_counter() - start, 6)